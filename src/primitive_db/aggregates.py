@@ -0,0 +1,148 @@
+from .constants import AGGREGATE_FUNCTIONS
+
+NUMERIC_TYPES = ("int", "bool")
+
+
+def output_name(item):
+    """
+    Возвращает имя столбца результата: имя столбца или вид "sum(age)".
+    """
+    if isinstance(item, str):
+        return item
+    func, column = item
+    return f"{func}({column})"
+
+def validate(items, group_by, columns):
+    """
+    Проверяет список выборки с агрегатами.
+
+    Args:
+        items (list): Имена столбцов и пары (функция, столбец)
+        group_by (list): Столбцы группировки
+        columns (list): Описания столбцов таблицы
+
+    Raises:
+        ValueError: Если функция, столбец или их сочетание некорректны
+    """
+    column_types = {col["name"]: col["type"] for col in columns}
+
+    for name in group_by:
+        if name not in column_types:
+            raise ValueError(f'Столбец "{name}" не существует.')
+
+    for item in items:
+        if isinstance(item, str):
+            if item not in group_by:
+                raise ValueError(f'Столбец "{item}" должен входить в GROUP BY')
+            continue
+
+        func, column = item
+        if func not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f'Неизвестная агрегатная функция "{func}"')
+        if column == "*":
+            if func != "count":
+                raise ValueError(f"Функция {func} не принимает *")
+            continue
+        if column not in column_types:
+            raise ValueError(f'Столбец "{column}" не существует.')
+        if func in ("sum", "avg") and column_types[column] not in NUMERIC_TYPES:
+            raise ValueError(f'Функция {func} применима только к числовым столбцам, "{column}" имеет тип {column_types[column]}') # noqa: E501
+
+def referenced_columns(items, group_by):
+    """
+    Возвращает столбцы, которые нужно прочитать для вычисления агрегатов.
+    """
+    names = list(group_by)
+    for item in items:
+        column = item if isinstance(item, str) else item[1]
+        if column != "*" and column not in names:
+            names.append(column)
+    return names
+
+def _new_state(items):
+    # Состояние агрегата: [количество, сумма, минимум, максимум]
+    return [[0, 0, None, None] for _ in items]
+
+def _update(state, items, row):
+    for accumulator, item in zip(state, items):
+        if isinstance(item, str):
+            continue
+        func, column = item
+        if column == "*":
+            accumulator[0] += 1
+            continue
+
+        value = row.get(column)
+        if value is None:
+            continue
+        accumulator[0] += 1
+        if func in ("sum", "avg"):
+            accumulator[1] += value
+        elif func == "min":
+            if accumulator[2] is None or value < accumulator[2]:
+                accumulator[2] = value
+        elif func == "max":
+            if accumulator[3] is None or value > accumulator[3]:
+                accumulator[3] = value
+
+def _result(accumulator, func):
+    count, total, minimum, maximum = accumulator
+    if func == "count":
+        return count
+    if func == "sum":
+        return total if count else None
+    if func == "avg":
+        return total / count if count else None
+    return minimum if func == "min" else maximum
+
+def compute(rows, items, group_by=()):
+    """
+    Вычисляет агрегаты за один проход по записям.
+
+    Для каждой группы хранится только состояние агрегатов
+    (количество, сумма, минимум, максимум), поэтому память не зависит
+    от числа записей в группе. Группы выдаются в порядке появления.
+
+    Args:
+        rows (iterable): Записи таблицы
+        items (list): Имена столбцов группировки и пары (функция, столбец)
+        group_by (list): Столбцы группировки
+
+    Returns:
+        list: Строки результата {имя_столбца: значение}
+    """
+    groups = {}
+    for row in rows:
+        key = tuple(row.get(name) for name in group_by)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = _new_state(items)
+        _update(state, items, row)
+
+    # Без группировки результат - одна строка даже для пустой таблицы
+    if not group_by and not groups:
+        groups[()] = _new_state(items)
+
+    return [finalize(items, group_by, key, state) for key, state in groups.items()]
+
+def finalize(items, group_by, key, state):
+    """
+    Собирает строку результата из ключа группы и состояния агрегатов.
+    """
+    values = dict(zip(group_by, key))
+    result = {}
+    for accumulator, item in zip(state, items):
+        if isinstance(item, str):
+            result[item] = values[item]
+        else:
+            result[output_name(item)] = _result(accumulator, item[0])
+    return result
+
+def counted_state(items, count):
+    """
+    Возвращает состояние агрегатов COUNT(*), уже известное без просмотра записей.
+    """
+    state = _new_state(items)
+    for accumulator in state:
+        accumulator[0] = count
+    return state
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+from . import core, decorators, engine, metrics, parser, utils
+from .session import Session
+
+SCHEMA_COMMANDS = ("create_table", "drop_table", "create_index", "compact")
+COMMENT_PREFIXES = ("--", "#")
+
+
+def iter_statements(lines):
+    """
+    Выделяет команды из строк сценария.
+
+    Каждая непустая строка - одна команда; завершающая точка с запятой
+    отбрасывается, строки, начинающиеся с -- или #, пропускаются.
+
+    Args:
+        lines (iterable): Строки сценария
+
+    Yields:
+        tuple: (номер строки, текст команды)
+    """
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if text.endswith(";"):
+            text = text[:-1].rstrip()
+        if text and not text.startswith(COMMENT_PREFIXES):
+            yield number, text
+
+def _write_rows(rows, render, stream):
+    if render:
+        with redirect_stdout(stream):
+            core.print_rows(rows)
+        return
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+def run_script(lines, render=False, verbose=False, confirm=False, keep_going=False):
+    """
+    Выполняет сценарий команд в одном сеансе.
+
+    Метаданные загружаются один раз, а изменения всех команд
+    записываются на диск одной фиксацией в конце (команды, изменяющие
+    схему, фиксируются сразу). Результаты select выводятся в stdout
+    строками JSON (или таблицей с render), сообщения команд - в stderr
+    только с verbose, ошибки - в stderr всегда.
+
+    Args:
+        lines (iterable): Строки сценария
+        render (bool): Выводить результаты select таблицей
+        verbose (bool): Выводить сообщения команд
+        confirm (bool): Запрашивать подтверждение опасных операций
+        keep_going (bool): Продолжать выполнение после ошибки
+
+    Returns:
+        int: Код завершения: 0 - без ошибок, 1 - были ошибки
+    """
+    stdout = sys.stdout
+    errors = 0
+    decorators.set_auto_confirm(not confirm)
+
+    session = Session()
+    utils.set_session(session)
+    session.begin_batch()
+
+    with open(os.devnull, "w") as devnull:
+        messages = sys.stderr if verbose or confirm else devnull
+
+        try:
+            for number, text in iter_statements(lines):
+                error, result, statement = None, None, None
+                try:
+                    statement = parser.parse_statement(text)
+                    if statement.kind == "exit":
+                        break
+                    decorators.get_last_error()
+                    with redirect_stdout(messages):
+                        result = engine.run_command(session, statement,
+                                                    collect_rows=True)
+                    error = decorators.get_last_error()
+                except Exception as e:
+                    error = e
+
+                if error is not None:
+                    errors += 1
+                    if isinstance(error, KeyError) and error.args:
+                        error = error.args[0]
+                    print(f"Строка {number}: {error}", file=sys.stderr)
+                    if keep_going:
+                        continue
+                    break
+
+                if statement.kind in ("select", "explain") and result:
+                    _write_rows(result, render, stdout)
+                elif statement.kind in SCHEMA_COMMANDS and not session.in_transaction:
+                    with metrics.operation("flush"):
+                        session.flush()
+        finally:
+            if session.in_transaction:
+                session.rollback()
+                print("Незавершенная транзакция отменена.", file=sys.stderr)
+            with metrics.operation("flush"):
+                session.end_batch()
+            utils.set_session(None)
+
+    return 1 if errors else 0
+
+def main(argv=None):
+    """
+    Точка входа пакетного режима: database -c "<команда>" | -f <файл>.
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog="database", description="Пакетное выполнение команд primitive_db"
+    )
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("-c", dest="commands", action="append", metavar="КОМАНДА",
+                        help="выполнить команду (можно повторять)")
+    source.add_argument("-f", dest="script", metavar="ФАЙЛ",
+                        help="выполнить команды из файла; - читает stdin")
+    arg_parser.add_argument("--table", action="store_true",
+                            help="выводить результаты select таблицей, а не JSON")
+    arg_parser.add_argument("-v", "--verbose", action="store_true",
+                            help="выводить сообщения команд в stderr")
+    arg_parser.add_argument("--confirm", action="store_true",
+                            help="запрашивать подтверждение опасных операций")
+    arg_parser.add_argument("--keep-going", action="store_true",
+                            help="продолжать выполнение после ошибки")
+    args = arg_parser.parse_args(argv)
+    options = {"render": args.table, "verbose": args.verbose,
+               "confirm": args.confirm, "keep_going": args.keep_going}
+
+    if args.commands:
+        return run_script(args.commands, **options)
+    if args.script == "-":
+        return run_script(sys.stdin, **options)
+    with open(args.script, "r", encoding="utf-8") as f:
+        return run_script(f, **options)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import core, decorators, utils
+from .constants import (
+    DEFAULT_ENCODING,
+    ENGINE_MODES,
+    FSYNC_POLICIES,
+    FSYNC_POLICY,
+    STORAGE_MODES,
+)
+from .session import Session
+
+try:
+    import resource
+except ImportError:  # Модуль resource есть не на всех платформах
+    resource = None
+
+BENCH_TABLE = "bench"
+BENCH_COLUMNS = [("name", "str"), ("age", "int"), ("is_active", "bool")]
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_SAMPLES = 20
+DEFAULT_TOLERANCE = 0.2
+
+
+def generate_rows(count, seed=0):
+    """
+    Генерирует синтетические записи для таблицы со схемой BENCH_COLUMNS.
+
+    Args:
+        count (int): Количество записей
+        seed (int): Начальное значение генератора случайных чисел
+
+    Yields:
+        list: Значения записи без ID
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield [f"user{i}", rng.randrange(18, 100), rng.random() < 0.5]
+
+def _percentile(sorted_values, fraction):
+    """Возвращает перцентиль отсортированного списка (ближайший ранг)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1,
+                      round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarize(durations, units_per_call=1):
+    """
+    Сводит замеры операции в показатели.
+
+    Args:
+        durations (list): Длительности вызовов в секундах
+        units_per_call (int): Число обработанных записей за вызов
+
+    Returns:
+        dict: Число замеров, суммарное время, p50/p99 в миллисекундах
+            и пропускная способность в записях (операциях) в секунду
+    """
+    ordered = sorted(durations)
+    total = sum(ordered)
+    throughput = round(units_per_call * len(ordered) / total, 1) if total else None
+    return {
+        "samples": len(ordered),
+        "total_s": round(total, 6),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "throughput": throughput,
+    }
+
+def peak_rss_kb():
+    """
+    Возвращает пиковый объем резидентной памяти процесса в КБ (или None).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS сообщает значение в байтах, Linux - в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def run_case(size, storage, samples=DEFAULT_SAMPLES, seed=0, fsync=FSYNC_POLICY,
+             engine="rows"):
+    """
+    Выполняет набор операций над таблицей заданного размера.
+
+    Замеры выполняются во временном каталоге через сеанс, как в REPL:
+    каждая операция завершается записью изменений на диск.
+
+    Args:
+        size (int): Количество записей в таблице
+        storage (str): Режим хранения таблицы
+        samples (int): Количество замеров точечных операций
+        seed (int): Начальное значение генератора случайных чисел
+        fsync (str): Политика fsync (см. utils.set_fsync_policy)
+        engine (str): Представление таблицы в памяти (rows или columnar)
+
+    Returns:
+        dict: Результаты по операциям и пиковый объем памяти
+    """
+    utils.set_fsync_policy(fsync)
+    decorators.set_auto_confirm(True)
+    rng = random.Random(seed)
+    operations = {}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix="primitive_db_bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            with open(os.devnull, "w") as devnull, \
+                    contextlib.redirect_stdout(devnull), \
+                    Session() as session:
+                core.query_cacher.clear()
+
+                def commit(func, *args, **kwargs):
+                    result = func(*args, **kwargs)
+                    session.flush()
+                    return result
+
+                metadata = core.create_table(
+                    session.metadata, BENCH_TABLE, BENCH_COLUMNS, storage=storage,
+                    engine=engine
+                )
+                commit(utils.save_metadata, data=metadata)
+
+                elapsed, _ = _timed(
+                    commit, core.insert_many, metadata, BENCH_TABLE,
+                    generate_rows(size, seed)
+                )
+                operations["bulk_load"] = summarize([elapsed], size)
+
+                durations = []
+                for i in range(samples):
+                    values = [f"extra{i}", rng.randrange(18, 100), True]
+                    elapsed, _ = _timed(
+                        commit, core.insert, metadata, BENCH_TABLE, values
+                    )
+                    durations.append(elapsed)
+                operations["insert"] = summarize(durations)
+
+                def select_case(name, make_where):
+                    durations = []
+                    returned = 0
+                    for _ in range(samples):
+                        core.query_cacher.clear()
+                        where = make_where()
+                        elapsed, count = _timed(
+                            lambda: sum(1 for _ in core.iter_select(
+                                metadata, BENCH_TABLE, where
+                            ))
+                        )
+                        durations.append(elapsed)
+                        returned += count
+                    operations[name] = summarize(durations)
+                    operations[name]["rows_returned"] = returned // max(samples, 1)
+
+                select_case("select_all", lambda: None)
+                select_case(
+                    "select_where_eq",
+                    lambda: ("cmp", "age", "=", rng.randrange(18, 100)),
+                )
+                select_case(
+                    "select_where_range",
+                    lambda: ("between", "age", 30, 40),
+                )
+
+                # Чередование записи и чтения: для engine=columnar показывает,
+                # перестраивается ли представление таблицы после каждой вставки
+                durations = []
+                for i in range(samples):
+                    values = [f"mixed{i}", rng.randrange(18, 100), False]
+                    where = ("cmp", "age", "=", values[1])
+
+                    def insert_select():
+                        commit(core.insert, metadata, BENCH_TABLE, values)
+                        core.query_cacher.clear()
+                        return sum(1 for _ in core.iter_select(
+                            metadata, BENCH_TABLE, where
+                        ))
+                    elapsed, _ = _timed(insert_select)
+                    durations.append(elapsed)
+                operations["insert_select"] = summarize(durations)
+
+                row_count = size + 2 * samples
+                durations = []
+                for _ in range(samples):
+                    where = ("cmp", "ID", "=", rng.randrange(1, row_count + 1))
+                    elapsed, _ = _timed(
+                        commit, core.update, metadata, BENCH_TABLE,
+                        {"age": rng.randrange(18, 100)}, where
+                    )
+                    durations.append(elapsed)
+                operations["update"] = summarize(durations)
+
+                ids = rng.sample(range(1, row_count + 1), min(samples, row_count))
+                durations = []
+                for row_id in ids:
+                    elapsed, _ = _timed(
+                        commit, core.delete, metadata, BENCH_TABLE,
+                        ("cmp", "ID", "=", row_id)
+                    )
+                    durations.append(elapsed)
+                operations["delete"] = summarize(durations)
+
+                data_bytes = sum(
+                    os.path.getsize(path) for path in utils.table_files(BENCH_TABLE)
+                    if os.path.exists(path)
+                )
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "storage": storage,
+        "engine": engine,
+        "rows": size,
+        "data_bytes": data_bytes,
+        "peak_rss_kb": peak_rss_kb(),
+        "operations": operations,
+    }
+
+def run(sizes=DEFAULT_SIZES, storages=STORAGE_MODES, samples=DEFAULT_SAMPLES, seed=0,
+        fsync=FSYNC_POLICY, engines=("rows",)):
+    """
+    Запускает все сочетания размеров таблиц, режимов хранения и движков.
+
+    Каждый случай выполняется в отдельном процессе, чтобы пиковый объем
+    памяти одного замера не влиял на другие.
+
+    Returns:
+        dict: Отчет в формате, пригодном для сохранения в JSON
+    """
+    results = []
+    for size in sizes:
+        for storage in storages:
+            for engine in engines:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    future = executor.submit(
+                        run_case, size, storage, samples, seed, fsync, engine
+                    )
+                    results.append(future.result())
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "samples": samples,
+        "seed": seed,
+        "fsync": fsync,
+        "results": results,
+    }
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Сравнивает отчет с эталонным и находит регрессии.
+
+    Регрессией считается рост p50 задержки операции больше чем
+    на долю tolerance.
+
+    Args:
+        report (dict): Текущий отчет
+        baseline (dict): Эталонный отчет
+        tolerance (float): Допустимый относительный рост задержки
+
+    Returns:
+        list: Описания регрессий
+    """
+    def case_key(case):
+        return case["storage"], case.get("engine", "rows"), case["rows"]
+
+    previous = {
+        case_key(case): case["operations"] for case in baseline.get("results", [])
+    }
+    regressions = []
+    for case in report["results"]:
+        old_operations = previous.get(case_key(case), {})
+        for name, stats in case["operations"].items():
+            old = old_operations.get(name)
+            if not old or not old["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / old["p50_ms"]
+            if ratio > 1 + tolerance:
+                regressions.append(f'{"/".join(map(str, case_key(case)))}/{name}: p50 {old["p50_ms"]} -> {stats["p50_ms"]} мс (x{ratio:.2f})') # noqa: E501
+    return regressions
+
+def main(argv=None):
+    """
+    Точка входа: python -m src.primitive_db.benchmark [параметры].
+    """
+    arg_parser = argparse.ArgumentParser(
+        description="Замер производительности операций primitive_db"
+    )
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                            help="размеры таблиц")
+    arg_parser.add_argument("--storage", nargs="+", choices=STORAGE_MODES,
+                            default=STORAGE_MODES, help="режимы хранения")
+    arg_parser.add_argument("--engine", nargs="+", choices=ENGINE_MODES,
+                            default=["rows"], help="представления таблицы в памяти")
+    arg_parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                            help="количество замеров точечных операций")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=FSYNC_POLICY,
+                            help="политика fsync")
+    arg_parser.add_argument("--output", help="файл для отчета (по умолчанию stdout)")
+    arg_parser.add_argument("--baseline", help="эталонный отчет для сравнения")
+    arg_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                            help="допустимый рост p50 (доля)")
+    args = arg_parser.parse_args(argv)
+
+    report = run(args.sizes, args.storage, args.samples, args.seed, args.fsync,
+                 args.engine)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, "w", encoding=DEFAULT_ENCODING) as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding=DEFAULT_ENCODING) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import json
+import queue
+import socket
+import threading
+
+from .constants import CLIENT_POOL_SIZE, DEFAULT_ENCODING, SERVER_HOST, SERVER_PORT
+
+# Команды, которые не изменяют базу: только их безопасно выполнить повторно
+READ_ONLY_COMMANDS = ("select", "explain", "info", "list_tables", "cache_stats", "help")
+
+
+def is_read_only(command):
+    """
+    Проверяет, что команда только читает данные.
+    """
+    words = str(command).split(None, 1)
+    return bool(words) and words[0].lower() in READ_ONLY_COMMANDS
+
+
+class Client:
+    """
+    Клиент сервера базы данных с пулом соединений.
+
+    Соединения открываются по мере необходимости (не больше pool_size
+    одновременно) и переиспользуются между запросами. Клиент можно
+    использовать из нескольких потоков.
+
+    Пример:
+        with Client(unix_path="/tmp/primitive_db.sock") as client:
+            rows = client.execute('select from users where age > 18')["result"]
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None,
+                 pool_size=CLIENT_POOL_SIZE, timeout=None):
+        if pool_size < 1:
+            raise ValueError("Размер пула должен быть положительным")
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+    def _connect(self):
+        if self.unix_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.unix_path)
+        else:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+        return sock, sock.makefile("rb")
+
+    def _request(self, payload, retry):
+        """
+        Отправляет запрос по свободному соединению пула и читает ответ.
+
+        Соединение, оборванное сервером, закрывается. Запрос повторяется
+        один раз по новому соединению, только если retry: по обрыву нельзя
+        узнать, успел ли сервер выполнить команду, поэтому изменяющие
+        команды не повторяются, а ошибка передается вызывающему.
+        """
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode(DEFAULT_ENCODING)
+
+        with self._slots:
+            for attempt in range(2):
+                try:
+                    connection = self._idle.get_nowait()
+                    reused = True
+                except queue.Empty:
+                    connection = self._connect()
+                    reused = False
+
+                sock, reader = connection
+                try:
+                    sock.sendall(data)
+                    line = reader.readline()
+                    if not line:
+                        raise ConnectionError("Сервер закрыл соединение")
+                except (ConnectionError, OSError):
+                    self._close_connection(connection)
+                    if retry and reused and attempt == 0:
+                        continue
+                    raise
+
+                self._idle.put(connection)
+                return json.loads(line.decode(DEFAULT_ENCODING))
+
+    def execute(self, command, params=None):
+        """
+        Выполняет команду на сервере.
+
+        Args:
+            command (str): Команда в грамматике REPL
+            params (list): Значения параметров ? команды
+
+        Returns:
+            dict: Ответ сервера (ok, result, output, error); для select
+                поле result содержит список записей
+
+        Raises:
+            ConnectionError: Если соединение оборвалось во время
+                изменяющей команды (выполнена ли она, неизвестно)
+        """
+        request = {"command": command}
+        if params:
+            request["params"] = list(params)
+        return self._request(request, is_read_only(command))
+
+    def execute_many(self, commands, atomic=True):
+        """
+        Выполняет пакет команд, по умолчанию - в одной транзакции.
+
+        Args:
+            commands (list): Тексты команд или пары (команда, параметры)
+            atomic (bool): Выполнять пакет в одной транзакции
+
+        Returns:
+            dict: Ответ сервера (ok, results, error)
+        """
+        items = [
+            command if isinstance(command, str)
+            else {"command": command[0], "params": list(command[1])}
+            for command in commands
+        ]
+        retry = all(
+            is_read_only(item if isinstance(item, str) else item["command"])
+            for item in items
+        )
+        return self._request({"commands": items, "atomic": atomic}, retry)
+
+    @staticmethod
+    def _close_connection(connection):
+        sock, reader = connection
+        reader.close()
+        sock.close()
+
+    def close(self):
+        """
+        Закрывает все свободные соединения пула.
+        """
+        while True:
+            try:
+                self._close_connection(self._idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,350 @@
+import bisect
+import struct
+from array import array
+from itertools import compress
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: без него используется поиск по буферам
+    np = None
+
+from .constants import DICT_MAX_RATIO
+
+INT_FORMAT = "q"
+INT_SIZE = struct.calcsize(INT_FORMAT)
+CODE_FORMAT = "i"
+CODE_SIZE = struct.calcsize(CODE_FORMAT)
+INVERT_TABLE = bytes([1]) + bytes(255)
+
+
+def build(table_data, columns):
+    """
+    Строит колоночное представление таблицы.
+
+    Столбцы int хранятся как упакованный буфер 64-битных чисел,
+    bool - как байтовая карта (по байту на строку), str - как общий
+    буфер UTF-8 и массив смещений начала каждой строки. Столбцы str
+    с небольшим числом различных значений кодируются словарем
+    (тип dict, см. dictionary_encode).
+
+    Args:
+        table_data (list): Данные таблицы в виде списка словарей
+        columns (list): Описания столбцов из метаданных
+
+    Returns:
+        dict: Колоночная таблица
+    """
+    ctable = {"length": len(table_data), "columns": {}}
+
+    for col in columns:
+        name, col_type = col["name"], col["type"]
+        values = [row.get(name) for row in table_data]
+
+        if col_type == "int":
+            try:
+                column = {"type": "int", "data": array(INT_FORMAT, values).tobytes()}
+            except (OverflowError, TypeError):
+                column = {"type": "object", "data": values}
+        elif col_type == "bool":
+            column = {"type": "bool", "data": bytes(bool(v) for v in values)}
+        else:
+            values = [str(v) for v in values]
+            column = dictionary_encode(values)
+            if column is None:
+                data, offsets = encode_strings(values)
+                column = {"type": "str", "data": data, "offsets": offsets}
+
+        ctable["columns"][name] = column
+
+    return ctable
+
+def append_rows(ctable, rows):
+    """
+    Дописывает записи в конец колоночной таблицы.
+
+    Столбцы заменяются новыми, а не изменяются на месте: старые буферы
+    может читать незавершенная выборка. Цена дописывания - копирование
+    буферов, без сборки строк таблицы в словари. Новые значения
+    столбца-словаря добавляются в словарь, даже если их доля превысит
+    DICT_MAX_RATIO: словарь пересматривается при следующем построении
+    таблицы.
+
+    Args:
+        ctable (dict): Колоночная таблица (изменяется на месте)
+        rows (list): Записи в виде словарей
+    """
+    for name, column in ctable["columns"].items():
+        values = [row.get(name) for row in rows]
+
+        if column["type"] == "int":
+            try:
+                data = array(INT_FORMAT, values).tobytes()
+                column = {"type": "int", "data": bytes(column["data"]) + data}
+            except (OverflowError, TypeError):
+                column = {"type": "object", "data": column_values(column) + values}
+        elif column["type"] == "bool":
+            data = bytes(bool(v) for v in values)
+            column = {"type": "bool", "data": bytes(column["data"]) + data}
+        elif column["type"] == "str":
+            data, offsets = encode_strings([str(v) for v in values])
+            end = column["offsets"][-1]
+            joined = array(INT_FORMAT, column["offsets"])
+            joined.extend(end + offset for offset in offsets[1:])
+            column = {"type": "str", "data": bytes(column["data"]) + data,
+                      "offsets": joined}
+        elif column["type"] == "dict":
+            codes_by_value = dict(_value_codes(column))
+            dictionary = list(column["values"])
+            codes = array(CODE_FORMAT)
+            for value in values:
+                value = str(value)
+                code = codes_by_value.get(value)
+                if code is None:
+                    code = codes_by_value[value] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(code)
+            column = {"type": "dict", "data": bytes(column["data"]) + codes.tobytes(),
+                      "values": dictionary, "codes": codes_by_value}
+        else:
+            column = {"type": "object", "data": list(column["data"]) + values}
+
+        ctable["columns"][name] = column
+
+    ctable["length"] += len(rows)
+
+def encode_strings(values):
+    """
+    Упаковывает строки в общий буфер UTF-8.
+
+    Returns:
+        tuple: (буфер, массив смещений начала каждой строки и конца буфера)
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array(INT_FORMAT, [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    return b"".join(encoded), offsets
+
+def decode_strings(data, offsets):
+    """
+    Распаковывает строки из буфера UTF-8 по массиву смещений.
+    """
+    return [
+        str(data[offsets[i]:offsets[i + 1]], "utf-8")
+        for i in range(len(offsets) - 1)
+    ]
+
+def dictionary_encode(values, max_ratio=DICT_MAX_RATIO):
+    """
+    Кодирует строковый столбец словарем.
+
+    Каждое различное значение хранится один раз в словаре, а строки -
+    как 32-битные коды (номера в словаре). Кодирование применяется,
+    только если различных значений не больше max_ratio от числа строк.
+
+    Args:
+        values (list): Значения столбца
+        max_ratio (float): Наибольшая доля различных значений
+
+    Returns:
+        dict: Столбец {"type": "dict", "data": коды, "values": словарь}
+            или None, если кодирование невыгодно
+    """
+    limit = int(len(values) * max_ratio)
+    codes_by_value = {}
+    codes = array(CODE_FORMAT)
+    for value in values:
+        code = codes_by_value.get(value)
+        if code is None:
+            if len(codes_by_value) >= limit:
+                return None
+            code = codes_by_value[value] = len(codes_by_value)
+        codes.append(code)
+
+    return {"type": "dict", "data": codes.tobytes(), "values": list(codes_by_value)}
+
+def _value_codes(column):
+    """Возвращает отображение значение -> код для столбца-словаря."""
+    codes = column.get("codes")
+    if codes is None:
+        codes = column["codes"] = {value: i for i, value in enumerate(column["values"])}
+    return codes
+
+def code_positions(column, codes):
+    """
+    Возвращает номера строк столбца-словаря, коды которых входят в codes.
+
+    Строки сравниваются один раз при выборе кодов из словаря,
+    а по столбцу сравниваются только целые коды.
+    """
+    data = column["data"]
+    if not codes:
+        return []
+
+    if np is not None:
+        values = np.frombuffer(data, dtype=np.int32)
+        return np.flatnonzero(np.isin(values, list(codes))).tolist()
+
+    if len(codes) == 1:
+        pattern = struct.pack(CODE_FORMAT, next(iter(codes)))
+        return _aligned_matches(data, pattern, CODE_SIZE)
+
+    values = array(CODE_FORMAT)
+    values.frombytes(data)
+    return [i for i, code in enumerate(values) if code in codes]
+
+def _normalize_int(value):
+    """Приводит значение условия к int или возвращает None, если это невозможно."""
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return None
+
+def _aligned_matches(buffer, pattern, width):
+    """
+    Находит номера элементов фиксированной ширины, равных pattern.
+
+    Поиск выполняется методом bytes.find, а совпадения, не выровненные
+    по границе элемента, отбрасываются.
+    """
+    positions = []
+    pos = buffer.find(pattern)
+    while pos != -1:
+        if pos % width == 0:
+            positions.append(pos // width)
+            pos = buffer.find(pattern, pos + width)
+        else:
+            pos = buffer.find(pattern, pos + 1)
+    return positions
+
+def _int_positions(data, value):
+    value = _normalize_int(value)
+    if value is None:
+        return []
+
+    if np is not None:
+        return np.flatnonzero(np.frombuffer(data, dtype=np.int64) == value).tolist()
+
+    try:
+        pattern = struct.pack(INT_FORMAT, value)
+    except struct.error:
+        return []
+    return _aligned_matches(data, pattern, INT_SIZE)
+
+def _bool_positions(data, value):
+    if value not in (True, False):
+        return []
+
+    if np is not None:
+        return np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == value).tolist()
+
+    mask = data if value else data.translate(INVERT_TABLE)
+    return list(compress(range(len(data)), mask))
+
+def _str_positions(column, value):
+    if not isinstance(value, str):
+        return []
+
+    data, offsets = column["data"], column["offsets"]
+    pattern = value.encode("utf-8")
+
+    if not pattern:
+        return [i for i in range(len(offsets) - 1) if offsets[i] == offsets[i + 1]]
+
+    positions = []
+    pos = data.find(pattern)
+    while pos != -1:
+        row = bisect.bisect_right(offsets, pos) - 1
+        if offsets[row] == pos and offsets[row + 1] - pos == len(pattern):
+            positions.append(row)
+        # Совпадение может начинаться только с начала значения, поэтому
+        # поиск продолжается со следующей строки
+        pos = data.find(pattern, offsets[row + 1])
+    return positions
+
+def column_positions(ctable, name, value):
+    """
+    Возвращает номера строк, в которых значение столбца равно value.
+
+    Returns:
+        list: Номера строк по возрастанию
+    """
+    column = ctable["columns"].get(name)
+    if column is None:
+        return [] if value is not None else list(range(ctable["length"]))
+
+    if column["type"] == "int":
+        return _int_positions(column["data"], value)
+    if column["type"] == "bool":
+        return _bool_positions(column["data"], value)
+    if column["type"] == "str":
+        return _str_positions(column, value)
+    if column["type"] == "dict":
+        code = _value_codes(column).get(value) if isinstance(value, str) else None
+        return [] if code is None else code_positions(column, {code})
+    return [i for i, item in enumerate(column["data"]) if item == value]
+
+def _value_at(column, pos):
+    if column["type"] == "int":
+        return struct.unpack_from(INT_FORMAT, column["data"], pos * INT_SIZE)[0]
+    if column["type"] == "bool":
+        return bool(column["data"][pos])
+    if column["type"] == "str":
+        offsets = column["offsets"]
+        return str(column["data"][offsets[pos]:offsets[pos + 1]], "utf-8")
+    if column["type"] == "dict":
+        code = struct.unpack_from(CODE_FORMAT, column["data"], pos * CODE_SIZE)[0]
+        return column["values"][code]
+    return column["data"][pos]
+
+def column_values(column):
+    """
+    Декодирует столбец целиком в список значений Python.
+    """
+    data = column["data"]
+    if column["type"] == "int":
+        values = array(INT_FORMAT)
+        values.frombytes(data)
+        return values.tolist()
+    if column["type"] == "bool":
+        return [bool(item) for item in data]
+    if column["type"] == "str":
+        return decode_strings(data, column["offsets"])
+    if column["type"] == "dict":
+        # Строки ссылаются на общие объекты словаря
+        codes = array(CODE_FORMAT)
+        codes.frombytes(data)
+        values = column["values"]
+        return [values[code] for code in codes]
+    return list(data)
+
+def to_rows(ctable):
+    """
+    Преобразует колоночную таблицу обратно в список словарей.
+    """
+    names = list(ctable["columns"])
+    columns = [column_values(ctable["columns"][name]) for name in names]
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+def rows_at(ctable, positions, names=None):
+    """
+    Собирает строки в виде словарей по их номерам.
+
+    Args:
+        ctable (dict): Колоночная таблица
+        positions (list): Номера строк
+        names (list): Столбцы, которые нужно декодировать (по умолчанию все)
+
+    Returns:
+        list: Строки таблицы
+    """
+    columns = ctable["columns"]
+    if names is not None:
+        columns = {name: columns[name] for name in names if name in columns}
+    return [
+        {name: _value_at(column, pos) for name, column in columns.items()}
+        for pos in positions
+    ]
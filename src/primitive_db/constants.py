@@ -1,4 +1,65 @@
 DB_META_FILE = "db_meta.json"
 DATA_DIR = "data"
 DEFAULT_ENCODING = "utf-8"
-JSON_INDENT = 2
\ No newline at end of file
+JSON_INDENT = 2
+
+COLUMN_TYPES = {"int": int, "str": str, "bool": bool}
+
+INDEX_KINDS = ("hash", "sorted")
+
+STORAGE_MODES = ("json", "log", "binary")
+ENGINE_MODES = ("rows", "columnar")
+LOG_SUFFIX = ".log.jsonl"
+BINARY_SUFFIX = ".bin"
+BINARY_MAGIC = b"PDBT"
+LOG_COMPACT_THRESHOLD = 4 * 1024 * 1024
+
+IMPORT_BATCH_SIZE = 100000
+
+CACHE_MAX_ENTRIES = 128
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BATCH_ROWS = 1024
+PAGE_SIZE = 50
+CACHE_MAX_ROWS = 10000
+
+SESSION_MAX_RESIDENT = 16
+
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+PROFILE_TOP = 15
+
+FSYNC_POLICIES = ("always", "interval", "never")
+FSYNC_POLICY = "always"
+FSYNC_INTERVAL_MS = 1000
+
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT_MS = 5000
+LOCK_RETRY_MS = 10
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7455
+CLIENT_POOL_SIZE = 4
+
+
+PARALLEL_SCAN_THRESHOLD = 200000
+PARALLEL_CHUNK_ROWS = 50000
+PARALLEL_WORKERS = None
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "min", "max", "avg")
+
+STATEMENT_CACHE_SIZE = 1024
+
+JOIN_MEMORY_ROWS = 100000
+JOIN_PARTITIONS = 16
+
+SORT_MEMORY_ROWS = 100000
+
+DICT_MAX_RATIO = 0.5
+COMPRESSION_MODES = ("none", "zlib", "lzma")
+
+ZONE_CHUNK_ROWS = 8192
+DISTINCT_SKETCH_SIZE = 64
+STATS_REBUILD_RATIO = 0.2
+PLANNER_INDEX_ROW_COST = 4
+PLANNER_RANGE_SELECTIVITY = 0.3
\ No newline at end of file
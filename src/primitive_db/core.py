@@ -1,15 +1,242 @@
-from prettytable import PrettyTable
+import time
+from itertools import groupby, islice
+from operator import itemgetter
 
-from . import utils
-from .decorators import confirm_action, create_cacher, handle_db_errors, log_time
+from . import (
+    aggregates,
+    columnar,
+    indexes,
+    joins,
+    metrics,
+    parallel,
+    planner,
+    predicates,
+    sorting,
+    utils,
+    zonemaps,
+)
+from .constants import (
+    CACHE_MAX_ROWS,
+    COLUMN_TYPES,
+    COMPRESSION_MODES,
+    ENGINE_MODES,
+    IMPORT_BATCH_SIZE,
+    LOG_COMPACT_THRESHOLD,
+    PAGE_SIZE,
+    STORAGE_MODES,
+)
+from .decorators import (
+    confirm_action,
+    create_cacher,
+    handle_db_errors,
+    log_time,
+    write_locked,
+)
 
 query_cacher = create_cacher()
 
+@metrics.timed_phase("filter")
+def _match_rows(table_data, where_clause, table_indexes=None, table_name=None,
+                table_meta=None):
+    """
+    Возвращает строки, удовлетворяющие условию WHERE.
+    
+    Условие компилируется в одну функцию проверки. Способ доступа
+    выбирает планировщик по статистике таблицы (см. planner.plan):
+    поиск по индексу проверяет только строки-кандидаты, пропуск частей -
+    только части, границы которых допускают условие. Без метаданных
+    таблицы индекс используется всегда, когда он применим.
+    Для двоичной таблицы без несохраненных изменений условие
+    вычисляется по столбцам файла (строки str со словарем сравниваются
+    по кодам), и из данных берутся только найденные строки.
+    Большие таблицы без подходящих индексов просматриваются
+    параллельно (см. parallel.match_positions).
+    """
+    node = predicates.normalize(where_clause)
+    if node is None:
+        return list(table_data)
+    
+    plan = {"access": "index"}
+    if table_meta is not None:
+        plan = planner.plan(table_meta, node, len(table_data))
+    
+    ids = None
+    if plan["access"] == "index":
+        ids = predicates.index_candidates(node, table_indexes)
+    if ids is not None:
+        table_data = indexes.find_rows_by_ids(table_data, ids)
+    elif plan["access"] == "chunks":
+        table_data = list(zonemaps.rows_in_chunks(table_data, plan["chunks"]))
+    elif (table_name is not None and utils.is_binary_table(table_name)
+            and not utils.has_pending_changes(table_name)):
+        referenced = predicates.referenced_columns(node)
+        ctable = utils.open_binary_table(table_name, names=referenced, copy=referenced)
+        # Данные без изменений совпадают с файлом построчно
+        if ctable["length"] == len(table_data):
+            return [table_data[i] for i in predicates.positions(ctable, node)]
+    elif parallel.enabled_for(len(table_data)):
+        return parallel.filter_rows(table_data, node)
+    
+    return predicates.filter_rows(table_data, node)
+
+def _allocate_id(metadata, table_name, count=1):
+    """
+    Выделяет ID для новых записей из счетчика таблицы в метаданных.
+    
+    Для таблиц, созданных до появления счетчика, он однократно
+    инициализируется максимальным ID из данных таблицы.
+    
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        count (int): Количество выделяемых ID
+    
+    Returns:
+        int: Первый выделенный ID
+    """
+    table_meta = metadata[table_name]
+    
+    if "next_id" not in table_meta:
+        table_data = utils.load_table_data(table_name)
+        max_id = max((row.get("ID", 0) for row in table_data), default=0)
+        table_meta["next_id"] = max_id + 1
+    
+    first_id = table_meta["next_id"]
+    table_meta["next_id"] += count
+    return first_id
+
+def _check_type(col_name, col_type, value):
+    """
+    Проверяет, что значение соответствует типу столбца.
+    """
+    if not isinstance(value, COLUMN_TYPES[col_type]):
+        raise ValueError(f'Столбец "{col_name}" ожидает тип {col_type}, получено {type(value).__name__}') # noqa: E501
+
+def _count_rows(table_meta, table_data, delta):
+    """
+    Обновляет количество записей таблицы в метаданных.
+    
+    Если данные таблицы загружены, количество берется из них, иначе
+    к известному значению прибавляется delta. Для таблиц, созданных
+    до появления счетчика, он заполняется при первой загрузке данных.
+    """
+    if table_data is not None:
+        table_meta["row_count"] = len(table_data)
+    elif "row_count" in table_meta:
+        table_meta["row_count"] += delta
+
+def _update_stats(table_meta, table_data, apply):
+    """
+    Обновляет статистику таблицы после записи (см. zonemaps).
+    
+    Если статистика есть, к ней применяется apply (None - изменения уже
+    учтены), иначе она строится по загруженным данным: так заполняется
+    статистика таблиц, созданных до ее появления. Статистика строится
+    заново и тогда, когда после удалений и изменений ее границы и эскизы
+    устарели (см. zonemaps.needs_rebuild). Без данных таблица остается
+    с прежней статистикой или без нее.
+    
+    Вызывается до _save_changes, чтобы статистика, перестроенная при
+    сворачивании журнала, не получила изменения повторно.
+    """
+    stats = table_meta.get("stats")
+    if stats is not None:
+        if apply is not None:
+            apply(stats)
+        if table_data is None or not zonemaps.needs_rebuild(stats, len(table_data)):
+            return
+    elif table_data is None:
+        return
+    table_meta["stats"] = zonemaps.build(table_data, table_meta["columns"])
+
+def _known_row_count(metadata, table_name):
+    """
+    Возвращает количество записей таблицы, не читая записи, или None.
+    
+    Количество берется из метаданных, резидентной копии таблицы
+    или заголовка двоичного файла.
+    """
+    table_meta = metadata[table_name]
+    if "row_count" in table_meta:
+        return table_meta["row_count"]
+    
+    resident = utils.resident_table_data(table_name)
+    if resident is not None:
+        return len(resident)
+    if utils.is_binary_table(table_name) and not utils.has_pending_changes(table_name):
+        return utils.read_binary_header(table_name)["rows"]
+    return None
+
+def _check_no_transaction(action):
+    """
+    Запрещает операции, изменяющие схему, внутри транзакции.
+    """
+    if utils.in_transaction():
+        raise ValueError(f"Операция {action} недоступна внутри транзакции")
+
+def _rebuild_indexes(metadata, table_name, table_data):
+    """
+    Перестраивает и сохраняет все индексы таблицы по актуальным данным.
+    """
+    table_meta = metadata[table_name]
+    for column, kind in table_meta.get("indexes", {}).items():
+        col_type = indexes.column_type(table_meta, column)
+        index = indexes.build_index(table_data, column, kind, col_type)
+        indexes.save_index(table_name, index)
+
+def _rebuild_stats(table_meta, table_data):
+    """Строит статистику таблицы заново по ее данным (при сворачивании журнала)."""
+    table_meta["stats"] = zonemaps.build(table_data, table_meta["columns"])
+
+def _save_changes(metadata, table_name, table_data, records, table_indexes):
+    """
+    Сохраняет изменения таблицы.
+    
+    Для таблиц с журналом изменения дописываются в журнал, а снимок
+    и индексы перезаписываются только при сворачивании журнала.
+    
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        table_data (list): Актуальные данные таблицы или None,
+            если для таблицы с журналом они не загружались
+        records (list): Записи журнала, описывающие изменения
+        table_indexes (dict): Измененные индексы таблицы
+    """
+    if metadata[table_name].get("engine") == "columnar":
+        utils.append_columnar_rows(table_name, records)
+    
+    if metadata[table_name].get("storage") == "log":
+        utils.append_table_log(table_name, records, table_data)
+        if not utils.in_transaction():
+            # Индексы изменены в памяти вместе с записью в журнал
+            log_size = utils.table_log_size(table_name)
+            for index in table_indexes.values():
+                index["log_offset"] = log_size
+        if (utils.table_log_size(table_name) > LOG_COMPACT_THRESHOLD
+                and not utils.in_transaction()):
+            if table_data is None:
+                table_data = utils.load_table_data(table_name)
+            utils.compact_table(table_name, table_data)
+            _rebuild_indexes(metadata, table_name, table_data)
+            _rebuild_stats(metadata[table_name], table_data)
+    else:
+        utils.save_table_data(table_name, table_data)
+        indexes.save_table_indexes(table_name, table_indexes)
+
 @handle_db_errors
-def create_table(metadata, table_name, columns):
+@log_time
+@write_locked
+def create_table(metadata, table_name, columns, storage="json", engine="rows",
+                 compression="none"):
     """
     Создает новую таблицу в метаданных.
+    
+    Сжатие (zlib или lzma) применяется к сегментам двоичного файла,
+    поэтому доступно только для storage=binary.
     """
+    _check_no_transaction("create_table")
+    
     if table_name in metadata:
         raise ValueError(f'Таблица "{table_name}" уже существует.')
     
@@ -23,6 +250,17 @@ def create_table(metadata, table_name, columns):
         if col_type not in valid_types:
             raise ValueError(f'Некорректный тип данных "{col_type}" для столбца "{col_name}"') # noqa: E501
     
+    if storage not in STORAGE_MODES:
+        raise ValueError(f'Некорректный режим хранения "{storage}"')
+    
+    if engine not in ENGINE_MODES:
+        raise ValueError(f'Некорректный движок выборки "{engine}"')
+    
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f'Некорректный режим сжатия "{compression}"')
+    if compression != "none" and storage != "binary":
+        raise ValueError("Сжатие поддерживается только для storage=binary")
+    
     col_names = [col[0] for col in columns_with_id]
     if len(col_names) != len(set(col_names)):
         raise ValueError("Найдены дублирующиеся имена столбцов")
@@ -32,11 +270,24 @@ def create_table(metadata, table_name, columns):
             {"name": col_name, "type": col_type}
             for col_name, col_type in columns_with_id
         ],
-        "rows": []
+        "rows": [],
+        "storage": storage,
+        "engine": engine,
+        "next_id": 1,
+        "row_count": 0,
+        "stats": zonemaps.empty([
+            {"name": col_name} for col_name, _ in columns_with_id
+        ]),
     }
+    if compression != "none":
+        table_structure["compression"] = compression
     
     metadata[table_name] = table_structure
-    utils.save_table_data(table_name, [])
+    if storage == "binary":
+        utils.save_binary_table(table_name, [], table_structure["columns"],
+                                table_structure.get("compression"))
+    else:
+        utils.save_table_data(table_name, [])
     
     columns_str = ", ".join([f"{col[0]}:{col[1]}" for col in columns_with_id])
     print(f'Таблица "{table_name}" успешно создана со столбцами: {columns_str}')
@@ -45,26 +296,258 @@ def create_table(metadata, table_name, columns):
 
 @handle_db_errors
 @confirm_action("удаление таблицы")
+@log_time
+@write_locked
 def drop_table(metadata, table_name):
     """
     Удаляет таблицу из метаданных.
     """
+    _check_no_transaction("drop_table")
+    
     if table_name not in metadata:
         raise KeyError(f'Таблица "{table_name}" не существует.')
     
+    indexes.remove_index_files(table_name, metadata[table_name].get("indexes", {}))
     del metadata[table_name]
     
-    import os
-    data_file = f"data/{table_name}.json"
-    if os.path.exists(data_file):
-        os.remove(data_file)
+    utils.remove_table_files(table_name)
     
-    query_cacher.clear()
+    query_cacher.invalidate(table_name)
     
     print(f'Таблица "{table_name}" успешно удалена.')
     
     return metadata
 
+@handle_db_errors
+@log_time
+@write_locked
+def create_index(metadata, table_name, column, kind="hash"):
+    """
+    Создает индекс по столбцу таблицы.
+    """
+    _check_no_transaction("create_index")
+    
+    if table_name not in metadata:
+        raise KeyError(f'Таблица "{table_name}" не существует.')
+    
+    column_names = [col["name"] for col in metadata[table_name]["columns"]]
+    if column not in column_names:
+        raise ValueError(f'Столбец "{column}" не существует в таблице "{table_name}".')
+    
+    table_data = utils.load_table_data(table_name)
+    col_type = indexes.column_type(metadata[table_name], column)
+    index = indexes.build_index(table_data, column, kind, col_type)
+    index["log_offset"] = utils.table_log_size(table_name)
+    indexes.save_index(table_name, index)
+    
+    metadata[table_name].setdefault("indexes", {})[column] = kind
+    
+    print(f'Индекс {kind} по столбцу "{column}" таблицы "{table_name}" успешно создан.')
+    
+    return metadata
+
+@handle_db_errors
+@log_time
+@write_locked
+def compact_table(metadata, table_name):
+    """
+    Сворачивает журнал изменений таблицы в снимок.
+    """
+    _check_no_transaction("compact")
+    
+    if table_name not in metadata:
+        raise KeyError(f'Таблица "{table_name}" не существует.')
+    
+    if not utils.table_log_size(table_name):
+        print(f'Журнал таблицы "{table_name}" пуст, сворачивать нечего.')
+        return False
+    
+    table_data = utils.load_table_data(table_name)
+    utils.compact_table(table_name, table_data)
+    _rebuild_indexes(metadata, table_name, table_data)
+    _rebuild_stats(metadata[table_name], table_data)
+    utils.save_metadata(data=metadata)
+    
+    print(f'Журнал таблицы "{table_name}" свернут, записей: {len(table_data)}.')
+    return True
+
+@handle_db_errors
+def cache_stats():
+    """
+    Выводит статистику кэша запросов.
+    """
+    stats = query_cacher.stats()
+    requests = stats["hits"] + stats["misses"]
+    hit_ratio = stats["hits"] / requests * 100 if requests else 0.0
+    
+    print(f"Попадания: {stats['hits']}")
+    print(f"Промахи: {stats['misses']} (доля попаданий {hit_ratio:.1f}%)")
+    print(f"Вытеснения: {stats['evictions']}")
+    print(f"Записей: {stats['entries']} из {stats['max_entries']}")
+    print(f"Объем: {stats['bytes']} из {stats['max_bytes']} байт")
+    
+    return stats
+
+@handle_db_errors
+def stats():
+    """
+    Выводит метрики операций и распределение их времени по фазам.
+    
+    Returns:
+        dict: Снимок метрик (см. metrics.snapshot)
+    """
+    from prettytable import PrettyTable
+    
+    snapshot = metrics.snapshot()
+    counters = {
+        (item["name"], item["labels"].get("operation")): item["value"]
+        for item in snapshot["counters"]
+    }
+    
+    operations_table = PrettyTable()
+    operations_table.field_names = [
+        "Операция", "Вызовы", "Ошибки", "Всего, мс", "p50, мс", "p99, мс", "Макс, мс"
+    ]
+    phases_table = PrettyTable()
+    phases_table.field_names = ["Операция", "Фаза", "Вызовы", "Всего, мс", "Доля, %"]
+    
+    totals = {}
+    for item in snapshot["histograms"]:
+        if item["name"] == "operation_seconds":
+            operation = item["labels"]["operation"]
+            totals[operation] = item["sum"]
+            operations_table.add_row([
+                operation,
+                counters.get(("operations_total", operation), 0),
+                counters.get(("errors_total", operation), 0),
+                f"{item['sum'] * 1000:.3f}",
+                f"{item['p50'] * 1000:.3f}",
+                f"{item['p99'] * 1000:.3f}",
+                f"{item['max'] * 1000:.3f}",
+            ])
+    
+    for item in snapshot["histograms"]:
+        if item["name"] == "phase_seconds":
+            operation = item["labels"]["operation"]
+            total = totals.get(operation)
+            share = f"{item['sum'] / total * 100:.1f}" if total else "-"
+            phases_table.add_row([
+                operation, item["labels"]["phase"], item["count"],
+                f"{item['sum'] * 1000:.3f}", share,
+            ])
+    
+    if not totals:
+        print("Метрики пока не собраны.")
+        return snapshot
+    
+    print(operations_table)
+    print(phases_table)
+    return snapshot
+
+@handle_db_errors
+def dump_stats(filepath):
+    """
+    Сохраняет метрики в файл (JSON или текстовый формат Prometheus).
+    """
+    metrics.dump(filepath)
+    print(f'Метрики сохранены в файл "{filepath}".')
+
+@handle_db_errors
+def reset_stats():
+    """
+    Сбрасывает накопленные метрики.
+    """
+    metrics.reset()
+    print("Метрики сброшены.")
+
+@handle_db_errors
+def set_profiling(mode):
+    """
+    Включает или выключает профилирование каждой команды.
+    
+    Args:
+        mode (str): off, cpu (cProfile) или memory (tracemalloc)
+    """
+    metrics.set_profile_mode(mode)
+    print(f"Режим профилирования: {mode}")
+
+@handle_db_errors
+def set_fsync(policy, interval_ms=None):
+    """
+    Задает политику fsync для фиксации изменений.
+    
+    Args:
+        policy (str): always, interval или never
+        interval_ms (int): Интервал сброса для политики interval
+    """
+    utils.set_fsync_policy(policy, interval_ms)
+    policy, interval_ms = utils.get_fsync_policy()
+    if policy == "interval":
+        print(f"Политика fsync: {policy} ({interval_ms} мс)")
+    else:
+        print(f"Политика fsync: {policy}")
+
+@handle_db_errors
+def set_parallel(threshold, workers=None):
+    """
+    Задает параметры параллельного просмотра таблиц.
+    
+    Args:
+        threshold (int): Минимальное число строк; 0 отключает просмотр
+            в пуле процессов
+        workers (int): Количество процессов; 0 - по числу ядер
+    """
+    parallel.set_options(threshold, workers)
+    threshold, workers = parallel.get_options()
+    if threshold:
+        print(f"Параллельный просмотр: от {threshold} записей, процессов: {workers}")
+    else:
+        print("Параллельный просмотр выключен.")
+
+def _active_session():
+    session = utils.get_session()
+    if session is None:
+        raise ValueError("Транзакции доступны только в сеансе работы с базой")
+    return session
+
+@handle_db_errors
+def begin_transaction():
+    """
+    Открывает транзакцию: изменения insert/update/delete/import
+    накапливаются в памяти до commit.
+    """
+    _active_session().begin()
+    print("Транзакция открыта.")
+    return True
+
+@handle_db_errors
+@log_time
+def commit():
+    """
+    Фиксирует транзакцию: каждая затронутая таблица записывается один раз.
+    
+    Если запись не удалась, транзакция отменяется (см. Session.commit).
+    """
+    try:
+        _active_session().commit()
+    except Exception:
+        # Кэш мог запомнить результаты по отброшенным данным
+        query_cacher.clear()
+        raise
+    print("Транзакция зафиксирована.")
+    return True
+
+@handle_db_errors
+def rollback():
+    """
+    Отменяет транзакцию и отбрасывает накопленные изменения.
+    """
+    _active_session().rollback()
+    # Кэш мог запомнить результаты по незафиксированным данным
+    query_cacher.clear()
+    print("Транзакция отменена.")
+    return True
+
 @handle_db_errors
 def list_tables(metadata):
     """
@@ -85,17 +568,20 @@ def info_table(metadata, table_name):
     if table_name not in metadata:
         raise KeyError(f'Таблица "{table_name}" не существует.')
     
-    table_data = utils.load_table_data(table_name)
+    row_count = _known_row_count(metadata, table_name)
+    if row_count is None:
+        row_count = len(utils.load_table_data(table_name))
     columns = metadata[table_name]["columns"]
     
     columns_str = ", ".join([f"{col['name']}:{col['type']}" for col in columns])
     
     print(f"Таблица: {table_name}")
     print(f"Столбцы: {columns_str}")
-    print(f"Количество записей: {len(table_data)}")
+    print(f"Количество записей: {row_count}")
 
 @handle_db_errors
 @log_time
+@write_locked
 def insert(metadata, table_name, values):
     """
     Вставляет новую запись в таблицу.
@@ -103,94 +589,814 @@ def insert(metadata, table_name, values):
     if table_name not in metadata:
         raise KeyError(f'Таблица "{table_name}" не существует.')
     
-    table_data = utils.load_table_data(table_name)
     columns = metadata[table_name]["columns"]
     
     if len(values) != len(columns) - 1:
         raise ValueError(f'Ожидается {len(columns)-1} значений, получено {len(values)}')
     
     for i, value in enumerate(values):
-        col_name = columns[i+1]["name"]
-        col_type = columns[i+1]["type"]
-        
-        if col_type == "int" and not isinstance(value, int):
-            raise ValueError(f'Столбец "{col_name}" ожидает тип int, получено {type(value).__name__}') # noqa: E501
-        elif col_type == "str" and not isinstance(value, str):
-            raise ValueError(f'Столбец "{col_name}" ожидает тип str, получено {type(value).__name__}') # noqa: E501
-        elif col_type == "bool" and not isinstance(value, bool):
-            raise ValueError(f'Столбец "{col_name}" ожидает тип bool, получено {type(value).__name__}') # noqa: E501
-    
-    if table_data:
-        max_id = max(row.get("ID", 0) for row in table_data)
-        new_id = max_id + 1
-    else:
-        new_id = 1
+        _check_type(columns[i+1]["name"], columns[i+1]["type"], value)
+    
+    # Таблицу с журналом не нужно читать целиком: запись дописывается в журнал
+    table_data = None
+    if metadata[table_name].get("storage") != "log":
+        table_data = utils.load_table_data(table_name)
+    
+    new_id = _allocate_id(metadata, table_name)
     
     new_row = {"ID": new_id}
     for i, value in enumerate(values):
         col_name = columns[i+1]["name"]
         new_row[col_name] = value
     
-    table_data.append(new_row)
-    utils.save_table_data(table_name, table_data)
+    table_indexes = indexes.get_table_indexes(metadata, table_name, table_data)
+    if table_data is not None:
+        table_data.append(new_row)
+    for index in table_indexes.values():
+        indexes.add_row(index, new_row)
     
-    query_cacher.clear()
+    records = [{"op": "insert", "row": new_row}]
+    _count_rows(metadata[table_name], table_data, 1)
+    _update_stats(metadata[table_name], table_data,
+                  lambda stats: zonemaps.add_rows(stats, [new_row]))
+    _save_changes(metadata, table_name, table_data, records, table_indexes)
+    utils.save_metadata(data=metadata)
+    
+    query_cacher.invalidate(table_name)
     
     print(f'Запись с ID={new_id} успешно добавлена в таблицу "{table_name}".')
     return True
 
 @handle_db_errors
 @log_time
-def select(metadata, table_name, where_clause=None):
+@write_locked
+def insert_many(metadata, table_name, rows, batch_size=IMPORT_BATCH_SIZE):
     """
-    Выбирает записи из таблицы.
+    Вставляет в таблицу поток записей пакетами.
+    
+    Типы столбцов определяются один раз, ID выдаются по счетчику таблицы,
+    а таблица, индексы и счетчик сохраняются один раз на каждый пакет.
+    
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        rows (iterable): Записи - списки значений без ID
+            или словари {столбец: значение}
+        batch_size (int): Количество записей в пакете
+    
+    Returns:
+        int: Количество вставленных записей
     """
     if table_name not in metadata:
         raise KeyError(f'Таблица "{table_name}" не существует.')
     
-    cache_key = (table_name, str(where_clause))
+    if batch_size < 1:
+        raise ValueError("Размер пакета должен быть положительным")
     
-    def get_table_data():
-        return utils.load_table_data(table_name)
+    columns = metadata[table_name]["columns"][1:]
+    column_names = [col["name"] for col in columns]
+    expected_types = [COLUMN_TYPES[col["type"]] for col in columns]
     
-    table_data = query_cacher(cache_key, get_table_data)
+    table_data = None
+    if metadata[table_name].get("storage") != "log":
+        table_data = utils.load_table_data(table_name)
+    table_indexes = indexes.get_table_indexes(metadata, table_name, table_data)
+    next_id = _allocate_id(metadata, table_name, count=0)
     
-    columns = metadata[table_name]["columns"]
+    inserted_count = 0
+    batch = []
     
-    if not table_data:
-        print(f'Таблица "{table_name}" пуста.')
-        return []
+    def flush():
+        if table_data is not None:
+            table_data.extend(batch)
+        for index in table_indexes.values():
+            indexes.add_rows(index, batch)
+        records = [{"op": "insert", "row": row} for row in batch]
+        metadata[table_name]["next_id"] = next_id
+        _count_rows(metadata[table_name], table_data, len(batch))
+        _update_stats(metadata[table_name], table_data,
+                      lambda stats: zonemaps.add_rows(stats, batch))
+        _save_changes(metadata, table_name, table_data, records, table_indexes)
+        utils.save_metadata(data=metadata)
+        query_cacher.invalidate(table_name)
+        batch.clear()
     
-    if where_clause:
-        filtered_data = []
-        for row in table_data:
-            match = True
-            for key, value in where_clause.items():
-                if row.get(key) != value:
-                    match = False
-                    break
-            if match:
-                filtered_data.append(row)
+    for row_number, values in enumerate(rows, 1):
+        if isinstance(values, dict):
+            values = [values.get(name) for name in column_names]
+        
+        if len(values) != len(columns):
+            raise ValueError(f'Запись {row_number}: ожидается {len(columns)} значений, получено {len(values)}') # noqa: E501
+        
+        new_row = {"ID": next_id}
+        for name, expected, value, col in zip(
+            column_names, expected_types, values, columns
+        ):
+            if not isinstance(value, expected):
+                raise ValueError(f'Запись {row_number}: столбец "{name}" ожидает тип {col["type"]}, получено {type(value).__name__}') # noqa: E501
+            new_row[name] = value
+        
+        batch.append(new_row)
+        next_id += 1
+        inserted_count += 1
+        
+        if len(batch) >= batch_size:
+            flush()
+    
+    if batch:
+        flush()
+    
+    print(f'В таблицу "{table_name}" добавлено записей: {inserted_count}.')
+    return inserted_count
+
+@handle_db_errors
+@log_time
+@write_locked
+def import_table(metadata, table_name, filepath, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Импортирует записи в таблицу из CSV- или JSONL-файла.
+    """
+    if table_name not in metadata:
+        raise KeyError(f'Таблица "{table_name}" не существует.')
+    
+    columns = metadata[table_name]["columns"][1:]
+    
+    if filepath.endswith(".csv"):
+        rows = utils.read_csv_rows(filepath, columns)
+    elif filepath.endswith(".jsonl"):
+        rows = utils.read_jsonl_rows(filepath)
     else:
-        filtered_data = table_data
+        raise ValueError(f'Неподдерживаемый формат файла "{filepath}". Используйте .csv или .jsonl') # noqa: E501
     
-    if filtered_data:
-        table = PrettyTable()
-        table.field_names = [col["name"] for col in columns]
+    return insert_many(metadata, table_name, rows, batch_size)
+
+def _scan_rows(metadata, table_name, where_clause=None, columns=None):
+    """
+    Лениво выдает записи таблицы, удовлетворяющие условию WHERE.
+    
+    Если задан список столбцов, записи содержат только их: двоичный
+    файл и колоночное представление не декодируют остальные столбцы,
+    а из двоичного файла они не читаются вовсе.
+    
+    Результат берется из кэша, если он там есть. Способ доступа
+    выбирает планировщик (см. planner.plan): поиск по индексу или,
+    для резидентной таблицы, просмотр только частей, границы которых
+    допускают условие. Эти выборки, выборки по двоичному файлу,
+    колоночному представлению и параллельный просмотр большой
+    резидентной таблицы вычисляются сразу, а полный просмотр читает
+    таблицу потоком и кэширует результат, только если он прочитан
+    до конца и не превышает CACHE_MAX_ROWS записей.
+    
+    Во время explain записи этапа и время их получения учитываются
+    в собираемом плане.
+    
+    Yields:
+        dict: Запись таблицы
+    """
+    plan = {"step": "scan", "table": table_name}
+    rows = _planned_scan(metadata, table_name, where_clause, columns, plan)
+    if planner.tracing():
+        rows = planner.traced(rows, plan)
+    return rows
+
+def _planned_scan(metadata, table_name, where_clause, columns, plan):
+    """
+    Выполняет просмотр для _scan_rows, дополняя plan выбранным способом.
+    """
+    node = predicates.normalize(where_clause)
+    # Отпечаток файлов в ключе отсекает результаты, устаревшие
+    # из-за изменений, сделанных другим процессом
+    stamp = utils.file_stamp(utils.table_files(table_name))
+    cache_key = (table_name, stamp, str(node), columns and tuple(columns))
+    found, cached_rows = query_cacher.get(cache_key, table_name)
+    if found:
+        plan["access"] = "cache"
+        yield from cached_rows
+        return
+    
+    table_meta = metadata[table_name]
+    # Части пропускаются только в резидентной таблице: иначе ради них
+    # пришлось бы загрузить таблицу целиком вместо чтения потоком
+    resident = utils.resident_table_data(table_name)
+    plan.update(planner.plan(
+        table_meta, node, _known_row_count(metadata, table_name),
+        allow_chunks=resident is not None,
+    ))
+    
+    filtered_data = None
+    ids = None
+    if plan["access"] == "index":
+        table_indexes = indexes.get_table_indexes(metadata, table_name)
+        ids = predicates.index_candidates(node, table_indexes)
+        if ids is None:
+            plan["access"] = "scan"
+    
+    referenced = predicates.referenced_columns(node)
+    # Столбцы, нужные для проверки условия, читаются, даже если
+    # они не входят в результат
+    scan_columns = columns
+    if columns is not None:
+        scan_columns = columns + sorted(referenced - set(columns))
+    
+    if ids is not None:
+        table_data = utils.load_table_data(table_name)
+        predicate = predicates.compile_predicate(node)
+        candidates = indexes.find_rows_by_ids(table_data, ids)
+        filtered_data = list(utils.project_rows(
+            (row for row in candidates if predicate(row)), columns
+        ))
+    elif plan["access"] == "chunks":
+        predicate = predicates.compile_predicate(node)
+        candidates = zonemaps.rows_in_chunks(resident, plan["chunks"])
+        filtered_data = list(utils.project_rows(
+            (row for row in candidates if predicate(row)), columns
+        ))
+    elif (node and utils.is_binary_table(table_name)
+            and not utils.has_pending_changes(table_name)):
+        plan["method"] = "binary"
+        ctable = utils.open_binary_table(
+            table_name, names=scan_columns, copy=referenced
+        )
+        filtered_data = columnar.rows_at(
+            ctable, predicates.positions(ctable, node), columns
+        )
+    elif node and table_meta.get("engine") == "columnar":
+        plan["method"] = "columnar"
+        ctable = utils.load_columnar_table(table_name, table_meta["columns"])
+        filtered_data = columnar.rows_at(
+            ctable, predicates.positions(ctable, node), columns
+        )
+    elif node:
+        # Таблица, еще не загруженная в сеанс, по-прежнему читается потоком
+        if resident is not None and parallel.enabled_for(len(resident)):
+            plan["method"] = "parallel"
+            filtered_data = list(utils.project_rows(
+                parallel.filter_rows(resident, node), columns
+            ))
+    
+    if filtered_data is not None:
+        query_cacher.put(cache_key, filtered_data, table_name)
+        yield from filtered_data
+        return
+    
+    plan.setdefault("method", "stream")
+    predicate = predicates.compile_predicate(node)
+    rows = (
+        row for row in utils.iter_table_rows(table_name, scan_columns) if predicate(row)
+    )
+    if scan_columns != columns:
+        rows = utils.project_rows(rows, columns)
+    
+    collected = []
+    for row in rows:
+        if collected is not None:
+            collected.append(row)
+            if len(collected) > CACHE_MAX_ROWS:
+                collected = None
+        yield row
+    
+    if collected is not None:
+        query_cacher.put(cache_key, collected, table_name)
+
+def _projected_columns(metadata, table_name, columns):
+    """
+    Возвращает описания выбранных столбцов в порядке запроса.
+    
+    Raises:
+        ValueError: Если столбца нет в таблице
+    """
+    table_columns = metadata[table_name]["columns"]
+    if columns is None:
+        return table_columns
+    
+    by_name = {col["name"]: col for col in table_columns}
+    for name in columns:
+        if name not in by_name:
+            raise ValueError(f'Столбец "{name}" не существует в таблице "{table_name}".') # noqa: E501
+    return [by_name[name] for name in columns]
+
+def _join_schemas(metadata, table_name, join):
+    """
+    Возвращает имена столбцов соединяемых таблиц {таблица: [столбец, ...]}.
+    """
+    right = join["table"]
+    for name in (table_name, right):
+        if name not in metadata:
+            raise KeyError(f'Таблица "{name}" не существует.')
+    if right == table_name:
+        raise ValueError("Соединение таблицы с самой собой не поддерживается")
+    
+    return {
+        name: [col["name"] for col in metadata[name]["columns"]]
+        for name in (table_name, right)
+    }
+
+def _join_output(metadata, table_name, join, columns):
+    """
+    Возвращает описания столбцов результата соединения.
+    """
+    schemas = _join_schemas(metadata, table_name, join)
+    if columns is None:
+        return [
+            {"name": joins.qualified(name, col["name"]), "type": col["type"]}
+            for name in schemas for col in metadata[name]["columns"]
+        ]
+    
+    result = []
+    for column in columns:
+        name, column = joins.resolve(column, schemas)
+        col_type = next(col["type"] for col in metadata[name]["columns"]
+                        if col["name"] == column)
+        result.append({"name": joins.qualified(name, column), "type": col_type})
+    return result
+
+def _join_rows(metadata, table_name, join, where_clause=None, columns=None):
+    """
+    Лениво выдает записи соединения таблицы с join["table"] по join["on"].
+    
+    Ветви условия WHERE, относящиеся к одной таблице, проверяются до
+    соединения при ее чтении (с использованием индексов и кэша, см.
+    _scan_rows), из каждой таблицы читаются только нужные столбцы.
+    Хэш-таблица строится по таблице с меньшим числом записей; если
+    у большей таблицы есть индекс по столбцу соединения, ее строки
+    находятся по ключам хэш-таблицы, а не полным просмотром.
+    Сторона построения, не умещающаяся в JOIN_MEMORY_ROWS записей,
+    раскладывается по разделам на диске (см. joins.hash_join).
+    
+    Записи результата содержат полные имена столбцов "таблица.столбец".
+    
+    Yields:
+        dict: Запись соединения
+    """
+    right = join["table"]
+    schemas = _join_schemas(metadata, table_name, join)
+    
+    on = [joins.resolve(name, schemas) for name in join["on"]]
+    keys = dict(on)
+    if len(keys) != 2:
+        raise ValueError("Условие ON должно связывать столбцы обеих таблиц")
+    
+    pushed, residual = joins.split_where(predicates.normalize(where_clause), schemas)
+    
+    # Столбцы, читаемые из каждой таблицы: выбранные, ключ соединения
+    # и столбцы условий, которые проверяются после соединения
+    side_columns = {name: None for name in schemas}
+    output = None
+    if columns is not None:
+        output = [col["name"] for col in _join_output(metadata, table_name, join, columns)] # noqa: E501
+        side_columns = {name: [] for name in schemas}
+        needed = [joins.resolve(name, schemas) for name in output]
+        needed += on
+        needed += [joins.resolve(name, schemas)
+                   for name in sorted(predicates.referenced_columns(residual))]
+        for name, column in needed:
+            if column not in side_columns[name]:
+                side_columns[name].append(column)
+    
+    def estimate(name):
+        count = _known_row_count(metadata, name)
+        return float("inf") if count is None else count
+    
+    build = min((right, table_name), key=estimate)
+    probe = right if build == table_name else table_name
+    # Записи упорядочены по ID, поэтому ID ищется без индекса
+    probe_indexed = (keys[probe] == "ID"
+                     or keys[probe] in metadata[probe].get("indexes", {}))
+    
+    step = {"step": "join", "table": f"{table_name}, {right}", "access": "join",
+            "strategy": "hash"}
+    
+    def probe_rows(build_table):
+        if build_table is None or not probe_indexed:
+            metrics.increment("joins_total", {"strategy": "hash"})
+            return _scan_rows(metadata, probe, pushed[probe], side_columns[probe])
+        
+        metrics.increment("joins_total", {"strategy": "index"})
+        step["strategy"] = "index"
+        # Ключи другого типа не совпадут ни с одной строкой (как и при
+        # полном просмотре), а в двоичном поиске их нельзя сравнивать
+        col_type = indexes.column_type(metadata[probe], keys[probe])
+        values = {indexes.column_key(value, col_type) for value in build_table}
+        values.discard(None)
+        if keys[probe] == "ID":
+            ids = values
+        else:
+            index = indexes.get_table_indexes(metadata, probe)[keys[probe]]
+            ids = {row_id for value in values
+                   for row_id in indexes.lookup(index, value)}
+        candidates = utils.load_rows_by_ids(probe, ids)
+        return utils.project_rows(
+            predicates.filter_rows(candidates, pushed[probe]), side_columns[probe]
+        )
+    
+    left_prefix = f"{table_name}."
+    right_prefix = f"{right}."
+    
+    def combine(build_row, probe_row):
+        left_row, right_row = build_row, probe_row
+        if build != table_name:
+            left_row, right_row = probe_row, build_row
+        row = {left_prefix + key: value for key, value in left_row.items()}
+        for key, value in right_row.items():
+            row[right_prefix + key] = value
+        return row
+    
+    rows = joins.hash_join(
+        _scan_rows(metadata, build, pushed[build], side_columns[build]), keys[build],
+        probe_rows, keys[probe], combine,
+    )
+    if residual is not None:
+        rows = filter(predicates.compile_predicate(residual), rows)
+    if planner.tracing():
+        rows = planner.traced(rows, step)
+    return utils.project_rows(rows, output)
+
+def _output_names(metadata, table_name, join, columns):
+    """
+    Проверяет имена столбцов и возвращает их в том виде, в котором
+    они будут в записях результата.
+    """
+    if join is not None:
+        return [col["name"] for col in _join_output(metadata, table_name, join, columns)] # noqa: E501
+    return [col["name"] for col in _projected_columns(metadata, table_name, columns)]
+
+def _check_order_by(order_by):
+    for item, _ in order_by:
+        if not isinstance(item, str):
+            raise ValueError(f'Сортировка по "{aggregates.output_name(item)}" возможна только в запросе с агрегатами') # noqa: E501
+
+def _ordered(rows, order_by, offset, stop):
+    """
+    Упорядочивает записи и применяет OFFSET и LIMIT.
+    
+    С LIMIT первые записи отбираются кучей (см. sorting.top_k),
+    без него записи сортируются полностью, при необходимости - на диске
+    (см. sorting.sort_rows).
+    """
+    if stop is not None:
+        return iter(sorting.top_k(rows, order_by, stop)[offset:])
+    return islice(sorting.sort_rows(rows, order_by), offset, None)
+
+def iter_select(metadata, table_name, where_clause=None, limit=None, offset=0,
+                columns=None, join=None, order_by=None):
+    """
+    Возвращает ленивый итератор по результату выборки.
+    
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        where_clause (tuple или dict): Условие выборки
+            (см. parser.parse_where_clause)
+        limit (int): Максимальное количество записей
+        offset (int): Количество пропускаемых записей
+        columns (list): Выбираемые столбцы (по умолчанию все)
+        join (dict): Соединение {"table": таблица, "on": (столбец, столбец)}
+            (см. _join_rows)
+        order_by (list): Пары (столбец, по_убыванию) для сортировки
+    
+    Returns:
+        iterator: Записи таблицы
+    """
+    if table_name not in metadata:
+        raise KeyError(f'Таблица "{table_name}" не существует.')
+    
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("LIMIT и OFFSET не могут быть отрицательными")
+    
+    if columns is not None:
+        columns = _output_names(metadata, table_name, join, columns)
+    
+    # Столбцы сортировки читаются, даже если не входят в результат
+    read_columns = columns
+    if order_by:
+        _check_order_by(order_by)
+        order_names = _output_names(metadata, table_name, join,
+                                    [name for name, _ in order_by])
+        order_by = [(name, descending)
+                    for name, (_, descending) in zip(order_names, order_by)]
+        if columns is not None:
+            read_columns = columns + [name for name in order_names if name not in columns] # noqa: E501
+    
+    if join is not None:
+        rows = _join_rows(metadata, table_name, join, where_clause, read_columns)
+    else:
+        rows = _scan_rows(metadata, table_name, where_clause, read_columns)
+    
+    stop = None if limit is None else offset + limit
+    if not order_by:
+        return islice(rows, offset, stop)
+    
+    rows = _ordered(rows, order_by, offset, stop)
+    if read_columns != columns:
+        rows = utils.project_rows(rows, columns)
+    return rows
+
+@metrics.timed_phase("render")
+def _print_pages(rows, columns, page_size=PAGE_SIZE):
+    """
+    Выводит записи постранично, не накапливая весь результат.
+    
+    Returns:
+        int: Количество выведенных записей
+    """
+    # prettytable загружается только при выводе, а не при запуске
+    from prettytable import PrettyTable
+    
+    field_names = [col["name"] for col in columns]
+    printed_count = 0
+    
+    while True:
+        page = list(islice(rows, page_size))
+        if not page:
+            return printed_count
         
-        for row in filtered_data:
-            table_row = []
-            for col in columns:
-                table_row.append(row.get(col["name"], ""))
-            table.add_row(table_row)
+        table = PrettyTable()
+        table.field_names = field_names
+        for row in page:
+            table.add_row([row.get(name, "") for name in field_names])
         
         print(table)
+        printed_count += len(page)
+
+def print_rows(rows):
+    """
+    Выводит список записей таблицей; столбцы берутся из первой записи.
+    
+    Returns:
+        int: Количество выведенных записей
+    """
+    if not rows:
+        return 0
+    return _print_pages(iter(rows), [{"name": name} for name in rows[0]])
+
+@handle_db_errors
+@log_time
+def select(metadata, table_name, where_clause=None, limit=None, offset=0,
+           columns=None, join=None, order_by=None):
+    """
+    Выбирает записи из таблицы и выводит их постранично.
+    
+    Args:
+        columns (list): Выводимые столбцы (по умолчанию все)
+        join (dict): Соединение с другой таблицей (см. iter_select)
+        order_by (list): Пары (столбец, по_убыванию) для сортировки
+    
+    Returns:
+        int: Количество выведенных записей
+    """
+    rows = iter_select(metadata, table_name, where_clause, limit, offset, columns,
+                       join, order_by)
+    rows = metrics.timed_iter(rows, "filter")
+    if join is not None:
+        output = _join_output(metadata, table_name, join, columns)
     else:
+        output = _projected_columns(metadata, table_name, columns)
+    printed_count = _print_pages(rows, output)
+    
+    if printed_count:
+        return printed_count
+    
+    if where_clause or offset or join:
+        print("Записи не найдены.")
+    else:
+        print(f'Таблица "{table_name}" пуста.')
+    return 0
+
+@handle_db_errors
+@log_time
+def select_rows(metadata, table_name, where_clause=None, limit=None, offset=0,
+                columns=None, join=None, order_by=None):
+    """
+    Выбирает записи из таблицы и возвращает их списком, не выводя.
+    
+    Returns:
+        list: Найденные записи
+    """
+    rows = iter_select(metadata, table_name, where_clause, limit, offset, columns,
+                       join, order_by)
+    return list(metrics.timed_iter(rows, "filter"))
+
+def _aggregate_from_indexes(metadata, table_name, items, node, group_by):
+    """
+    Пытается вычислить агрегаты без чтения записей.
+    
+    COUNT(*) берется из метаданных или, для одного условия по
+    индексированному столбцу, из числа найденных индексом ID;
+    MIN и MAX - из краев сортированного индекса; COUNT(*) с группировкой
+    по одному индексированному столбцу - из размеров списков ID индекса.
+    Группы упорядочиваются по наименьшему ID, как при просмотре таблицы,
+    где группа появляется вместе с первой своей записью.
+    
+    Returns:
+        list: Строки результата или None, если индексов недостаточно
+    """
+    functions = [item for item in items if not isinstance(item, str)]
+    table_indexes = {}
+    if metadata[table_name].get("indexes"):
+        table_indexes = indexes.get_table_indexes(metadata, table_name)
+    
+    if group_by:
+        index = table_indexes.get(group_by[0])
+        if (node is not None or len(group_by) != 1 or index is None
+                or any(item != ("count", "*") for item in functions)):
+            return None
+        
+        if index["kind"] == "hash":
+            groups = [(min(ids), indexes.decode_key(key), len(ids))
+                      for key, ids in index["entries"].items() if ids]
+        else:
+            groups = []
+            pairs = zip(index["values"], index["ids"])
+            for value, group in groupby(pairs, key=itemgetter(0)):
+                ids = [pair[1] for pair in group]
+                groups.append((min(ids), value, len(ids)))
+        groups.sort(key=itemgetter(0))
+        return [
+            aggregates.finalize(items, group_by, (value,),
+                                aggregates.counted_state(items, count))
+            for _, value, count in groups
+        ]
+    
+    if node is not None:
+        # Для одиночного условия кандидаты индекса совпадают с результатом
+        if node[0] in ("and", "or") or any(item != ("count", "*") for item in functions): # noqa: E501
+            return None
+        ids = predicates.index_candidates(node, table_indexes)
+        if ids is None:
+            return None
+        return [aggregates.finalize(items, (), (), aggregates.counted_state(items, len(ids)))] # noqa: E501
+    
+    row_count = None
+    state = aggregates.counted_state(items, 0)
+    for accumulator, (func, column) in zip(state, functions):
+        if column == "*":
+            if row_count is None:
+                row_count = _known_row_count(metadata, table_name)
+            if row_count is None:
+                return None
+            accumulator[0] = row_count
+            continue
+        
+        index = table_indexes.get(column)
+        if func not in ("min", "max") or index is None or index["kind"] != "sorted":
+            return None
+        values = index["values"]
+        accumulator[0] = len(values)
+        if values:
+            accumulator[2], accumulator[3] = values[0], values[-1]
+    return [aggregates.finalize(items, (), (), state)]
+
+def _compute_aggregates(metadata, table_name, items, where_clause, group_by,
+                        limit, offset, join=None, order_by=None):
+    """
+    Вычисляет агрегаты по индексам или одним проходом по записям.
+    
+    Для соединения столбцы агрегатов и группировки приводятся
+    к полным именам "таблица.столбец". Сортировать можно по столбцам
+    группировки и агрегатам, входящим в результат.
+    """
+    if table_name not in metadata:
+        raise KeyError(f'Таблица "{table_name}" не существует.')
+    
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("LIMIT и OFFSET не могут быть отрицательными")
+    
+    group_by = list(group_by or ())
+    order_by = list(order_by or ())
+    columns = metadata[table_name]["columns"]
+    if join is not None:
+        schemas = _join_schemas(metadata, table_name, join)
+        
+        def qualify(name):
+            return name if name == "*" else joins.qualified(*joins.resolve(name, schemas)) # noqa: E501
+        
+        def qualify_item(item):
+            return qualify(item) if isinstance(item, str) else (item[0], qualify(item[1])) # noqa: E501
+        
+        items = [qualify_item(item) for item in items]
+        group_by = [qualify(name) for name in group_by]
+        order_by = [(qualify_item(item), descending) for item, descending in order_by]
+        columns = _join_output(metadata, table_name, join, None)
+    aggregates.validate(items, group_by, columns)
+    
+    output = [aggregates.output_name(item) for item in items]
+    order_by = [(aggregates.output_name(item), descending) for item, descending in order_by] # noqa: E501
+    for name, _ in order_by:
+        if name not in output:
+            raise ValueError(f'Столбец "{name}" в ORDER BY должен входить в результат')
+    
+    node = predicates.normalize(where_clause)
+    result = None
+    if join is None:
+        result = _aggregate_from_indexes(metadata, table_name, items, node, group_by)
+        if result is not None:
+            planner.record({"step": "aggregate", "table": table_name,
+                            "access": "aggregate", "actual": len(result)})
+    if result is None:
+        needed = aggregates.referenced_columns(items, group_by) or [columns[0]["name"]]
+        rows = iter_select(metadata, table_name, where_clause, columns=needed,
+                           join=join)
+        result = aggregates.compute(metrics.timed_iter(rows, "filter"), items, group_by)
+    
+    stop = None if limit is None else offset + limit
+    if order_by:
+        return list(_ordered(result, order_by, offset, stop))
+    return result[offset:stop]
+
+@handle_db_errors
+@log_time
+def aggregate(metadata, table_name, items, where_clause=None, group_by=None,
+              limit=None, offset=0, join=None, order_by=None):
+    """
+    Вычисляет агрегатные функции (COUNT, SUM, MIN, MAX, AVG) и выводит их.
+    
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        items (list): Столбцы группировки и пары (функция, столбец),
+            например ["city", ("count", "*"), ("avg", "age")]
+        where_clause (tuple или dict): Условие выборки
+        group_by (list): Столбцы группировки
+        limit (int): Максимальное количество групп
+        offset (int): Количество пропускаемых групп
+        join (dict): Соединение с другой таблицей (см. iter_select)
+        order_by (list): Пары (столбец или агрегат, по_убыванию)
+    
+    Returns:
+        list: Строки результата
+    """
+    result = _compute_aggregates(metadata, table_name, items, where_clause, group_by,
+                                 limit, offset, join, order_by)
+    
+    if not result:
         print("Записи не найдены.")
+        return result
     
-    return filtered_data
+    print_rows(result)
+    return result
 
 @handle_db_errors
+@log_time
+def aggregate_rows(metadata, table_name, items, where_clause=None, group_by=None,
+                   limit=None, offset=0, join=None, order_by=None):
+    """
+    Вычисляет агрегатные функции и возвращает строки результата, не выводя.
+    
+    Returns:
+        list: Строки результата
+    """
+    return _compute_aggregates(metadata, table_name, items, where_clause, group_by,
+                               limit, offset, join, order_by)
+
+@handle_db_errors
+def explain(run, collect_rows=False):
+    """
+    Выполняет выборку и выводит ее план вместо записей.
+    
+    Для каждого этапа (просмотр таблицы, соединение, агрегаты по
+    индексам) выводятся выбранный способ доступа, оценка числа записей
+    по статистике, фактическое число записей и время этапа.
+    
+    Args:
+        run (callable): Функция, выполняющая выборку и возвращающая
+            список записей (или None при ошибке)
+        collect_rows (bool): Возвращать строки плана, не выводя их
+    
+    Returns:
+        list: Строки плана или None при ошибке
+    """
+    with planner.trace() as steps:
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+    
+    if result is None:
+        return None
+    
+    def milliseconds(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.2f}"
+    
+    report = [
+        {
+            "Этап": step["step"],
+            "Таблица": step["table"],
+            "Доступ": planner.describe(step),
+            "Оценка строк": "-" if step.get("estimated") is None else step["estimated"], # noqa: E501
+            "Строк": step.get("actual", "-"),
+            "Время мс": milliseconds(step.get("seconds")),
+        }
+        for step in steps
+    ]
+    report.append({"Этап": "результат", "Таблица": "", "Доступ": "",
+                   "Оценка строк": "", "Строк": len(result),
+                   "Время мс": milliseconds(elapsed)})
+    if not collect_rows:
+        print_rows(report)
+    return report
+
+@handle_db_errors
+@log_time
+@write_locked
 def update(metadata, table_name, set_clause, where_clause):
     """
     Обновляет записи в таблице.
@@ -208,35 +1414,42 @@ def update(metadata, table_name, set_clause, where_clause):
     
     column_types = {col["name"]: col["type"] for col in columns}
     for key, value in set_clause.items():
-        col_type = column_types[key]
-        
-        if col_type == "int" and not isinstance(value, int):
-            raise ValueError(f'Столбец "{key}" ожидает тип int, получено {type(value).__name__}') # noqa: E501
-        elif col_type == "str" and not isinstance(value, str):
-            raise ValueError(f'Столбец "{key}" ожидает тип str, получено {type(value).__name__}') # noqa: E501
-        elif col_type == "bool" and not isinstance(value, bool):
-            raise ValueError(f'Столбец "{key}" ожидает тип bool, получено {type(value).__name__}') # noqa: E501
+        _check_type(key, column_types[key], value)
+    
+    table_indexes = indexes.get_table_indexes(metadata, table_name, table_data)
+    touched_indexes = {
+        column: index for column, index in table_indexes.items()
+        if column in set_clause
+    }
     
     updated_count = 0
     updated_ids = []
-    for row in table_data:
-        match = True
-        if where_clause:
-            for key, value in where_clause.items():
-                if row.get(key) != value:
-                    match = False
-                    break
-        
-        if match:
-            updated_count += 1
-            updated_ids.append(row.get("ID"))
-            for key, value in set_clause.items():
-                row[key] = value
+    stats = metadata[table_name].get("stats")
+    matched = _match_rows(table_data, where_clause, table_indexes, table_name,
+                          metadata[table_name])
+    for row in matched:
+        updated_count += 1
+        updated_ids.append(row.get("ID"))
+        for index in touched_indexes.values():
+            indexes.remove_row(index, row)
+        if stats is not None:
+            zonemaps.update_row(stats, row, set_clause)
+        for key, value in set_clause.items():
+            row[key] = value
+        for index in touched_indexes.values():
+            indexes.add_row(index, row)
     
     if updated_count > 0:
-        utils.save_table_data(table_name, table_data)
+        records = [{"op": "update", "ids": updated_ids, "set": set_clause}]
+        # Файлы остальных индексов не меняются, но индексы таблицы
+        # с журналом должны учесть новое смещение журнала
+        if metadata[table_name].get("storage") == "log":
+            touched_indexes = table_indexes
+        _update_stats(metadata[table_name], table_data, None)
+        _save_changes(metadata, table_name, table_data, records, touched_indexes)
+        utils.save_metadata(data=metadata)
         
-        query_cacher.clear()
+        query_cacher.invalidate(table_name)
         
         ids_str = ", ".join(map(str, updated_ids))
         print(f'Записи с ID={ids_str} в таблице "{table_name}" успешно обновлено.')
@@ -247,6 +1460,8 @@ def update(metadata, table_name, set_clause, where_clause):
 
 @handle_db_errors
 @confirm_action("удаление записей")
+@log_time
+@write_locked
 def delete(metadata, table_name, where_clause):
     """
     Удаляет записи из таблицы.
@@ -256,28 +1471,31 @@ def delete(metadata, table_name, where_clause):
     
     table_data = utils.load_table_data(table_name)
     
+    table_indexes = indexes.get_table_indexes(metadata, table_name, table_data)
+    
     if where_clause:
-        new_data = []
-        deleted_ids = []
-        for row in table_data:
-            match = True
-            for key, value in where_clause.items():
-                if row.get(key) != value:
-                    match = False
-                    break
-            
-            if match:
-                deleted_ids.append(row.get("ID"))
-            else:
-                new_data.append(row)
+        deleted_rows = _match_rows(table_data, where_clause, table_indexes, table_name,
+                                   metadata[table_name])
+        deleted_set = {row.get("ID") for row in deleted_rows}
+        new_data = [row for row in table_data if row.get("ID") not in deleted_set]
     else:
+        deleted_rows = table_data
         new_data = []
-        deleted_ids = [row.get("ID") for row in table_data]
+    deleted_ids = [row.get("ID") for row in deleted_rows]
     
     if deleted_ids:
-        utils.save_table_data(table_name, new_data)
+        for index in table_indexes.values():
+            for row in deleted_rows:
+                indexes.remove_row(index, row)
         
-        query_cacher.clear()
+        records = [{"op": "delete", "ids": deleted_ids}]
+        _count_rows(metadata[table_name], new_data, -len(deleted_ids))
+        _update_stats(metadata[table_name], new_data,
+                      lambda stats: zonemaps.remove_rows(stats, deleted_rows))
+        _save_changes(metadata, table_name, new_data, records, table_indexes)
+        utils.save_metadata(data=metadata)
+        
+        query_cacher.invalidate(table_name)
         
         for row_id in deleted_ids:
             print(f'Запись с ID={row_id} успешно удалена из таблицы "{table_name}".')
@@ -1,30 +1,62 @@
-import time
+import sys
+from collections import OrderedDict
 from functools import wraps
 
+from . import metrics, utils
+from .constants import CACHE_MAX_BYTES, CACHE_MAX_ENTRIES
+
+_last_error = None
+
+def get_last_error():
+    """
+    Возвращает последнюю ошибку, перехваченную handle_db_errors, и сбрасывает ее.
+    """
+    global _last_error
+    error, _last_error = _last_error, None
+    return error
 
 def handle_db_errors(func):
     """
     Декоратор для обработки ошибок в операциях с базой данных.
-    Перехватывает KeyError, ValueError, FileNotFoundError.
+    Перехватывает KeyError, ValueError, FileNotFoundError, TimeoutError.
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
+        global _last_error
         try:
             return func(*args, **kwargs)
         except KeyError as e:
+            _last_error = e
             print(f"Ошибка: {e}")
             return None
         except ValueError as e:
+            _last_error = e
             print(f"Ошибка валидации: {e}")
             return None
         except FileNotFoundError as e:
+            _last_error = e
             print(f"Файл не найден: {e}")
             return None
+        except TimeoutError as e:
+            _last_error = e
+            print(f"Ошибка: {e}")
+            return None
         except Exception as e:
+            _last_error = e
             print(f"Неизвестная ошибка: {e}")
             return None
     return wrapper
 
+_auto_confirm = False
+
+def set_auto_confirm(value):
+    """
+    Включает автоматическое подтверждение опасных операций
+    (для неинтерактивных режимов работы).
+    """
+    global _auto_confirm
+    _auto_confirm = value
+
 def confirm_action(action_name):
     """
     Фабрика декораторов для запроса подтверждения действий.
@@ -35,6 +67,8 @@ def confirm_action(action_name):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            if _auto_confirm:
+                return func(*args, **kwargs)
             response = input(f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: ').strip().lower() # noqa: E501
             if response == 'y':
                 return func(*args, **kwargs)
@@ -49,48 +83,144 @@ def confirm_action(action_name):
 def log_time(func):
     """
     Декоратор для замера времени выполнения функции.
+    
+    Время и число вызовов записываются в метрики операции с именем
+    функции (см. metrics.operation) и выводятся командой stats.
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.monotonic()
-        result = func(*args, **kwargs)
-        end_time = time.monotonic()
-        elapsed = end_time - start_time
-        print(f"Функция {func.__name__} выполнилась за {elapsed:.3f} секунд")
-        return result
+        with metrics.operation(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def write_locked(func):
+    """
+    Декоратор для операций, изменяющих таблицу.
+    
+    Выполняет функцию вида func(metadata, table_name, ...) под
+    межпроцессной блокировкой таблицы (см. utils.table_write_lock).
+    """
+    @wraps(func)
+    def wrapper(metadata, table_name, *args, **kwargs):
+        with utils.table_write_lock(table_name):
+            return func(metadata, table_name, *args, **kwargs)
     return wrapper
 
-def create_cacher():
+def _estimate_size(value):
+    """
+    Приблизительно оценивает объем памяти, занимаемый значением, в байтах.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + _estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += _estimate_size(item)
+    return size
+
+def create_cacher(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
     """
     Функция для создания замыкания с кэшем.
     
+    Кэш вытесняет давно не использованные записи (LRU), когда превышен
+    лимит количества записей или их суммарного объема. Каждая запись
+    привязана к версии своей таблицы: изменение таблицы увеличивает
+    версию и делает устаревшими только ее записи.
+    
+    Args:
+        max_entries (int): Максимальное количество записей
+        max_bytes (int): Максимальный суммарный объем записей в байтах
+    
     Returns:
         function: Функция cache_result для кэширования результатов
     """
-    cache = {}
+    cache = OrderedDict()
+    versions = {}
+    stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
     
-    def cache_result(key, value_func):
+    def drop(key):
+        _, _, size = cache.pop(key)
+        stats["bytes"] -= size
+    
+    def cache_result(key, value_func, table_name=None):
         """
         Кэширует результаты выполнения функции.
         
         Args:
             key (hashable): Ключ для кэша
             value_func (callable): Функция для получения значения
+            table_name (str): Таблица, от которой зависит результат
             
         Returns:
             Результат выполнения value_func (из кэша или новый)
         """
-        if key in cache:
-            return cache[key]
+        found, value = get(key, table_name)
+        if found:
+            return value
         
         result = value_func()
-        cache[key] = result
+        put(key, result, table_name)
         return result
     
+    def get(key, table_name=None):
+        """
+        Ищет актуальную запись в кэше.
+        
+        Returns:
+            tuple: (найдена ли запись, значение)
+        """
+        if key in cache:
+            value, entry_version, _ = cache[key]
+            if entry_version == versions.get(table_name, 0):
+                cache.move_to_end(key)
+                stats["hits"] += 1
+                return True, value
+            drop(key)
+        
+        stats["misses"] += 1
+        return False, None
+    
+    def put(key, value, table_name=None):
+        """Сохраняет значение в кэш, вытесняя старые записи при необходимости"""
+        size = _estimate_size(value)
+        if size > max_bytes:
+            return
+        
+        if key in cache:
+            drop(key)
+        cache[key] = (value, versions.get(table_name, 0), size)
+        stats["bytes"] += size
+        
+        while len(cache) > max_entries or stats["bytes"] > max_bytes:
+            drop(next(iter(cache)))
+            stats["evictions"] += 1
+    
+    def invalidate(table_name):
+        """Делает устаревшими записи кэша, относящиеся к таблице"""
+        versions[table_name] = versions.get(table_name, 0) + 1
+    
     def clear_cache():
         """Очищает кэш"""
         cache.clear()
+        stats["bytes"] = 0
+    
+    def get_stats():
+        """Возвращает статистику кэша"""
+        return {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "evictions": stats["evictions"],
+            "entries": len(cache),
+            "bytes": stats["bytes"],
+            "max_entries": max_entries,
+            "max_bytes": max_bytes,
+        }
     
+    cache_result.get = get
+    cache_result.put = put
     cache_result.clear = clear_cache
+    cache_result.invalidate = invalidate
+    cache_result.stats = get_stats
     
     return cache_result
\ No newline at end of file
@@ -1,6 +1,5 @@
-import shlex
-
-from . import core, parser, utils
+from . import core, metrics, parser, utils
+from .session import Session
 
 
 def run():
@@ -9,6 +8,10 @@ def run():
     """
     print_help()
     
+    # Метаданные и таблицы загружаются один раз и остаются в памяти сеанса
+    session = Session()
+    utils.set_session(session)
+    
     while True:
         try:
             user_input = input(">>> Введите команду: ").strip()
@@ -16,122 +19,176 @@ def run():
             if not user_input:
                 continue
             
-            parts = shlex.split(user_input)
-            command = parts[0].lower()
-            
-            metadata = utils.load_metadata()
+            try:
+                statement = parser.parse_statement(user_input)
+            except ValueError as e:
+                print(f"Ошибка: {e}")
+                continue
             
-            if command == "exit":
+            if statement.kind == "exit":
+                if session.in_transaction:
+                    core.rollback()
                 print("Выход из программы...")
                 break
-                
-            elif command == "help":
-                print_help()
-                
-            elif command == "create_table":
-                if len(parts) < 2:
-                    print("Использование: create_table <имя_таблицы> <столбец1:тип> <столбец2:тип> ...") # noqa: E501
-                    continue
-                
-                table_name = parts[1]
-                columns = []
-                
-                for col_def in parts[2:]:
-                    if ":" not in col_def:
-                        print(f'Ошибка: Некорректный формат столбца "{col_def}". Используйте имя:тип') # noqa: E501
-                        break
-                    
-                    col_name, col_type = col_def.split(":", 1)
-                    columns.append((col_name, col_type))
-                else:
-                    metadata = core.create_table(metadata, table_name, columns)
-                    utils.save_metadata(data=metadata)
-                
-            elif command == "drop_table":
-                if len(parts) != 2:
-                    print("Использование: drop_table <имя_таблицы>")
-                    continue
-                
-                table_name = parts[1]
-                metadata = core.drop_table(metadata, table_name)
-                utils.save_metadata(data=metadata)
-                
-            elif command == "list_tables":
-                core.list_tables(metadata)
-                
-            elif command == "info":
-                if len(parts) != 2:
-                    print("Использование: info <имя_таблицы>")
-                    continue
-                
-                table_name = parts[1]
-                core.info_table(metadata, table_name)
-                
-            elif command == "insert":
-                if len(parts) < 6 or parts[1].lower() != "into" or parts[3].lower() != "values": # noqa: E501
-                    print('Использование: insert into <имя_таблицы> values (<значение1>, <значение2>, ...)') # noqa: E501
-                    continue
-                
-                table_name = parts[2]
-                values_str = " ".join(parts[4:])
-                values = parser.parse_values(values_str)
-                
-                if values:
-                    core.insert(metadata, table_name, values)
-                
-            elif command == "select":
-                if len(parts) < 3 or parts[1].lower() != "from":
-                    print("Использование: select from <имя_таблицы> [where <условие>]")
-                    continue
-                
-                table_name = parts[2]
-                
-                if len(parts) > 4 and parts[3].lower() == "where":
-                    where_str = " ".join(parts[4:])
-                    where_clause = parser.parse_where_clause(where_str)
-                    core.select(metadata, table_name, where_clause)
-                else:
-                    core.select(metadata, table_name)
-                
-            elif command == "update":
-                if len(parts) < 7 or parts[2].lower() != "set" or parts[6].lower() != "where": # noqa: E501
-                    print('Использование: update <имя_таблицы> set <столбец> = <значение> where <столбец_условия> = <значение_условия>') # noqa: E501
-                    continue
-                
-                table_name = parts[1]
-                
-                set_idx = parts.index("set")
-                where_idx = parts.index("where")
-                
-                set_str = " ".join(parts[set_idx+1:where_idx])
-                where_str = " ".join(parts[where_idx+1:])
-                
-                set_clause = parser.parse_set_clause(set_str)
-                where_clause = parser.parse_where_clause(where_str)
-                
-                if set_clause and where_clause:
-                    core.update(metadata, table_name, set_clause, where_clause)
-                
-            elif command == "delete":
-                if len(parts) < 5 or parts[1].lower() != "from" or parts[3].lower() != "where": # noqa: E501
-                    print("Использование: delete from <имя_таблицы> where <условие>")
-                    continue
-                
-                table_name = parts[2]
-                where_str = " ".join(parts[4:])
-                where_clause = parser.parse_where_clause(where_str)
-                
-                if where_clause:
-                    core.delete(metadata, table_name, where_clause)
-                
-            else:
-                print(f'Неизвестная команда: {command}')
-                print("Введите 'help' для справки")
-                
+            
+            run_command(session, statement)
+            
         except KeyboardInterrupt:
             print("\nПрограмма прервана. Для выхода введите 'exit'")
         except Exception as e:
             print(f"Произошла ошибка: {e}")
+    
+    utils.set_session(None)
+
+def run_command(session, statement, params=(), collect_rows=False):
+    """
+    Выполняет одну команду в сеансе и фиксирует ее изменения.
+    
+    Вне транзакции и пакетного режима изменения записываются на диск
+    сразу после команды.
+    Если включено профилирование, после команды выводится отчет.
+    
+    Args:
+        session (Session): Сеанс работы с базой данных
+        statement (Statement): Разобранная команда (см. parser.parse_statement)
+        params (list): Значения параметров ? команды
+        collect_rows (bool): Возвращать записи select вместо их вывода
+    
+    Returns:
+        Результат команды (см. execute)
+    """
+    profiler = None
+    if statement.kind != "profile":
+        profiler = metrics.start_profile()
+    
+    try:
+        return execute(session, statement, params, collect_rows)
+    finally:
+        try:
+            if not session.in_transaction and not session.batch:
+                with metrics.operation("flush"):
+                    session.flush()
+        except Exception as e:
+            print(f"Ошибка при сохранении изменений: {e}")
+        if profiler is not None:
+            print(metrics.stop_profile(profiler))
+
+def execute(session, statement, params=(), collect_rows=False):
+    """
+    Выполняет одну разобранную команду.
+    
+    Args:
+        session (Session): Сеанс работы с базой данных
+        statement (Statement): Разобранная команда
+        params (list): Значения параметров ? команды
+        collect_rows (bool): Возвращать записи select списком
+            вместо постраничного вывода
+    
+    Returns:
+        Результат функции core, выполнившей команду, или None
+    """
+    command = statement.kind
+    args = statement.bind(params)
+    metadata = session.refresh()
+    
+    if command == "help":
+        print_help()
+        
+    elif command == "create_table":
+        result = core.create_table(metadata, args["table"], args["columns"],
+                                   **args["options"])
+        if result is not None:
+            utils.save_metadata(data=result)
+        return result
+        
+    elif command == "drop_table":
+        metadata = core.drop_table(metadata, args["table"])
+        utils.save_metadata(data=metadata)
+        return metadata
+        
+    elif command == "create_index":
+        result = core.create_index(metadata, args["table"], args["column"],
+                                   args["kind"])
+        if result is not None:
+            utils.save_metadata(data=result)
+        return result
+        
+    elif command == "import":
+        if args["batch_size"] is not None:
+            return core.import_table(metadata, args["table"], args["filepath"],
+                                     args["batch_size"])
+        return core.import_table(metadata, args["table"], args["filepath"])
+        
+    elif command == "compact":
+        return core.compact_table(metadata, args["table"])
+        
+    elif command == "begin":
+        return core.begin_transaction()
+        
+    elif command == "commit":
+        return core.commit()
+        
+    elif command == "rollback":
+        return core.rollback()
+        
+    elif command == "cache_stats":
+        return core.cache_stats()
+        
+    elif command == "stats":
+        if args["action"] == "reset":
+            return core.reset_stats()
+        if args["action"] == "dump":
+            return core.dump_stats(args["filepath"])
+        return core.stats()
+        
+    elif command == "fsync":
+        return core.set_fsync(args["policy"], args["interval_ms"])
+        
+    elif command == "parallel":
+        return core.set_parallel(args["threshold"], args["workers"])
+        
+    elif command == "profile":
+        return core.set_profiling(args["mode"])
+        
+    elif command == "list_tables":
+        return core.list_tables(metadata)
+        
+    elif command == "info":
+        return core.info_table(metadata, args["table"])
+        
+    elif command == "insert":
+        return core.insert(metadata, args["table"], args["values"])
+        
+    elif command == "select":
+        return _select(metadata, args, collect_rows)
+        
+    elif command == "explain":
+        return core.explain(lambda: _select(metadata, args, collect_rows=True),
+                            collect_rows)
+        
+    elif command == "update":
+        return core.update(metadata, args["table"], args["set"], args["where"])
+        
+    elif command == "delete":
+        return core.delete(metadata, args["table"], args["where"])
+
+    return None
+
+def _select(metadata, args, collect_rows):
+    """
+    Выполняет выборку или вычисление агрегатов по аргументам select.
+    """
+    if args["aggregates"] is not None or args["group_by"]:
+        aggregate = core.aggregate_rows if collect_rows else core.aggregate
+        items = args["aggregates"] or args["columns"] or args["group_by"]
+        return aggregate(metadata, args["table"], items, args["where"],
+                         args["group_by"], args["limit"], args["offset"],
+                         args["join"], args["order_by"])
+    
+    select = core.select_rows if collect_rows else core.select
+    return select(metadata, args["table"], args["where"], args["limit"],
+                  args["offset"], args["columns"], args["join"],
+                  args["order_by"])
 
 def print_help():
     """
@@ -140,11 +197,27 @@ def print_help():
     help_text = """Функции:
 <command> insert into <имя_таблицы> values (<значение1>, <значение2>, ...) - создать запись. 
 <command> select from <имя_таблицы> where <столбец> = <значение> - прочитать записи по условию.
+    Условие: операторы =, !=, <, >, <=, >=, IN (...), BETWEEN ... AND ..., связки AND/OR и скобки.
 <command> select from <имя_таблицы> - прочитать все записи.
+<command> select <столбец1>, <столбец2> from <имя_таблицы> [where <условие>] - прочитать только указанные столбцы.
+<command> select <столбец>, count(*), sum|min|max|avg(<столбец>) from <имя_таблицы> [where <условие>] [group by <столбец>] - вычислить агрегаты.
+<command> select from <имя_таблицы> [where <условие>] limit <N> offset <M> - прочитать N записей, пропустив M.
+<command> select from <имя_таблицы> [where <условие>] order by <столбец> [asc|desc] [limit <N>] - прочитать записи по порядку.
+<command> select [<столбцы>] from <таблица1> join <таблица2> on <таблица1.столбец> = <таблица2.столбец> [where <условие>] - соединить таблицы.
+<command> explain select ... - выполнить выборку и показать ее план: способ доступа, оценку и фактическое число строк, время.
 <command> update <имя_таблицы> set <столбец1> = <новое_значение1> where <столбец_условия> = <значение_условия> - обновить запись.
 <command> delete from <имя_таблицы> where <столбец> = <значение> - удалить запись.
 <command> info <имя_таблицы> - вывести информацию о таблице.
-<command> create_table <имя_таблицы> <столбец1:тип> <столбец2:тип> .. - создать таблицу
+<command> create_table <имя_таблицы> <столбец1:тип> <столбец2:тип> .. [storage=json|log|binary] [engine=rows|columnar] [compression=none|zlib|lzma] - создать таблицу
+<command> import <имя_таблицы> <файл.csv|файл.jsonl> [размер_пакета] - загрузить записи из файла
+<command> compact <имя_таблицы> - свернуть журнал изменений таблицы в снимок
+<command> create_index <имя_таблицы> <столбец> [hash|sorted] - создать индекс по столбцу
+<command> begin | commit | rollback - открыть, зафиксировать или отменить транзакцию
+<command> cache_stats - показать статистику кэша запросов
+<command> stats [reset | dump <файл.json|файл.prom>] - показать, сбросить или сохранить метрики операций
+<command> fsync <always|never|interval> [интервал_мс] - задать политику сброса изменений на диск
+<command> parallel <порог_записей|off> [процессы] - просматривать большие таблицы в пуле процессов
+<command> profile <off|cpu|memory> - профилировать каждую команду (cProfile или tracemalloc)
 <command> list_tables - показать список всех таблиц
 <command> drop_table <имя_таблицы> - удалить таблицу
 <command> exit - выход из программы
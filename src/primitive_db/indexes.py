@@ -0,0 +1,396 @@
+import bisect
+import json
+import os
+
+from . import metrics, utils
+from .constants import COLUMN_TYPES, DEFAULT_ENCODING, INDEX_KINDS
+
+
+def index_path(table_name, column):
+    """
+    Возвращает путь к файлу индекса рядом с файлом таблицы.
+
+    Args:
+        table_name (str): Имя таблицы
+        column (str): Имя индексируемого столбца
+
+    Returns:
+        str: Путь к файлу индекса
+    """
+    return utils.table_path(table_name, f".{column}.index.json")
+
+def _normalize(value, col_type):
+    """
+    Приводит значение к типу столбца, если они равны в Python.
+
+    Условие сравнивает значения оператором ==, поэтому 1 находит True
+    в столбце bool, а True и 1.0 находят 1 в столбце int; ключ
+    хэш-индекса должен давать тот же результат, что и полный просмотр.
+    """
+    if col_type == "int" and isinstance(value, (bool, float)):
+        if float(value).is_integer():
+            return int(value)
+    elif col_type == "bool" and isinstance(value, (int, float)):
+        if value in (0, 1):
+            return bool(value)
+    return value
+
+def column_key(value, col_type):
+    """
+    Приводит значение к типу столбца для поиска по индексу.
+
+    Значение другого типа не равно ни одному значению столбца, а
+    сравнение с ними в сортированном индексе невозможно, поэтому
+    для него возвращается None (искать нечего).
+
+    Returns:
+        Значение типа столбца или None
+    """
+    value = _normalize(value, col_type)
+    if type(value) is COLUMN_TYPES.get(col_type):
+        return value
+    return None
+
+def _encode_key(value, col_type=None):
+    """Преобразует значение в строковый ключ хэш-индекса."""
+    return json.dumps(_normalize(value, col_type), ensure_ascii=False)
+
+def decode_key(key):
+    """Восстанавливает значение по ключу хэш-индекса."""
+    return json.loads(key)
+
+def column_type(table_meta, column):
+    """
+    Возвращает тип столбца из метаданных таблицы (или None).
+    """
+    for col in table_meta["columns"]:
+        if col["name"] == column:
+            return col["type"]
+    return None
+
+def build_index(table_data, column, kind="hash", col_type=None):
+    """
+    Строит индекс по столбцу таблицы.
+
+    Хэш-индекс хранит отображение значение -> список ID,
+    сортированный индекс - пары (значение, ID), упорядоченные по значению.
+    Тип столбца сохраняется в индексе: по нему значения условия
+    приводятся к ключам хэш-индекса.
+
+    Args:
+        table_data (list): Данные таблицы
+        column (str): Имя столбца
+        kind (str): Тип индекса: hash или sorted
+        col_type (str): Тип столбца (int, str или bool)
+
+    Returns:
+        dict: Структура индекса
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f'Некорректный тип индекса "{kind}"')
+
+    index = {"column": column, "kind": kind, "type": col_type}
+
+    if kind == "hash":
+        entries = {}
+        for row in table_data:
+            key = _encode_key(row.get(column), col_type)
+            entries.setdefault(key, []).append(row["ID"])
+        index["entries"] = entries
+    else:
+        pairs = sorted((row.get(column), row["ID"]) for row in table_data)
+        index["values"] = [pair[0] for pair in pairs]
+        index["ids"] = [pair[1] for pair in pairs]
+
+    return index
+
+def load_index(table_name, column):
+    """
+    Загружает индекс столбца с диска.
+
+    Если активен сеанс, возвращается резидентная копия индекса.
+
+    Returns:
+        dict: Структура индекса или None, если файл отсутствует или поврежден
+    """
+    session = utils.get_session()
+    if session is not None:
+        return session.load(
+            ("index", table_name, column),
+            [index_path(table_name, column)],
+            lambda: read_index(table_name, column),
+        )
+
+    return read_index(table_name, column)
+
+@metrics.timed_phase("load")
+def read_index(table_name, column):
+    """
+    Читает индекс столбца с диска в обход сеанса.
+    """
+    filepath = index_path(table_name, column)
+
+    try:
+        with open(filepath, 'r', encoding=DEFAULT_ENCODING) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        print(f"Ошибка: Файл индекса {filepath} поврежден и будет перестроен")
+        return None
+
+def save_index(table_name, index):
+    """
+    Сохраняет индекс на диск.
+
+    Args:
+        table_name (str): Имя таблицы
+        index (dict): Структура индекса
+    """
+    session = utils.get_session()
+    if session is not None:
+        session.store(
+            ("index", table_name, index["column"]),
+            [index_path(table_name, index["column"])],
+            index,
+            lambda value: write_index(table_name, value),
+        )
+        return
+
+    write_index(table_name, index)
+
+@metrics.timed_phase("save")
+def write_index(table_name, index):
+    """
+    Записывает индекс на диск в обход сеанса.
+
+    Returns:
+        bool: True, если индекс записан
+    """
+    filepath = index_path(table_name, index["column"])
+
+    try:
+        utils.atomic_write(filepath, lambda f: json.dump(index, f, ensure_ascii=False))
+        return True
+    except Exception as e:
+        print(f"Ошибка при сохранении файла {filepath}: {e}")
+        return False
+
+def remove_index_files(table_name, columns):
+    """
+    Удаляет файлы индексов указанных столбцов.
+    """
+    session = utils.get_session()
+    for column in columns:
+        if session is not None:
+            session.discard(("index", table_name, column))
+        filepath = index_path(table_name, column)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+def add_row(index, row):
+    """
+    Добавляет строку в индекс.
+    """
+    value = row.get(index["column"])
+
+    if index["kind"] == "hash":
+        key = _encode_key(value, index.get("type"))
+        index["entries"].setdefault(key, []).append(row["ID"])
+    else:
+        pos = _sorted_position(index, value, row["ID"])
+        index["values"].insert(pos, value)
+        index["ids"].insert(pos, row["ID"])
+
+def add_rows(index, rows):
+    """
+    Добавляет пакет строк в индекс.
+    
+    Для сортированного индекса пакет сортируется отдельно и сливается
+    с уже упорядоченными парами за один проход.
+    """
+    if index["kind"] == "hash":
+        for row in rows:
+            add_row(index, row)
+        return
+    
+    column = index["column"]
+    pairs = list(zip(index["values"], index["ids"]))
+    pairs.extend(sorted((row.get(column), row["ID"]) for row in rows))
+    pairs.sort()
+    index["values"] = [pair[0] for pair in pairs]
+    index["ids"] = [pair[1] for pair in pairs]
+
+def remove_row(index, row):
+    """
+    Удаляет строку из индекса.
+    """
+    value = row.get(index["column"])
+
+    if index["kind"] == "hash":
+        key = _encode_key(value, index.get("type"))
+        ids = index["entries"].get(key, [])
+        if row["ID"] in ids:
+            ids.remove(row["ID"])
+        if not ids:
+            index["entries"].pop(key, None)
+    else:
+        pos = _sorted_position(index, value, row["ID"], right=False)
+        if pos < len(index["ids"]) and index["ids"][pos] == row["ID"]:
+            del index["values"][pos]
+            del index["ids"][pos]
+
+def _remove_ids(index, ids):
+    """
+    Удаляет из индекса строки с указанными ID за один проход.
+    """
+    if index["kind"] == "hash":
+        entries = {}
+        for key, key_ids in index["entries"].items():
+            key_ids = [row_id for row_id in key_ids if row_id not in ids]
+            if key_ids:
+                entries[key] = key_ids
+        index["entries"] = entries
+        return
+
+    pairs = [pair for pair in zip(index["values"], index["ids"]) if pair[1] not in ids]
+    index["values"] = [pair[0] for pair in pairs]
+    index["ids"] = [pair[1] for pair in pairs]
+
+def apply_log_records(index, records):
+    """
+    Применяет к индексу записи журнала таблицы.
+
+    Для каждой затронутой строки определяется ее итоговое значение
+    в столбце индекса (или удаление); затем эти строки удаляются
+    из индекса и добавляются заново. Повторное применение записей,
+    уже учтенных в индексе, безопасно.
+
+    Args:
+        index (dict): Структура индекса
+        records (list): Записи журнала (см. utils.append_table_log)
+    """
+    column = index["column"]
+    # ID -> (строка существует, значение столбца)
+    changed = {}
+    for record in records:
+        op = record.get("op")
+        if op == "insert":
+            changed[record["row"]["ID"]] = (True, record["row"].get(column))
+        elif op == "update" and column in record["set"]:
+            for row_id in record["ids"]:
+                if changed.get(row_id, (True,))[0]:
+                    changed[row_id] = (True, record["set"][column])
+        elif op == "delete":
+            for row_id in record["ids"]:
+                changed[row_id] = (False, None)
+
+    if not changed:
+        return
+    _remove_ids(index, changed)
+    add_rows(index, [
+        {"ID": row_id, column: value}
+        for row_id, (present, value) in sorted(changed.items()) if present
+    ])
+
+def _sorted_position(index, value, row_id, right=True):
+    """
+    Ищет позицию пары (значение, ID) в сортированном индексе.
+    """
+    values = index["values"]
+    lo = bisect.bisect_left(values, value)
+    hi = bisect.bisect_right(values, value, lo=lo)
+
+    find = bisect.bisect_right if right else bisect.bisect_left
+    return find(index["ids"], row_id, lo=lo, hi=hi)
+
+def lookup(index, value):
+    """
+    Возвращает ID строк, у которых значение столбца равно value.
+
+    Returns:
+        list: Список ID
+    """
+    if index["kind"] == "hash":
+        return list(index["entries"].get(_encode_key(value, index.get("type")), []))
+
+    values = index["values"]
+    lo = bisect.bisect_left(values, value)
+    hi = bisect.bisect_right(values, value, lo=lo)
+    return index["ids"][lo:hi]
+
+def find_rows_by_ids(table_data, ids):
+    """
+    Находит строки по ID двоичным поиском.
+
+    Строки таблицы всегда упорядочены по возрастанию ID,
+    поэтому поиск каждой строки занимает O(log n).
+
+    Args:
+        table_data (list): Данные таблицы
+        ids (iterable): ID искомых строк
+
+    Returns:
+        list: Найденные строки в порядке возрастания ID
+    """
+    rows = []
+    for row_id in sorted(set(ids)):
+        pos = bisect.bisect_left(table_data, row_id, key=lambda row: row["ID"])
+        if pos < len(table_data) and table_data[pos]["ID"] == row_id:
+            rows.append(table_data[pos])
+    return rows
+
+def get_table_indexes(metadata, table_name, table_data=None):
+    """
+    Загружает все индексы таблицы, перестраивая отсутствующие.
+    
+    Индекс таблицы с журналом изменений хранит смещение log_offset -
+    размер журнала, изменения из которого в нем уже учтены. Если журнал
+    длиннее, к индексу применяется только его остаток (см.
+    apply_log_records), а не перестроение по всей таблице. Индекс
+    в сеансе остается резидентным: запись в журнал сдвигает его
+    смещение (см. core._save_changes), а файл индекса перезаписывается
+    только при сворачивании журнала.
+
+    Args:
+        metadata (dict): Метаданные базы данных
+        table_name (str): Имя таблицы
+        table_data (list): Данные таблицы для перестроения индексов
+
+    Returns:
+        dict: Индексы вида {столбец: индекс}
+    """
+    result = {}
+    table_meta = metadata[table_name]
+    # Размер журнала берется до чтения данных: данные, прочитанные
+    # позже, учитывают по меньшей мере столько записей журнала
+    log_size = utils.table_log_size(table_name)
+    for column, kind in table_meta.get("indexes", {}).items():
+        col_type = column_type(table_meta, column)
+        index = load_index(table_name, column)
+        if index is not None and index.get("log_offset", 0) > log_size:
+            # Журнал свернут после построения индекса
+            index = None
+        if index is None:
+            if table_data is None:
+                table_data = utils.load_table_data(table_name)
+            index = build_index(table_data, column, kind, col_type)
+            index["log_offset"] = log_size
+            save_index(table_name, index)
+        elif index.get("log_offset", 0) < log_size:
+            records, index["log_offset"] = utils.read_table_log(
+                table_name, index.get("log_offset", 0)
+            )
+            apply_log_records(index, records)
+        # Индексы, сохраненные до появления типа: ключи построены
+        # из значений столбца и уже имеют его тип
+        index.setdefault("type", col_type)
+        result[column] = index
+    return result
+
+def save_table_indexes(table_name, table_indexes):
+    """
+    Сохраняет все переданные индексы таблицы.
+    """
+    for index in table_indexes.values():
+        save_index(table_name, index)
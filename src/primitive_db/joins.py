@@ -0,0 +1,187 @@
+import json
+import os
+import tempfile
+from itertools import chain
+
+from . import metrics
+from .constants import DATA_DIR, DEFAULT_ENCODING, JOIN_MEMORY_ROWS, JOIN_PARTITIONS
+
+
+def qualified(table_name, column):
+    """
+    Возвращает имя столбца результата соединения: "таблица.столбец".
+    """
+    return f"{table_name}.{column}"
+
+def resolve(name, schemas):
+    """
+    Определяет таблицу, которой принадлежит столбец соединения.
+
+    Имя может быть полным ("users.age") или кратким ("age"), если
+    столбец с таким именем есть только в одной из таблиц.
+
+    Args:
+        name (str): Имя столбца
+        schemas (dict): Столбцы таблиц {таблица: [имя_столбца, ...]}
+
+    Returns:
+        tuple: (таблица, столбец)
+
+    Raises:
+        ValueError: Если столбца нет или краткое имя неоднозначно
+    """
+    table_name, _, column = name.partition(".")
+    if column and column in schemas.get(table_name, ()):
+        return table_name, column
+
+    owners = [table for table, columns in schemas.items() if name in columns]
+    if not owners:
+        raise ValueError(f'Столбец "{name}" не существует.')
+    if len(owners) > 1:
+        raise ValueError(f'Столбец "{name}" есть в нескольких таблицах, укажите "таблица.{name}"') # noqa: E501
+    return owners[0], name
+
+def _rename(node, rename):
+    if node[0] in ("and", "or"):
+        return (node[0], tuple(_rename(child, rename) for child in node[1]))
+    return (node[0], rename(node[1])) + node[2:]
+
+def _columns_of(node):
+    if node[0] in ("and", "or"):
+        return [name for child in node[1] for name in _columns_of(child)]
+    return [node[1]]
+
+def split_where(node, schemas):
+    """
+    Разделяет условие соединения на условия отдельных таблиц и остаток.
+
+    Каждая ветвь верхнего уровня AND, упоминающая столбцы одной
+    таблицы, переносится в условие этой таблицы (с краткими именами)
+    и проверяется до соединения. Ветви, связывающие обе таблицы,
+    остаются в остатке с полными именами и проверяются на строках
+    результата.
+
+    Args:
+        node (tuple): Дерево условий или None
+        schemas (dict): Столбцы таблиц {таблица: [имя_столбца, ...]}
+
+    Returns:
+        tuple: ({таблица: дерево условий}, дерево остатка или None)
+    """
+    pushed = {table: [] for table in schemas}
+    residual = []
+    if node is not None:
+        conjuncts = node[1] if node[0] == "and" else (node,)
+        for conjunct in conjuncts:
+            tables = {resolve(name, schemas)[0] for name in _columns_of(conjunct)}
+            if len(tables) == 1:
+                table = tables.pop()
+                pushed[table].append(
+                    _rename(conjunct, lambda name: resolve(name, schemas)[1])
+                )
+            else:
+                residual.append(
+                    _rename(conjunct, lambda name: qualified(*resolve(name, schemas)))
+                )
+
+    def combine(nodes):
+        if not nodes:
+            return None
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    return ({table: combine(nodes) for table, nodes in pushed.items()},
+            combine(residual))
+
+def _partition_path(directory, side, number):
+    return os.path.join(directory, f"{side}.{number}.jsonl")
+
+def _write_partitions(rows, key, directory, side):
+    """
+    Раскладывает строки по файлам разделов по хэшу ключа соединения.
+    """
+    files = [
+        open(_partition_path(directory, side, number), "w", encoding=DEFAULT_ENCODING)
+        for number in range(JOIN_PARTITIONS)
+    ]
+    try:
+        for row in rows:
+            value = row.get(key)
+            if value is not None:
+                f = files[hash(value) % JOIN_PARTITIONS]
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        for f in files:
+            f.close()
+
+def _read_partition(directory, side, number):
+    path = _partition_path(directory, side, number)
+    with open(path, "r", encoding=DEFAULT_ENCODING) as f:
+        for line in f:
+            yield json.loads(line)
+
+def _probe(table, probe_rows, probe_key, combine):
+    for row in probe_rows:
+        for match in table.get(row.get(probe_key), ()):
+            yield combine(match, row)
+
+def _build(rows, key):
+    table = {}
+    for row in rows:
+        value = row.get(key)
+        if value is not None:
+            table.setdefault(value, []).append(row)
+    return table
+
+def hash_join(build_rows, build_key, probe_rows, probe_key, combine,
+              memory_rows=JOIN_MEMORY_ROWS):
+    """
+    Соединяет два потока строк по равенству ключей.
+
+    Строки стороны построения собираются в хэш-таблицу, затем строки
+    стороны проверки читаются потоком и ищутся в ней. Если сторона
+    построения больше memory_rows строк, обе стороны раскладываются по
+    JOIN_PARTITIONS временным файлам по хэшу ключа, и разделы
+    соединяются попарно, так что в памяти находится один раздел.
+    Строки с пустым ключом (None) не соединяются.
+
+    Args:
+        build_rows (iterable): Строки меньшей стороны
+        build_key (str): Столбец соединения стороны построения
+        probe_rows (iterable или callable): Строки большей стороны или
+            функция, получающая хэш-таблицу ключей и возвращающая их
+        probe_key (str): Столбец соединения стороны проверки
+        combine (callable): Функция (строка построения, строка проверки)
+            -> строка результата
+        memory_rows (int): Наибольшее число строк построения в памяти
+
+    Yields:
+        dict: Строки результата (в порядке стороны проверки, если
+            разделы не понадобились)
+    """
+    build_rows = iter(build_rows)
+    buffered = []
+    for row in build_rows:
+        buffered.append(row)
+        if len(buffered) > memory_rows:
+            break
+    else:
+        table = _build(buffered, build_key)
+        if callable(probe_rows):
+            probe_rows = probe_rows(table)
+        yield from _probe(table, probe_rows, probe_key, combine)
+        return
+
+    metrics.increment("join_spills_total")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="join_", dir=DATA_DIR) as directory:
+        _write_partitions(chain(buffered, build_rows), build_key, directory, "build")
+        del buffered
+        if callable(probe_rows):
+            probe_rows = probe_rows(None)
+        _write_partitions(probe_rows, probe_key, directory, "probe")
+
+        for number in range(JOIN_PARTITIONS):
+            table = _build(_read_partition(directory, "build", number), build_key)
+            if table:
+                yield from _probe(table, _read_partition(directory, "probe", number),
+                                  probe_key, combine)
@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 
-from .engine import run
+import sys
 
 
 def main():
+    argv = sys.argv[1:]
+    # Каждый режим импортирует только свои модули
+    if argv and argv[0] == "serve":
+        from .server import main as serve
+        serve(argv[1:])
+        return
+    if argv:
+        from .batch import main as run_batch
+        sys.exit(run_batch(argv))
+
+    from .engine import run
     run()
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+import io
+import json
+import time
+import types
+from contextlib import contextmanager
+from functools import wraps
+
+from .constants import DEFAULT_ENCODING, JSON_INDENT, METRICS_BUCKETS, PROFILE_TOP
+
+PROFILE_MODES = ("off", "cpu", "memory")
+
+_counters = {}
+_histograms = {}
+_frames = []
+_profile_mode = "off"
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+def increment(name, labels=None, value=1):
+    """
+    Увеличивает счетчик.
+
+    Args:
+        name (str): Имя метрики
+        labels (dict): Метки, например {"operation": "select"}
+        value (int): Прирост
+    """
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, labels=None):
+    """
+    Добавляет замер длительности в гистограмму.
+
+    Гистограмма хранит количество замеров, их сумму, максимум
+    и накопительные счетчики по границам METRICS_BUCKETS.
+    """
+    key = _key(name, labels)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = {"count": 0, "sum": 0.0, "max": 0.0,
+                     "buckets": [0] * len(METRICS_BUCKETS)}
+        _histograms[key] = histogram
+
+    histogram["count"] += 1
+    histogram["sum"] += seconds
+    histogram["max"] = max(histogram["max"], seconds)
+    for i, bound in enumerate(METRICS_BUCKETS):
+        if seconds <= bound:
+            histogram["buckets"][i] += 1
+
+def current_operation():
+    """
+    Возвращает имя самой вложенной выполняемой операции или "-".
+    """
+    for frame in reversed(_frames):
+        if frame["kind"] == "operation":
+            return frame["name"]
+    return "-"
+
+def begin(kind, name):
+    """
+    Начинает замер операции или фазы.
+
+    Время фазы считается без вложенных фаз, поэтому сумма фаз
+    не превышает длительность операции.
+
+    Args:
+        kind (str): operation или phase
+        name (str): Имя операции или фазы
+
+    Returns:
+        dict: Кадр замера для end
+    """
+    frame = {"kind": kind, "name": name, "nested": 0.0,
+             "operation": current_operation() if kind == "phase" else name,
+             "start": time.perf_counter()}
+    _frames.append(frame)
+    return frame
+
+def end(frame, failed=False):
+    """
+    Завершает замер, начатый begin.
+    """
+    elapsed = time.perf_counter() - frame["start"]
+    if frame in _frames:
+        _frames.remove(frame)
+
+    if frame["kind"] == "operation":
+        labels = {"operation": frame["name"]}
+        increment("operations_total", labels)
+        if failed:
+            increment("errors_total", labels)
+        observe("operation_seconds", elapsed, labels)
+        return elapsed
+
+    for parent in reversed(_frames):
+        if parent["kind"] == "phase":
+            parent["nested"] += elapsed
+            break
+    observe("phase_seconds", elapsed - frame["nested"],
+            {"operation": frame["operation"], "phase": frame["name"]})
+    return elapsed
+
+@contextmanager
+def operation(name):
+    """
+    Контекстный менеджер замера операции (счетчики и гистограмма).
+    """
+    frame = begin("operation", name)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        end(frame, failed)
+
+@contextmanager
+def phase(name):
+    """
+    Контекстный менеджер замера фазы: load, parse, filter, render или save.
+    """
+    frame = begin("phase", name)
+    try:
+        yield
+    finally:
+        end(frame)
+
+def timed_phase(name):
+    """
+    Декоратор, относящий время выполнения функции к фазе name.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_iter(iterable, name):
+    """
+    Относит к фазе name время получения каждого элемента итератора.
+
+    Позволяет отделить вычисление ленивого результата (filter)
+    от его вывода (render).
+    """
+    iterator = iter(iterable)
+    while True:
+        frame = begin("phase", name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            end(frame)
+        yield item
+
+def _quantile(histogram, fraction):
+    """Оценивает квантиль по границам корзин гистограммы."""
+    if not histogram["count"]:
+        return 0.0
+    target = fraction * histogram["count"]
+    for bound, count in zip(METRICS_BUCKETS, histogram["buckets"]):
+        if count >= target:
+            return min(bound, histogram["max"])
+    return histogram["max"]
+
+def snapshot():
+    """
+    Возвращает текущие метрики.
+
+    Returns:
+        dict: {"counters": [...], "histograms": [...]}, где каждый элемент
+            содержит имя, метки и значения
+    """
+    return {
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ],
+        "histograms": [
+            {"name": name, "labels": dict(labels),
+             "count": histogram["count"], "sum": histogram["sum"],
+             "max": histogram["max"],
+             "p50": _quantile(histogram, 0.5), "p99": _quantile(histogram, 0.99),
+             "buckets": dict(zip(map(str, METRICS_BUCKETS), histogram["buckets"]))}
+            for (name, labels), histogram in sorted(_histograms.items())
+        ],
+    }
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+def render_prometheus():
+    """
+    Форматирует метрики в текстовом формате Prometheus.
+    """
+    lines = []
+    for (name, labels), value in sorted(_counters.items()):
+        lines.append(f"primitive_db_{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), histogram in sorted(_histograms.items()):
+        metric = f"primitive_db_{name}"
+        for bound, count in zip(METRICS_BUCKETS, histogram["buckets"]):
+            lines.append(f'{metric}_bucket{_format_labels(labels, [("le", bound)])} {count}') # noqa: E501
+        lines.append(f'{metric}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}') # noqa: E501
+        lines.append(f"{metric}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+def dump(filepath):
+    """
+    Сохраняет метрики в файл: JSON для расширения .json,
+    иначе текстовый формат Prometheus.
+    """
+    if filepath.endswith(".json"):
+        text = json.dumps(snapshot(), indent=JSON_INDENT, ensure_ascii=False)
+    else:
+        text = render_prometheus()
+
+    with open(filepath, 'w', encoding=DEFAULT_ENCODING) as f:
+        f.write(text)
+
+def reset():
+    """
+    Сбрасывает все накопленные метрики.
+    """
+    _counters.clear()
+    _histograms.clear()
+
+def set_profile_mode(mode):
+    """
+    Включает профилирование каждой команды.
+
+    Args:
+        mode (str): off, cpu (cProfile) или memory (tracemalloc)
+    """
+    global _profile_mode
+    if mode not in PROFILE_MODES:
+        raise ValueError(f'Некорректный режим профилирования "{mode}"')
+    _profile_mode = mode
+
+def get_profile_mode():
+    return _profile_mode
+
+def start_profile():
+    """
+    Запускает профилировщик для одной команды, если он включен.
+
+    Returns:
+        Профилировщик для stop_profile или None
+    """
+    # Профилировщики загружаются только при включенном профилировании
+    if _profile_mode == "cpu":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if _profile_mode == "memory":
+        import tracemalloc
+
+        tracemalloc.start()
+        return tracemalloc
+    return None
+
+def stop_profile(profiler, top=PROFILE_TOP):
+    """
+    Останавливает профилировщик и возвращает отчет.
+
+    Returns:
+        str: Отчет о самых затратных функциях или строках
+    """
+    if profiler is None:
+        return ""
+
+    # Профилировщик останавливается до любых импортов, иначе загрузка
+    # модулей попадает в первый отчет
+    if isinstance(profiler, types.ModuleType):
+        current, peak = profiler.get_traced_memory()
+        statistics = profiler.take_snapshot().statistics("lineno")[:top]
+        profiler.stop()
+        lines = [f"Память: текущая {current} байт, пиковая {peak} байт"]
+        lines.extend(str(stat) for stat in statistics)
+        return "\n".join(lines)
+
+    profiler.disable()
+    import pstats
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+    return output.getvalue()
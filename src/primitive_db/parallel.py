@@ -0,0 +1,155 @@
+import atexit
+import os
+import threading
+from itertools import repeat
+
+from . import metrics, predicates
+from .constants import PARALLEL_CHUNK_ROWS, PARALLEL_SCAN_THRESHOLD, PARALLEL_WORKERS
+
+_threshold = PARALLEL_SCAN_THRESHOLD
+_workers = PARALLEL_WORKERS
+# Пул процессов создается один раз и используется всеми просмотрами
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def set_options(threshold=None, workers=None):
+    """
+    Задает параметры параллельного просмотра.
+
+    Args:
+        threshold (int): Минимальное число строк для параллельного
+            просмотра; 0 отключает его
+        workers (int): Количество процессов; 0 - по числу ядер
+    """
+    global _threshold, _workers
+    if threshold is not None:
+        if threshold < 0:
+            raise ValueError("Порог просмотра не может быть отрицательным")
+        _threshold = threshold
+    if workers is not None:
+        if workers < 0:
+            raise ValueError("Количество процессов не может быть отрицательным")
+        _workers = workers or None
+
+def get_options():
+    """
+    Возвращает порог параллельного просмотра и количество процессов.
+    """
+    return _threshold, worker_count()
+
+def worker_count():
+    return _workers or os.cpu_count() or 1
+
+def enabled_for(row_count):
+    """
+    Проверяет, стоит ли просматривать столько строк параллельно.
+    """
+    return bool(_threshold) and row_count >= _threshold and worker_count() > 1
+
+def _pool_context():
+    """
+    Возвращает контекст запуска процессов пула: forkserver, а где его
+    нет - spawn.
+
+    fork не используется: копия процесса, в котором работают другие
+    потоки (сервер, таймер fsync), может унаследовать захваченные ими
+    блокировки, а в Python 3.12 такой fork считается устаревшим.
+    """
+    import multiprocessing
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+def start_pool():
+    """
+    Создает пул процессов, если он еще не создан или изменилось
+    количество процессов.
+
+    Returns:
+        ProcessPoolExecutor: Пул процессов
+    """
+    global _pool, _pool_workers
+    # Пул нужен только для больших таблиц: модуль загружается
+    # при первом параллельном просмотре, а не при запуске
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pool_lock:
+        workers = worker_count()
+        if _pool is not None and _pool_workers == workers:
+            return _pool
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(workers, mp_context=_pool_context())
+        _pool_workers = workers
+        return _pool
+
+def shutdown_pool():
+    """
+    Останавливает пул процессов (при выходе или после сбоя процесса пула).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_pool)
+
+def _match_columns(columns, node, start):
+    """Проверяет условие по значениям столбцов одной части."""
+    predicate = predicates.compile_predicate(node)
+    names = list(columns)
+    return [
+        start + i
+        for i, values in enumerate(zip(*columns.values()))
+        if predicate(dict(zip(names, values)))
+    ]
+
+def match_positions(rows, node, chunk_rows=PARALLEL_CHUNK_ROWS):
+    """
+    Вычисляет номера строк, удовлетворяющих условию, в пуле процессов.
+
+    Строки делятся на части по chunk_rows, каждая часть проверяется
+    процессом общего пула (см. start_pool), а результаты объединяются
+    в исходном порядке (то есть по возрастанию ID). Процессам
+    передаются только столбцы, упомянутые в условии: сериализация
+    строк целиком обходится дороже самой проверки.
+
+    Args:
+        rows (list): Строки таблицы
+        node (tuple): Дерево условий (см. predicates.normalize)
+        chunk_rows (int): Размер части
+
+    Returns:
+        list: Номера строк по возрастанию
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    names = sorted(predicates.referenced_columns(node))
+    starts = range(0, len(rows), chunk_rows)
+
+    def chunks():
+        for start in starts:
+            part = rows[start:start + chunk_rows]
+            yield {name: [row.get(name) for row in part] for name in names}
+
+    metrics.increment("parallel_scans_total")
+    executor = start_pool()
+    result = []
+    try:
+        for chunk in executor.map(_match_columns, chunks(), repeat(node), starts):
+            result.extend(chunk)
+    except BrokenProcessPool:
+        # Следующий просмотр создаст новый пул
+        shutdown_pool()
+        raise
+    return result
+
+def filter_rows(rows, node):
+    """
+    Возвращает строки, удовлетворяющие условию, проверяя их в пуле процессов.
+    """
+    return [rows[i] for i in match_positions(rows, node)]
@@ -1,116 +1,567 @@
-import shlex
+import re
+from collections import OrderedDict
 
+from . import metrics
+from .constants import AGGREGATE_FUNCTIONS, STATEMENT_CACHE_SIZE
 
+_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<op><=|>=|!=|<>|==|=|<|>)
+        |(?P<punct>[(),])
+        |(?P<param>\?)
+        |(?P<word>[^\s()<>=!,'"?]+)
+    )""", re.VERBOSE)
+
+# Числа записываются только цифрами: слова вроде nan, inf или 1_000,
+# которые понимают int() и float(), остаются строками
+_NUMBER_PATTERN = re.compile(r"-?[0-9]+(?:\.[0-9]+)?")
+_ESCAPE_PATTERN = {quote: re.compile(r"\\([\\" + quote + "])") for quote in "\"'"}
+
+_OPERATORS = {"=": "=", "==": "=", "!=": "!=", "<>": "!=",
+              "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+USAGE = {
+    "help": "help",
+    "exit": "exit",
+    "list_tables": "list_tables",
+    "cache_stats": "cache_stats",
+    "begin": "begin",
+    "commit": "commit",
+    "rollback": "rollback",
+    "create_table": "create_table <имя_таблицы> <столбец1:тип> <столбец2:тип> ... [storage=json|log|binary] [engine=rows|columnar] [compression=none|zlib|lzma]", # noqa: E501
+    "drop_table": "drop_table <имя_таблицы>",
+    "create_index": "create_index <имя_таблицы> <столбец> [hash|sorted]",
+    "import": "import <имя_таблицы> <файл.csv|файл.jsonl> [размер_пакета]",
+    "compact": "compact <имя_таблицы>",
+    "stats": "stats [reset | dump <файл.json|файл.prom>]",
+    "fsync": "fsync <always|never|interval> [интервал_мс]",
+    "parallel": "parallel <порог_записей|off> [процессы]",
+    "profile": "profile <off|cpu|memory>",
+    "info": "info <имя_таблицы>",
+    "insert": "insert into <имя_таблицы> values (<значение1>, <значение2>, ...)",
+    "select": "select [<столбец1>, <столбец2> ...] from <имя_таблицы> [join <имя_таблицы> on <столбец> = <столбец>] [where <условие>] [group by <столбец>] [order by <столбец> [asc|desc]] [limit N] [offset M]", # noqa: E501
+    "explain": "explain select ...",
+    "update": "update <имя_таблицы> set <столбец> = <значение> where <условие>",
+    "delete": "delete from <имя_таблицы> where <условие>",
+}
+
+_TABLE_OPTIONS = ("storage", "engine", "compression")
+
+_statement_cache = OrderedDict()
+
+
+class Param:
+    """
+    Параметр ? подготовленной команды; значение подставляется при выполнении.
+    """
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return "?"
+
+
+class Statement:
+    """
+    Разобранная команда.
+
+    Команда разбирается один раз и хранится в кэше по тексту, а значения
+    параметров ? подставляются при каждом выполнении (см. bind).
+
+    Атрибуты:
+        kind (str): Имя команды, например "select"
+        args (dict): Аргументы команды
+        param_count (int): Количество параметров ?
+    """
+
+    __slots__ = ("kind", "args", "param_count")
+
+    def __init__(self, kind, args, param_count=0):
+        self.kind = kind
+        self.args = args
+        self.param_count = param_count
+
+    def bind(self, params=()):
+        """
+        Подставляет значения параметров в аргументы команды.
+
+        Args:
+            params (list): Значения параметров ? по порядку
+
+        Returns:
+            dict: Аргументы команды (новые списки и словари при каждом вызове)
+
+        Raises:
+            ValueError: Если количество значений не совпадает с числом параметров
+        """
+        params = list(params or ())
+        if len(params) != self.param_count:
+            raise ValueError(f"Команда ожидает параметров: {self.param_count}, передано: {len(params)}") # noqa: E501
+        return _bind(self.args, params)
+
+def _bind(value, params):
+    if isinstance(value, Param):
+        return params[value.index]
+    if isinstance(value, dict):
+        return {key: _bind(item, params) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_bind(item, params) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_bind(item, params) for item in value)
+    return value
+
+def tokenize(text):
+    """
+    Разбивает строку на лексемы за один проход.
+
+    Строки в кавычках возвращаются без кавычек; обратная косая черта
+    перед кавычкой или другой обратной косой чертой снимается.
+
+    Args:
+        text (str): Исходная строка
+
+    Returns:
+        list: Лексемы вида (тип, текст), где тип - string, op, punct,
+            param или word
+
+    Raises:
+        ValueError: Если в строке есть нераспознанный символ
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+
+    while pos < len(text):
+        match = _TOKEN_PATTERN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f'Не удалось разобрать команду около "{text[pos:]}"')
+        kind = match.lastgroup
+        text_part = match.group(kind)
+        if kind == "string":
+            text_part = _ESCAPE_PATTERN[text_part[0]].sub(r"\1", text_part[1:-1])
+        tokens.append((kind, text_part))
+        pos = match.end()
+
+    return tokens
+
+def _parse_literal(token):
+    """
+    Преобразует лексему в значение: строку, число или логическое значение.
+    """
+    kind, text = token
+
+    if kind == "string":
+        return text
+    if kind != "word":
+        raise ValueError(f'Ожидалось значение, получено "{text}"')
+
+    lowered = text.lower()
+    if lowered == 'true':
+        return True
+    if lowered == 'false':
+        return False
+    if _NUMBER_PATTERN.fullmatch(text):
+        return float(text) if "." in text else int(text)
+    return text
+
+
+class _Tokens:
+    """
+    Лексемы разбираемой команды и текущая позиция в них.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.param_count = 0
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else (None, None)
+
+    def keyword(self):
+        kind, text = self.peek()
+        return text.lower() if kind == "word" else None
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("Неожиданный конец команды")
+        self.pos += 1
+        return token
+
+    def accept(self, text):
+        """Пропускает лексему, если она совпадает с text."""
+        kind, token_text = self.peek()
+        if kind is not None and kind != "string" and token_text.lower() == text:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, text):
+        token = self.take()
+        if token[0] == "string" or token[1].lower() != text:
+            raise ValueError(f'Ожидалось "{text}", получено "{token[1]}"')
+
+    def name(self, what="имя"):
+        """Читает имя (слово или строку в кавычках)."""
+        kind, text = self.take()
+        if kind == "string":
+            return _parse_literal((kind, text))
+        if kind != "word":
+            raise ValueError(f'Ожидалось {what}, получено "{text}"')
+        return text
+
+    def value(self):
+        """Читает значение или параметр ?."""
+        token = self.take()
+        if token[0] == "param":
+            self.param_count += 1
+            return Param(self.param_count - 1)
+        return _parse_literal(token)
+
+    def number(self, what):
+        """Читает неотрицательное целое число или параметр ?."""
+        token = self.take()
+        if token[0] == "param":
+            self.param_count += 1
+            return Param(self.param_count - 1)
+        if token[0] != "word" or not token[1].isascii() or not token[1].isdigit():
+            raise ValueError(f'{what} должно быть целым числом, получено "{token[1]}"')
+        return int(token[1])
+
+    def names(self, what="имя столбца"):
+        """Читает список имен через запятую."""
+        result = [self.name(what)]
+        while self.accept(","):
+            result.append(self.name(what))
+        return result
+
+    def finish(self, what="команды"):
+        if not self.at_end():
+            raise ValueError(f'Лишний фрагмент {what}: "{self.peek()[1]}"')
+
+def _parse_expression(tokens):
+    """
+    Разбирает условие:
+
+        выражение  := конъюнкция (OR конъюнкция)*
+        конъюнкция := условие (AND условие)*
+        условие    := ( выражение )
+                    | столбец оператор значение
+                    | столбец IN ( значение [, значение ...] )
+                    | столбец BETWEEN значение AND значение
+    """
+    def parse_or():
+        nodes = [parse_and()]
+        while tokens.accept("or"):
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", tuple(nodes))
+
+    def parse_and():
+        nodes = [parse_condition()]
+        while tokens.accept("and"):
+            nodes.append(parse_condition())
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    def parse_condition():
+        if tokens.accept("("):
+            node = parse_or()
+            tokens.expect(")")
+            return node
+
+        kind, column = tokens.take()
+        if kind != "word":
+            raise ValueError(f'Ожидалось имя столбца, получено "{column}"')
+
+        if tokens.accept("in"):
+            tokens.expect("(")
+            values = [tokens.value()]
+            while tokens.accept(","):
+                values.append(tokens.value())
+            tokens.expect(")")
+            return ("in", column, tuple(values))
+
+        if tokens.accept("between"):
+            low = tokens.value()
+            tokens.expect("and")
+            high = tokens.value()
+            return ("between", column, low, high)
+
+        kind, op = tokens.take()
+        if kind != "op":
+            raise ValueError(f'Ожидался оператор сравнения, получено "{op}"')
+        return ("cmp", column, _OPERATORS[op], tokens.value())
+
+    return parse_or()
+
+@metrics.timed_phase("parse")
 def parse_where_clause(where_str):
     """
     Парсит условие WHERE.
-    
+
+    Поддерживаются операторы =, !=, <>, <, >, <=, >=, IN, BETWEEN,
+    связки AND и OR (AND связывает сильнее) и скобки.
+
     Args:
-        where_str (str): Строка условия, например "age = 28"
-    
+        where_str (str): Строка условия, например "age >= 18 and city = 'Moscow'"
+
     Returns:
-        dict: Словарь с условием вида {'age': 28}
+        tuple: Дерево условий, например ("cmp", "age", "=", 28),
+            ("in", "age", (1, 2)), ("between", "age", 18, 30)
+            или ("and"/"or", (условие, ...)); None для пустой строки
+
+    Raises:
+        ValueError: Если условие записано с ошибкой
     """
-    if not where_str:
+    if not where_str or not where_str.strip():
         return None
-    
-    where_str = where_str.strip()
-    
-    if '=' in where_str:
-        parts = where_str.split('=', 1)
-        column = parts[0].strip()
-        value = parts[1].strip()
-        
-        if (value.startswith('"') and value.endswith('"')) or \
-           (value.startswith("'") and value.endswith("'")):
-            value = value[1:-1]
-        
-        if value.lower() == 'true':
-            value = True
-        elif value.lower() == 'false':
-            value = False
-        elif value.isdigit():
-            value = int(value)
-        elif value.replace('.', '', 1).isdigit() and value.count('.') == 1:
-            value = float(value)
-        
-        return {column: value}
-    
-    return None
-
-def parse_set_clause(set_str):
-    """
-    Парсит условие SET.
-    
-    Args:
-        set_str (str): Строка условия, например "age = 29, name = 'John'"
-    
-    Returns:
-        dict: Словарь с обновлениями вида {'age': 29, 'name': 'John'}
-    """
-    if not set_str:
-        return {}
-    
-    result = {}
-
-    assignments = [a.strip() for a in set_str.split(',')]
-    
-    for assignment in assignments:
-        if '=' in assignment:
-            parts = assignment.split('=', 1)
-            column = parts[0].strip()
-            value = parts[1].strip()
-            
-            if (value.startswith('"') and value.endswith('"')) or \
-               (value.startswith("'") and value.endswith("'")):
-                value = value[1:-1]
-            
-            if value.lower() == 'true':
-                value = True
-            elif value.lower() == 'false':
-                value = False
-            elif value.isdigit():
-                value = int(value)
-            elif value.replace('.', '', 1).isdigit() and value.count('.') == 1:
-                value = float(value)
-            
-            result[column] = value
-    
-    return result
-
-def parse_values(values_str):
-    """
-    Парсит значения для INSERT.
-    
+
+    tokens = _Tokens(tokenize(where_str))
+    node = _parse_expression(tokens)
+    tokens.finish("условия")
+    return node
+
+def _parse_create_table(tokens):
+    table = tokens.name("имя таблицы")
+    columns = []
+    options = {}
+
+    while not tokens.at_end():
+        col_def = tokens.name("описание столбца")
+        if col_def.lower() in _TABLE_OPTIONS and tokens.accept("="):
+            options[col_def.lower()] = tokens.name("значение параметра").lower()
+            continue
+
+        if ":" not in col_def:
+            raise ValueError(f'Некорректный формат столбца "{col_def}". Используйте имя:тип') # noqa: E501
+        col_name, col_type = col_def.split(":", 1)
+        columns.append((col_name, col_type))
+
+    return {"table": table, "columns": columns, "options": options}
+
+def _parse_table(tokens):
+    return {"table": tokens.name("имя таблицы")}
+
+def _parse_create_index(tokens):
+    args = {"table": tokens.name("имя таблицы"), "column": tokens.name("имя столбца"),
+            "kind": "hash"}
+    if not tokens.at_end():
+        args["kind"] = tokens.name("тип индекса").lower()
+    return args
+
+def _parse_import(tokens):
+    args = {"table": tokens.name("имя таблицы"), "filepath": tokens.name("имя файла"),
+            "batch_size": None}
+    if not tokens.at_end():
+        args["batch_size"] = tokens.number("Размер пакета")
+    return args
+
+def _parse_stats(tokens):
+    if tokens.accept("reset"):
+        return {"action": "reset"}
+    if tokens.accept("dump"):
+        return {"action": "dump", "filepath": tokens.name("имя файла")}
+    return {"action": "show"}
+
+def _parse_fsync(tokens):
+    args = {"policy": tokens.name("политика").lower(), "interval_ms": None}
+    if not tokens.at_end():
+        args["interval_ms"] = tokens.number("Интервал")
+    return args
+
+def _parse_parallel(tokens):
+    threshold = 0 if tokens.accept("off") else tokens.number("Порог")
+    workers = None
+    if not tokens.at_end():
+        workers = tokens.number("Количество процессов")
+    return {"threshold": threshold, "workers": workers}
+
+def _parse_profile(tokens):
+    return {"mode": tokens.name("режим").lower()}
+
+def _parse_insert(tokens):
+    tokens.expect("into")
+    table = tokens.name("имя таблицы")
+    tokens.expect("values")
+    tokens.expect("(")
+    values = []
+    if not tokens.accept(")"):
+        values.append(tokens.value())
+        while tokens.accept(","):
+            values.append(tokens.value())
+        tokens.expect(")")
+    return {"table": table, "values": values}
+
+def _parse_select_item(tokens):
+    name = tokens.name("имя столбца")
+    if not tokens.accept("("):
+        return name
+
+    func = name.lower()
+    if func not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f'Неизвестная агрегатная функция "{name}"')
+    column = tokens.name("имя столбца или *")
+    tokens.expect(")")
+    return (func, column)
+
+def _parse_order_item(tokens):
+    column = _parse_select_item(tokens)
+    if tokens.accept("desc"):
+        return (column, True)
+    tokens.accept("asc")
+    return (column, False)
+
+def _parse_select(tokens):
+    items = []
+    if tokens.keyword() != "from":
+        items.append(_parse_select_item(tokens))
+        while tokens.accept(","):
+            items.append(_parse_select_item(tokens))
+    tokens.expect("from")
+
+    args = {"table": tokens.name("имя таблицы"), "join": None, "where": None,
+            "group_by": None, "order_by": None, "limit": None, "offset": 0}
+
+    if tokens.accept("join"):
+        right = tokens.name("имя таблицы")
+        tokens.expect("on")
+        left_column = tokens.name("имя столбца")
+        tokens.expect("=")
+        args["join"] = {"table": right, "on": (left_column, tokens.name("имя столбца"))}
+    if tokens.accept("where"):
+        args["where"] = _parse_expression(tokens)
+    if tokens.accept("group"):
+        tokens.expect("by")
+        args["group_by"] = tokens.names()
+    if tokens.accept("order"):
+        tokens.expect("by")
+        args["order_by"] = [_parse_order_item(tokens)]
+        while tokens.accept(","):
+            args["order_by"].append(_parse_order_item(tokens))
+    seen = set()
+    while tokens.keyword() in ("limit", "offset"):
+        keyword = tokens.take()[1].lower()
+        if keyword in seen:
+            raise ValueError(f"{keyword.upper()} указан повторно")
+        seen.add(keyword)
+        args[keyword] = tokens.number(f"Значение {keyword.upper()}")
+
+    # Пустой список и * означают все столбцы
+    columns = [item for item in items if item != "*"] or None
+    has_aggregates = any(isinstance(item, tuple) for item in items)
+    args["columns"] = None if has_aggregates else columns
+    args["aggregates"] = columns if has_aggregates else None
+    return args
+
+def _parse_explain(tokens):
+    tokens.expect("select")
+    return _parse_select(tokens)
+
+def _parse_update(tokens):
+    table = tokens.name("имя таблицы")
+    tokens.expect("set")
+
+    set_clause = {}
+    while True:
+        column = tokens.name("имя столбца")
+        tokens.expect("=")
+        set_clause[column] = tokens.value()
+        if not tokens.accept(","):
+            break
+
+    tokens.expect("where")
+    return {"table": table, "set": set_clause, "where": _parse_expression(tokens)}
+
+def _parse_delete(tokens):
+    tokens.expect("from")
+    table = tokens.name("имя таблицы")
+    tokens.expect("where")
+    return {"table": table, "where": _parse_expression(tokens)}
+
+def _no_args(tokens):
+    return {}
+
+_GRAMMAR = {
+    "help": _no_args,
+    "exit": _no_args,
+    "list_tables": _no_args,
+    "cache_stats": _no_args,
+    "begin": _no_args,
+    "commit": _no_args,
+    "rollback": _no_args,
+    "create_table": _parse_create_table,
+    "drop_table": _parse_table,
+    "create_index": _parse_create_index,
+    "import": _parse_import,
+    "compact": _parse_table,
+    "stats": _parse_stats,
+    "fsync": _parse_fsync,
+    "parallel": _parse_parallel,
+    "profile": _parse_profile,
+    "info": _parse_table,
+    "insert": _parse_insert,
+    "select": _parse_select,
+    "explain": _parse_explain,
+    "update": _parse_update,
+    "delete": _parse_delete,
+}
+
+@metrics.timed_phase("parse")
+def _compile_statement(text):
+    """Разбирает текст команды в объект Statement."""
+    tokens = _Tokens(tokenize(text))
+    if tokens.at_end():
+        raise ValueError("Пустая команда")
+
+    command = tokens.take()[1].lower()
+    grammar = _GRAMMAR.get(command)
+    if grammar is None:
+        raise ValueError(f"Неизвестная команда: {command}\nВведите 'help' для справки")
+
+    try:
+        args = grammar(tokens)
+        tokens.finish()
+    except ValueError as e:
+        raise ValueError(f"{e}\nИспользование: {USAGE[command]}") from None
+
+    return Statement(command, args, tokens.param_count)
+
+def parse_statement(text):
+    """
+    Разбирает команду с использованием кэша разобранных команд.
+
+    Команда с одинаковым текстом разбирается один раз; значения,
+    которые меняются между вызовами, передаются параметрами ?:
+
+        insert into users values (?, ?, ?)
+
     Args:
-        values_str (str): Строка со значениями, например '("Sergei", 28, true)'
-    
+        text (str): Текст команды
+
     Returns:
-        list: Список значений
-    """
-    if not values_str:
-        return []
-    
-    values_str = values_str.strip()
-    if values_str.startswith('(') and values_str.endswith(')'):
-        values_str = values_str[1:-1]
-    
-    parts = shlex.split(values_str.replace(',', ' '))
-    
-    values = []
-    for part in parts:
-        if part.lower() == 'true':
-            values.append(True)
-        elif part.lower() == 'false':
-            values.append(False)
-        elif part.isdigit():
-            values.append(int(part))
-        elif part.replace('.', '', 1).isdigit() and part.count('.') == 1:
-            values.append(float(part))
-        else:
-            if (part.startswith('"') and part.endswith('"')) or \
-               (part.startswith("'") and part.endswith("'")):
-                part = part[1:-1]
-            values.append(part)
-    
-    return values
\ No newline at end of file
+        Statement: Разобранная команда
+
+    Raises:
+        ValueError: Если команда неизвестна или записана с ошибкой
+    """
+    key = text.strip()
+    statement = _statement_cache.get(key)
+    if statement is not None:
+        _statement_cache.move_to_end(key)
+        metrics.increment("statement_cache_total", {"result": "hit"})
+        return statement
+
+    statement = _compile_statement(key)
+    metrics.increment("statement_cache_total", {"result": "miss"})
+    _statement_cache[key] = statement
+    if len(_statement_cache) > STATEMENT_CACHE_SIZE:
+        _statement_cache.popitem(last=False)
+    return statement
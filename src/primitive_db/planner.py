@@ -0,0 +1,267 @@
+import time
+from contextlib import contextmanager
+
+from . import zonemaps
+from .constants import PLANNER_INDEX_ROW_COST, PLANNER_RANGE_SELECTIVITY
+
+# Этапы выполнения, собираемые командой explain (None - сбор выключен)
+_trace = None
+
+
+def _selectivity(node, stats, row_count):
+    """
+    Оценивает долю записей, удовлетворяющих условию.
+
+    Равенство оценивается как 1 / число различных значений, диапазон
+    по числовому столбцу - долей отрезка [min, max], прочие диапазоны -
+    константой PLANNER_RANGE_SELECTIVITY. Условия AND считаются
+    независимыми.
+    """
+    kind = node[0]
+    if kind == "and":
+        result = 1.0
+        for child in node[1]:
+            result *= _selectivity(child, stats, row_count)
+        return result
+    if kind == "or":
+        miss = 1.0
+        for child in node[1]:
+            miss *= 1.0 - _selectivity(child, stats, row_count)
+        return 1.0 - miss
+
+    column = zonemaps.summary(stats, node[1])
+    present = 1.0 - column["nulls"] / row_count
+    low, high = column["min"], column["max"]
+
+    def equal(value):
+        if value is None:
+            return column["nulls"] / row_count
+        try:
+            if low is None or value < low or value > high:
+                return 0.0
+        except TypeError:
+            return 0.0
+        return present / max(column["distinct"], 1)
+
+    def fraction(start, stop):
+        if not all(isinstance(v, int) for v in (low, high, start, stop)):
+            return PLANNER_RANGE_SELECTIVITY * present
+        if high == low:
+            return present if start <= low <= stop else 0.0
+        start, stop = max(start, low), min(stop, high)
+        return max(0.0, (stop - start) / (high - low)) * present
+
+    if kind == "in":
+        return min(1.0, sum(equal(value) for value in node[2]))
+    if kind == "between":
+        return fraction(node[2], node[3])
+
+    _, _, op, value = node
+    if op == "=":
+        return equal(value)
+    if op == "!=":
+        return present - equal(value)
+    if low is None:
+        return 0.0
+    if op in ("<", "<="):
+        return fraction(low, value)
+    return fraction(value, high)
+
+def estimate_rows(node, stats, row_count):
+    """
+    Оценивает число записей, удовлетворяющих условию, по статистике.
+
+    Returns:
+        int: Оценка числа записей
+    """
+    if node is None or not row_count:
+        return row_count
+    return round(row_count * min(1.0, max(0.0, _selectivity(node, stats, row_count))))
+
+def _bounds_allow(op, value, low, high, nulls):
+    if op == "!=":
+        return nulls > 0 or low is None or not (low == high == value)
+    if low is None:
+        return False
+    if op == "=":
+        return low <= value <= high
+    if op == "<":
+        return low < value
+    if op == "<=":
+        return low <= value
+    if op == ">":
+        return high > value
+    return high >= value
+
+def chunk_may_match(node, chunk):
+    """
+    Проверяет по границам части, могут ли в ней быть подходящие записи.
+
+    Returns:
+        bool: False, если часть можно не просматривать
+    """
+    kind = node[0]
+    if kind == "and":
+        return all(chunk_may_match(child, chunk) for child in node[1])
+    if kind == "or":
+        return any(chunk_may_match(child, chunk) for child in node[1])
+
+    bounds = chunk["columns"].get(node[1])
+    if bounds is None:
+        return True
+    low, high, nulls = bounds
+
+    try:
+        if kind == "in":
+            return any(
+                nulls > 0 if value is None
+                else _bounds_allow("=", value, low, high, nulls)
+                for value in node[2]
+            )
+        if kind == "between":
+            return low is not None and high >= node[2] and low <= node[3]
+        _, _, op, value = node
+        if value is None:
+            return True
+        return _bounds_allow(op, value, low, high, nulls)
+    except TypeError:
+        return True
+
+def indexable(node, index_kinds):
+    """
+    Проверяет, можно ли ответить на условие по индексам
+    (по тем же правилам, что и predicates.index_candidates).
+
+    Args:
+        node (tuple): Дерево условий
+        index_kinds (dict): Типы индексов {столбец: hash|sorted}
+    """
+    if node is None or not index_kinds:
+        return False
+
+    kind = node[0]
+    if kind == "and":
+        return any(indexable(child, index_kinds) for child in node[1])
+    if kind == "or":
+        return all(indexable(child, index_kinds) for child in node[1])
+
+    index_kind = index_kinds.get(node[1])
+    if index_kind is None:
+        return False
+    if kind == "in" or (kind == "cmp" and node[2] == "="):
+        return True
+    return index_kind == "sorted" and (kind == "between" or node[2] != "!=")
+
+def plan(table_meta, node, row_count, allow_chunks=True):
+    """
+    Выбирает способ доступа к записям таблицы по условию.
+
+    Сравниваются стоимости (в просмотренных записях): полного
+    просмотра - число записей; пропуска частей - число записей в частях,
+    границы которых допускают условие; поиска по индексу - оценка
+    числа найденных записей, умноженная на PLANNER_INDEX_ROW_COST.
+    Без статистики индекс используется всегда, когда он применим.
+
+    Args:
+        table_meta (dict): Метаданные таблицы
+        node (tuple): Дерево условий или None
+        row_count (int): Число записей или None, если неизвестно
+        allow_chunks (bool): Допустим ли пропуск частей
+
+    Returns:
+        dict: План: access (scan, chunks или index), estimated (оценка
+            числа записей или None), cost, а для chunks - chunks
+            (части для просмотра) и chunk_count
+    """
+    stats = table_meta.get("stats")
+    can_index = indexable(node, table_meta.get("indexes", {}))
+
+    if stats is None or row_count is None:
+        return {"access": "index" if can_index else "scan", "estimated": None,
+                "cost": None}
+
+    estimated = estimate_rows(node, stats, row_count)
+    best = {"access": "scan", "estimated": estimated, "cost": row_count}
+
+    if node is not None and allow_chunks and stats["chunks"]:
+        chunks = [chunk for chunk in stats["chunks"] if chunk_may_match(node, chunk)]
+        cost = sum(chunk["rows"] for chunk in chunks)
+        if len(chunks) < len(stats["chunks"]) and cost < best["cost"]:
+            best = {"access": "chunks", "estimated": estimated, "cost": cost,
+                    "chunks": chunks, "chunk_count": len(stats["chunks"])}
+
+    if can_index:
+        cost = estimated * PLANNER_INDEX_ROW_COST
+        if cost < best["cost"]:
+            best = {"access": "index", "estimated": estimated, "cost": cost}
+
+    return best
+
+def describe(step):
+    """
+    Возвращает описание способа доступа для вывода explain.
+    """
+    access = step.get("access")
+    if access == "index":
+        return "поиск по индексу"
+    if access == "chunks":
+        return f'пропуск частей: просмотрено {len(step["chunks"])} из {step["chunk_count"]}' # noqa: E501
+    if access == "cache":
+        return "кэш запросов"
+    if access == "join":
+        return f'хэш-соединение ({step.get("strategy", "hash")})'
+    if access == "aggregate":
+        return "агрегаты по индексам и метаданным"
+    labels = {"binary": "двоичный файл", "columnar": "колоночное представление",
+              "parallel": "параллельно", "stream": "потоком"}
+    method = step.get("method")
+    if method in labels:
+        return f"полный просмотр ({labels[method]})"
+    return "полный просмотр"
+
+@contextmanager
+def trace():
+    """
+    Собирает этапы выполнения запроса для explain.
+
+    Yields:
+        list: Этапы в порядке завершения
+    """
+    global _trace
+    previous, _trace = _trace, []
+    try:
+        yield _trace
+    finally:
+        _trace = previous
+
+def tracing():
+    return _trace is not None
+
+def record(step):
+    """
+    Добавляет этап в собираемый план, если сбор включен.
+    """
+    if _trace is not None:
+        _trace.append(step)
+
+def traced(rows, step):
+    """
+    Считает записи этапа и время их получения (без времени потребителя)
+    и по завершении добавляет этап в план.
+    """
+    step["actual"] = 0
+    step["seconds"] = 0.0
+    iterator = iter(rows)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                step["seconds"] += time.perf_counter() - start
+            step["actual"] += 1
+            yield row
+    finally:
+        record(step)
@@ -0,0 +1,270 @@
+import bisect
+import operator
+
+from . import columnar, indexes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: без него условия вычисляются циклом
+    np = None
+
+COMPARATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+def normalize(where_clause):
+    """
+    Приводит условие WHERE к дереву условий.
+
+    Условие может быть задано деревом (см. parser.parse_where_clause)
+    или словарем вида {столбец: значение}, который означает равенство
+    всех перечисленных столбцов.
+
+    Returns:
+        tuple: Дерево условий или None, если условия нет
+    """
+    if not where_clause:
+        return None
+    if isinstance(where_clause, dict):
+        nodes = tuple(("cmp", key, "=", value) for key, value in where_clause.items())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+    return where_clause
+
+def referenced_columns(node):
+    """
+    Возвращает множество столбцов, упомянутых в условии.
+    """
+    if node is None:
+        return set()
+    if node[0] in ("and", "or"):
+        result = set()
+        for child in node[1]:
+            result |= referenced_columns(child)
+        return result
+    return {node[1]}
+
+def _safe(compare):
+    """Оборачивает сравнение так, что несравнимые типы дают False."""
+    def wrapper(item, value):
+        try:
+            return compare(item, value)
+        except TypeError:
+            return False
+    return wrapper
+
+def _compile_test(node):
+    """
+    Компилирует простое условие в функцию проверки значения столбца.
+    """
+    kind = node[0]
+
+    if kind == "in":
+        values = set(node[2])
+        return lambda item: item in values
+
+    if kind == "between":
+        _, _, low, high = node
+        less_equal = _safe(operator.le)
+        return lambda item: less_equal(low, item) and less_equal(item, high)
+
+    _, _, op, value = node
+    if op == "=":
+        return lambda item: item == value
+    if op == "!=":
+        return lambda item: item != value
+    compare = _safe(COMPARATORS[op])
+    return lambda item: compare(item, value)
+
+def compile_predicate(node):
+    """
+    Компилирует дерево условий в одну функцию проверки строки.
+
+    Разбор условия выполняется один раз на запрос, а для каждой строки
+    вызывается только полученное замыкание.
+
+    Args:
+        node (tuple): Дерево условий
+
+    Returns:
+        callable: Функция row -> bool
+    """
+    if node is None:
+        return lambda row: True
+
+    kind = node[0]
+
+    if kind in ("and", "or"):
+        children = [compile_predicate(child) for child in node[1]]
+        if kind == "and":
+            return lambda row: all(predicate(row) for predicate in children)
+        return lambda row: any(predicate(row) for predicate in children)
+
+    column = node[1]
+    if kind == "cmp" and node[2] == "=":
+        value = node[3]
+        return lambda row: row.get(column) == value
+
+    test = _compile_test(node)
+    return lambda row: test(row.get(column))
+
+def _sorted_range(index, low, high, include_low=True, include_high=True):
+    """
+    Возвращает ID строк сортированного индекса в диапазоне значений.
+
+    Граница None означает отсутствие ограничения.
+    """
+    values = index["values"]
+    lo, hi = 0, len(values)
+    if low is not None:
+        find = bisect.bisect_left if include_low else bisect.bisect_right
+        lo = find(values, low)
+    if high is not None:
+        find = bisect.bisect_right if include_high else bisect.bisect_left
+        hi = find(values, high)
+    return index["ids"][lo:hi]
+
+def index_candidates(node, table_indexes):
+    """
+    Подбирает ID строк-кандидатов по индексам.
+
+    Равенство и IN используют любой индекс, диапазоны - только
+    сортированный. Для AND достаточно одного индексируемого условия,
+    для OR индекс нужен каждой ветви.
+
+    Args:
+        node (tuple): Дерево условий
+        table_indexes (dict): Индексы таблицы {столбец: индекс}
+
+    Returns:
+        set: ID кандидатов или None, если индексы неприменимы
+    """
+    if node is None or not table_indexes:
+        return None
+
+    kind = node[0]
+
+    if kind in ("and", "or"):
+        results = [index_candidates(child, table_indexes) for child in node[1]]
+        if kind == "and":
+            known = [ids for ids in results if ids is not None]
+            return min(known, key=len) if known else None
+        if any(ids is None for ids in results):
+            return None
+        return set().union(*results)
+
+    index = table_indexes.get(node[1])
+    if index is None:
+        return None
+
+    try:
+        if kind == "in":
+            return {
+                row_id for value in node[2] for row_id in indexes.lookup(index, value)
+            }
+
+        if index["kind"] != "sorted":
+            if kind == "cmp" and node[2] == "=":
+                return set(indexes.lookup(index, node[3]))
+            return None
+
+        if kind == "between":
+            return set(_sorted_range(index, node[2], node[3]))
+
+        _, _, op, value = node
+        if op == "=":
+            return set(indexes.lookup(index, value))
+        if op in ("<", "<="):
+            return set(_sorted_range(index, None, value, include_high=op == "<="))
+        if op in (">", ">="):
+            return set(_sorted_range(index, value, None, include_low=op == ">="))
+    except TypeError:
+        return None
+
+    return None
+
+def filter_rows(table_data, node, table_indexes=None):
+    """
+    Возвращает строки, удовлетворяющие условию.
+
+    Если условие можно ответить по индексам, проверяются только
+    строки-кандидаты, иначе выполняется полный просмотр.
+    """
+    predicate = compile_predicate(node)
+    ids = index_candidates(node, table_indexes)
+    if ids is not None:
+        table_data = indexes.find_rows_by_ids(table_data, ids)
+    return [row for row in table_data if predicate(row)]
+
+def _numpy_values(column):
+    """Возвращает массив NumPy поверх столбца int или bool (или None)."""
+    if np is None:
+        return None
+    if column["type"] == "int":
+        return np.frombuffer(column["data"], dtype=np.int64)
+    if column["type"] == "bool":
+        return np.frombuffer(column["data"], dtype=np.uint8).astype(bool)
+    return None
+
+def positions(ctable, node):
+    """
+    Вычисляет номера строк колоночной таблицы, удовлетворяющих условию.
+
+    Равенство ищется по буферу столбца, остальные сравнения вычисляются
+    масками NumPy, если он установлен, или одним проходом по столбцу.
+
+    Returns:
+        list: Номера строк по возрастанию
+    """
+    length = ctable["length"]
+    if node is None:
+        return list(range(length))
+
+    kind = node[0]
+
+    if kind in ("and", "or"):
+        results = [positions(ctable, child) for child in node[1]]
+        if kind == "and":
+            result = set(results[0])
+            for other in results[1:]:
+                result &= set(other)
+        else:
+            result = set().union(*results)
+        return sorted(result)
+
+    test = _compile_test(node)
+    column = ctable["columns"].get(node[1])
+    if column is None:
+        return list(range(length)) if test(None) else []
+
+    if kind == "cmp" and node[2] == "=":
+        return columnar.column_positions(ctable, node[1], node[3])
+    if kind == "in":
+        result = set()
+        for value in node[2]:
+            result.update(columnar.column_positions(ctable, node[1], value))
+        return sorted(result)
+
+    if column["type"] == "dict":
+        # Условие проверяется один раз для каждого значения словаря
+        codes = {code for code, value in enumerate(column["values"]) if test(value)}
+        return columnar.code_positions(column, codes)
+
+    array = _numpy_values(column)
+    if array is not None:
+        try:
+            if kind == "between":
+                mask = (array >= node[2]) & (array <= node[3])
+            else:
+                mask = COMPARATORS[node[2]](array, node[3])
+            return np.flatnonzero(mask).tolist()
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    values = columnar.column_values(column)
+    return [i for i, value in enumerate(values) if test(value)]
@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from . import core, decorators, engine, parallel, parser, utils
+from .constants import DEFAULT_ENCODING, SERVER_HOST, SERVER_PORT
+from .session import Session
+
+TRANSACTION_COMMANDS = ("begin", "commit", "rollback")
+
+
+def _json_default(value):
+    """Преобразует значения, которые json не умеет сериализовать."""
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+def encode_response(response):
+    """
+    Кодирует ответ сервера в строку JSON Lines.
+    """
+    text = json.dumps(response, ensure_ascii=False, default=_json_default)
+    return (text + "\n").encode(DEFAULT_ENCODING)
+
+
+class Server:
+    """
+    Сервер базы данных поверх asyncio.
+
+    Принимает команды той же грамматики, что и REPL, по TCP или через
+    Unix-сокет и отвечает JSON. Запрос - одна строка: текст команды или
+    объект {"command": "...", "params": [...]} либо
+    {"commands": [...], "atomic": true}.
+    Ответ - одна строка JSON с полями ok, result, output и error.
+
+    Метаданные и таблицы остаются в памяти одного сеанса, общего
+    для всех клиентов. Команды выполняются по одной в отдельном потоке,
+    поэтому медленный запрос не мешает принимать соединения.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or Session()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._server = None
+        self._unix_path = None
+
+    def execute(self, command, params=()):
+        """
+        Выполняет одну команду и возвращает ответ.
+
+        Args:
+            command (str): Команда в грамматике REPL
+            params (list): Значения параметров ? команды
+
+        Returns:
+            dict: Ответ с полями ok, result, output и error
+        """
+        try:
+            statement = parser.parse_statement(command)
+        except ValueError as e:
+            return {"ok": False, "result": None, "output": "", "error": str(e)}
+
+        if statement.kind in TRANSACTION_COMMANDS:
+            # Сеанс общий для всех клиентов, поэтому транзакция
+            # задается только пакетом команд целиком
+            return {"ok": False, "result": None, "output": "",
+                    "error": 'Используйте пакет {"commands": [...], "atomic": true}'}
+
+        output = io.StringIO()
+        decorators.get_last_error()
+        result, error = None, None
+        with redirect_stdout(output):
+            try:
+                result = engine.run_command(self.session, statement, params,
+                                            collect_rows=True)
+            except Exception as e:
+                error = e
+        error = error or decorators.get_last_error()
+
+        return {
+            "ok": error is None,
+            "result": result,
+            "output": output.getvalue(),
+            "error": None if error is None else str(error),
+        }
+
+    def execute_batch(self, commands, atomic=True):
+        """
+        Выполняет список команд.
+
+        Пакет с atomic выполняется в транзакции: при первой ошибке
+        изменения отменяются, а оставшиеся команды не выполняются.
+
+        Args:
+            commands (list): Тексты команд или объекты
+                {"command": "...", "params": [...]}
+            atomic (bool): Выполнять пакет в одной транзакции
+
+        Returns:
+            dict: Ответ с полем results - ответами на отдельные команды
+        """
+        commands = [
+            (item.get("command", ""), item.get("params", ()))
+            if isinstance(item, dict) else (item, ())
+            for item in commands
+        ]
+        if not atomic:
+            results = [self.execute(command, params) for command, params in commands]
+            return {"ok": all(item["ok"] for item in results), "results": results}
+
+        with redirect_stdout(io.StringIO()):
+            core.begin_transaction()
+        if decorators.get_last_error() is not None:
+            return {"ok": False, "results": [],
+                    "error": "Не удалось открыть транзакцию"}
+
+        results = []
+        for command, params in commands:
+            response = self.execute(command, params)
+            results.append(response)
+            if not response["ok"]:
+                with redirect_stdout(io.StringIO()):
+                    core.rollback()
+                return {"ok": False, "results": results, "error": response["error"]}
+
+        with redirect_stdout(io.StringIO()):
+            committed = core.commit()
+        error = decorators.get_last_error()
+        return {"ok": bool(committed), "results": results,
+                "error": None if error is None else str(error)}
+
+    def handle_request(self, line):
+        """
+        Разбирает строку запроса и выполняет его.
+
+        Returns:
+            dict: Ответ или None, если клиент завершает соединение
+        """
+        text = line.decode(DEFAULT_ENCODING).strip()
+        if not text.startswith("{"):
+            request = {"command": text}
+        else:
+            try:
+                request = json.loads(text)
+            except json.JSONDecodeError as e:
+                return {"ok": False, "result": None, "output": "",
+                        "error": f"Некорректный JSON: {e}"}
+
+        if "commands" in request:
+            return self.execute_batch(request["commands"], request.get("atomic", True))
+
+        command = str(request.get("command", ""))
+        if command.strip().lower() == "exit":
+            return None
+        return self.execute(command, request.get("params", ()))
+
+    async def _handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                response = await loop.run_in_executor(
+                    self._executor, self.handle_request, line
+                )
+                if response is None:
+                    break
+                writer.write(encode_response(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None):
+        """
+        Начинает принимать соединения по TCP или через Unix-сокет.
+        """
+        utils.set_session(self.session)
+        decorators.set_auto_confirm(True)
+        # Пул параллельного просмотра создается при запуске, а не в запросе
+        threshold, workers = parallel.get_options()
+        if threshold and workers > 1:
+            parallel.start_pool()
+
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self._unix_path = unix_path
+            self._server = await asyncio.start_unix_server(
+                self._handle_client, path=unix_path
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_client, host=host, port=port
+            )
+        return self._server
+
+    async def close(self):
+        """
+        Закрывает сокет и записывает на диск изменения сеанса.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._unix_path and os.path.exists(self._unix_path):
+            os.remove(self._unix_path)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.session.flush)
+        self._executor.shutdown()
+        parallel.shutdown_pool()
+        utils.set_session(None)
+
+    async def serve_forever(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None):
+        """
+        Запускает сервер и обслуживает клиентов до остановки.
+        """
+        server = await self.start(host, port, unix_path)
+        address = unix_path or f"{host}:{port}"
+        print(f"Сервер запущен: {address}")
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+
+def main(argv=None):
+    """
+    Точка входа режима сервера: database serve [параметры].
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog="database serve", description="Сервер базы данных primitive_db"
+    )
+    arg_parser.add_argument("--host", default=SERVER_HOST)
+    arg_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    arg_parser.add_argument("--unix", help="путь к Unix-сокету вместо TCP")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        asyncio.run(Server().serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\nСервер остановлен.")
@@ -0,0 +1,377 @@
+import copy
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from . import utils
+from .constants import LOCK_SUFFIX, SESSION_MAX_RESIDENT
+
+
+class Session:
+    """
+    Долгоживущий сеанс работы с базой данных.
+
+    Сеанс один раз загружает метаданные и держит в памяти недавно
+    использованные таблицы и индексы. Изменения помечаются как грязные
+    и записываются на диск методом flush. Перед каждым обращением
+    сеанс сверяет отпечатки файлов (mtime, размер, inode) и перечитывает
+    то, что было изменено другим процессом.
+
+    Пока сеанс активен (см. utils.set_session), функции utils.load_*
+    и utils.save_* работают через него.
+
+    Между begin и commit изменения только накапливаются в памяти:
+    commit записывает каждую затронутую таблицу один раз одной
+    фиксацией, rollback отбрасывает их.
+
+    В пакетном режиме (begin_batch) изменения команд тоже не записываются
+    сразу, а блокировки таблиц удерживаются: end_batch записывает
+    все изменения одной фиксацией. В отличие от транзакции, пакет
+    не отменяется при ошибке и допускает изменение схемы.
+
+    Пример:
+        with Session() as session:
+            core.insert(session.metadata, "users", ["Sergei", 28, True])
+    """
+
+    def __init__(self, metadata_path=utils.METADATA_FILE,
+                 max_resident=SESSION_MAX_RESIDENT):
+        self.metadata_path = metadata_path
+        self.max_resident = max_resident
+        self.metadata = utils.read_metadata(metadata_path)
+        self.metadata_dirty = False
+        self._metadata_base = copy.deepcopy(self.metadata)
+        self._metadata_stamp = utils.file_stamp([metadata_path])
+        self._entries = OrderedDict()
+        self.in_transaction = False
+        self.batch = False
+
+    def __enter__(self):
+        utils.set_session(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if self.in_transaction:
+                if exc_type is None:
+                    self.commit()
+                else:
+                    self.rollback()
+            if self.batch:
+                self.end_batch()
+            self.flush()
+        finally:
+            utils.set_session(None)
+        return False
+
+    def refresh(self):
+        """
+        Перечитывает метаданные, если файл изменен другим процессом.
+
+        Returns:
+            dict: Актуальные метаданные
+        """
+        stamp = utils.file_stamp([self.metadata_path])
+        if stamp != self._metadata_stamp:
+            self._merge_metadata(utils.read_metadata(self.metadata_path))
+            self._metadata_stamp = stamp
+        return self.metadata
+
+    def _merge_metadata(self, disk):
+        """
+        Объединяет метаданные с диска с несохраненными изменениями сеанса.
+
+        Описания таблиц, измененные сеансом с момента последнего чтения,
+        берутся из памяти, остальные - с диска. Словарь метаданных
+        обновляется на месте, так что ссылки на него остаются верными.
+        """
+        current, base = self.metadata, self._metadata_base
+        merged = dict(disk)
+        if self.metadata_dirty:
+            for name in set(current) | set(base):
+                if current.get(name) != base.get(name):
+                    if name in current:
+                        merged[name] = current[name]
+                    else:
+                        merged.pop(name, None)
+        current.clear()
+        current.update(merged)
+        self._metadata_base = copy.deepcopy(disk)
+
+    def set_metadata(self, data):
+        """
+        Заменяет метаданные сеанса и помечает их для записи.
+        """
+        self.metadata = data
+        self.metadata_dirty = True
+
+    def load(self, key, paths, reader):
+        """
+        Возвращает резидентное значение или читает его с диска.
+
+        Args:
+            key (hashable): Ключ значения, например ("table", "users")
+            paths (list): Файлы, из которых состоит значение
+            reader (callable): Функция чтения значения с диска
+
+        Returns:
+            Значение
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._is_current(entry):
+                self._entries.move_to_end(key)
+                return entry["value"]
+            del self._entries[key]
+
+        stamp = utils.file_stamp(paths)
+        value = reader()
+        self._remember(key, {"value": value, "paths": paths, "stamp": stamp,
+                             "dirty": False, "writer": None})
+        return value
+
+    def store(self, key, paths, value, writer):
+        """
+        Запоминает новое значение и помечает его для записи.
+
+        Args:
+            key (hashable): Ключ значения
+            paths (list): Файлы, из которых состоит значение
+            value: Новое значение
+            writer (callable): Функция записи значения на диск
+        """
+        self._remember(key, {"value": value, "paths": paths, "stamp": None,
+                             "dirty": True, "writer": writer})
+        return True
+
+    def stage_records(self, key, paths, value, records, writer):
+        """
+        Запоминает новое значение и накапливает записи журнала для него.
+
+        При flush накопленные записи передаются в writer одним списком.
+
+        Args:
+            key (hashable): Ключ значения
+            paths (list): Файлы, из которых состоит значение
+            value: Новое значение
+            records (list): Записи журнала, описывающие изменение
+            writer (callable): Функция записи накопленных записей на диск
+        """
+        entry = self._entries.get(key)
+        staged = []
+        if entry is not None and entry["dirty"] and "records" in entry:
+            staged = entry["records"]
+        staged.extend(records)
+        self._remember(key, {"value": value, "paths": paths, "stamp": None,
+                             "dirty": True, "records": staged,
+                             "writer": lambda _value: writer(staged)})
+
+    def begin_batch(self):
+        """
+        Включает пакетный режим: изменения команд записываются
+        только при end_batch.
+        """
+        self.batch = True
+
+    def end_batch(self):
+        """
+        Записывает изменения пакета и освобождает блокировки таблиц.
+        """
+        self.batch = False
+        try:
+            self.flush()
+        finally:
+            if not self.in_transaction:
+                utils.release_locks()
+
+    def begin(self):
+        """
+        Открывает транзакцию: изменения до commit остаются в памяти.
+        """
+        if self.in_transaction:
+            raise ValueError("Транзакция уже открыта")
+        # Изменения, сделанные до транзакции, в нее не входят
+        self.flush()
+        self.in_transaction = True
+
+    def commit(self):
+        """
+        Фиксирует транзакцию одной записью всех затронутых файлов.
+
+        Если запись не удалась, транзакция отменяется целиком.
+        """
+        if not self.in_transaction:
+            raise ValueError("Нет открытой транзакции")
+        self.in_transaction = False
+        try:
+            self.flush()
+        except Exception:
+            self.discard_changes()
+            raise
+        finally:
+            utils.release_locks()
+
+    def rollback(self):
+        """
+        Отменяет транзакцию, отбрасывая накопленные изменения.
+        """
+        if not self.in_transaction:
+            raise ValueError("Нет открытой транзакции")
+        self.in_transaction = False
+        try:
+            self.discard_changes()
+        finally:
+            utils.release_locks()
+
+    def discard_changes(self):
+        """Выгружает все значения и перечитывает метаданные с диска."""
+        # Чистые значения тоже могли быть изменены на месте (например,
+        # индексы таблиц с журналом), поэтому выгружается все
+        self._entries.clear()
+        self.metadata_dirty = False
+        self._merge_metadata(utils.read_metadata(self.metadata_path))
+        self._metadata_stamp = utils.file_stamp([self.metadata_path])
+
+    def resident(self, key):
+        """
+        Возвращает значение, если оно уже находится в памяти и актуально.
+        """
+        entry = self._entries.get(key)
+        if entry is None or not self._is_current(entry):
+            return None
+        return entry["value"]
+
+    @staticmethod
+    def _is_current(entry):
+        """Проверяет, что значение не устарело относительно файлов."""
+        return (entry["dirty"] or entry.get("pending")
+                or entry["stamp"] == utils.file_stamp(entry["paths"]))
+
+    def is_dirty(self, key):
+        """
+        Проверяет, есть ли у значения незаписанные изменения.
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry["dirty"]
+
+    def forget(self, key):
+        """
+        Выгружает значение из памяти, предварительно записав изменения.
+        """
+        self.flush(key)
+        self._entries.pop(key, None)
+
+    def discard(self, key):
+        """
+        Выгружает значение из памяти без записи изменений
+        (например, когда файлы значения удаляются).
+        """
+        self._entries.pop(key, None)
+
+    def sync(self, key, value):
+        """
+        Запоминает значение, уже совпадающее с файлами на диске.
+
+        Используется после того, как файлы изменены в обход сеанса
+        (например, после записи в журнал таблицы).
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry["value"] = value
+        entry["dirty"] = False
+        entry["stamp"] = utils.file_stamp(entry["paths"])
+
+    def follow(self, key):
+        """
+        Отмечает, что значение уже изменено так же, как изменяются его
+        файлы текущей командой (например, колоночное представление
+        после дописывания записей).
+
+        До следующей полной записи (flush без ключа) значение считается
+        актуальным, а после нее запоминает новые отпечатки файлов.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["pending"] = True
+
+    def flush(self, key=None):
+        """
+        Записывает на диск грязные значения и метаданные.
+
+        Все записи одного вызова фиксируются вместе (см. utils.write_group),
+        метаданные - последними.
+
+        Args:
+            key (hashable): Ключ значения; по умолчанию записывается все
+        """
+        keys = [key] if key is not None else list(self._entries)
+        written = []
+        write_metadata = key is None and self.metadata_dirty
+        # Метаданные общие для всех таблиц: чтение, объединение и запись
+        # выполняются под блокировкой, чтобы не потерять чужие изменения
+        lock = (utils.file_lock(self.metadata_path + LOCK_SUFFIX)
+                if write_metadata else nullcontext())
+
+        with lock:
+            self._write(keys, written, write_metadata)
+
+            # Отпечатки снимаются после замены файлов при фиксации группы
+            for entry in written:
+                entry["stamp"] = utils.file_stamp(entry["paths"])
+            if key is None:
+                for entry in self._entries.values():
+                    if entry.pop("pending", False):
+                        entry["stamp"] = utils.file_stamp(entry["paths"])
+            if write_metadata:
+                self._metadata_stamp = utils.file_stamp([self.metadata_path])
+
+        self._evict()
+
+    def _write(self, keys, written, write_metadata):
+        """
+        Записывает значения и метаданные одной группой записи.
+
+        Если хотя бы одно значение или метаданные записать не удалось,
+        группа отменяется целиком (см. utils.write_group), а изменения
+        сеанса отбрасываются: иначе на диск попали бы метаданные
+        (количество записей, счетчик ID, статистика), описывающие
+        незаписанные данные.
+        """
+        try:
+            with utils.write_group():
+                for item_key in keys:
+                    entry = self._entries.get(item_key)
+                    if entry is None or not entry["dirty"]:
+                        continue
+                    if entry["writer"](entry["value"]) is False:
+                        name = "/".join(map(str, item_key[1:]))
+                        raise OSError(f'Не удалось записать "{name}", изменения не сохранены') # noqa: E501
+                    written.append(entry)
+
+                if write_metadata:
+                    self._merge_metadata(utils.read_metadata(self.metadata_path))
+                    if utils.write_metadata(self.metadata, self.metadata_path) is False:
+                        raise OSError("Не удалось записать метаданные, изменения не сохранены") # noqa: E501
+        except Exception:
+            written.clear()
+            self.discard_changes()
+            raise
+
+        for entry in written:
+            entry["dirty"] = False
+        if write_metadata:
+            self.metadata_dirty = False
+            self._metadata_base = copy.deepcopy(self.metadata)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        """Выгружает давно не использованные значения сверх лимита."""
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_resident:
+                break
+            if not self._entries[key]["dirty"]:
+                del self._entries[key]
@@ -0,0 +1,114 @@
+import heapq
+import json
+import os
+import tempfile
+
+from . import metrics
+from .constants import DATA_DIR, DEFAULT_ENCODING, SORT_MEMORY_ROWS
+
+
+class _Descending:
+    """
+    Обертка значения, сравнивающаяся в обратном порядке (для DESC).
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+def sort_key(order_by):
+    """
+    Строит функцию ключа сортировки записей.
+
+    Пустые значения (None) считаются меньше любых других, то есть
+    идут первыми при ASC и последними при DESC.
+
+    Args:
+        order_by (list): Пары (столбец, по_убыванию)
+
+    Returns:
+        callable: Функция row -> ключ
+    """
+    def part(column, descending):
+        def get(row):
+            value = row.get(column)
+            return (value is not None, value)
+        return (lambda row: _Descending(get(row))) if descending else get
+
+    parts = [part(column, descending) for column, descending in order_by]
+    if len(parts) == 1:
+        return parts[0]
+    return lambda row: tuple(get(row) for get in parts)
+
+def top_k(rows, order_by, k):
+    """
+    Возвращает первые k записей в порядке сортировки.
+
+    Используется куча из k элементов: O(n log k) времени и O(k) памяти.
+    Записи с равными ключами сохраняют исходный порядок.
+    """
+    return heapq.nsmallest(k, rows, key=sort_key(order_by))
+
+def _write_run(directory, number, rows):
+    path = os.path.join(directory, f"run.{number}.jsonl")
+    with open(path, "w", encoding=DEFAULT_ENCODING) as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+def _read_run(path):
+    with open(path, "r", encoding=DEFAULT_ENCODING) as f:
+        for line in f:
+            yield json.loads(line)
+
+def sort_rows(rows, order_by, memory_rows=SORT_MEMORY_ROWS):
+    """
+    Лениво выдает записи в порядке сортировки.
+
+    Результат, умещающийся в memory_rows записей, сортируется в памяти.
+    Больший результат сортируется внешней сортировкой: записи делятся
+    на отсортированные серии по memory_rows, серии записываются во
+    временные файлы в каталоге данных и затем сливаются одним проходом.
+    Сортировка устойчива.
+
+    Args:
+        rows (iterable): Записи
+        order_by (list): Пары (столбец, по_убыванию)
+        memory_rows (int): Наибольшее число записей в памяти
+
+    Yields:
+        dict: Записи в порядке сортировки
+    """
+    key = sort_key(order_by)
+    rows = iter(rows)
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) > memory_rows:
+            break
+    else:
+        buffer.sort(key=key)
+        yield from buffer
+        return
+
+    metrics.increment("sort_spills_total")
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="sort_", dir=DATA_DIR) as directory:
+        runs = []
+        while buffer:
+            buffer.sort(key=key)
+            runs.append(_write_run(directory, len(runs), buffer))
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= memory_rows:
+                    break
+
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=key)
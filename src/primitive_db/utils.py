@@ -1,7 +1,448 @@
+import atexit
+import bisect
+import csv
 import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
 
-from constants import DATA_DIR, DEFAULT_ENCODING, JSON_INDENT, METADATA_FILE
+from . import columnar, metrics
 
+try:
+    import fcntl
+except ImportError:  # fcntl есть только в POSIX: без него файлы не блокируются
+    fcntl = None
+from .constants import (
+    BINARY_MAGIC,
+    BINARY_SUFFIX,
+    DATA_DIR,
+    DB_META_FILE,
+    DEFAULT_ENCODING,
+    FSYNC_INTERVAL_MS,
+    FSYNC_POLICIES,
+    FSYNC_POLICY,
+    JSON_INDENT,
+    LOCK_RETRY_MS,
+    LOCK_SUFFIX,
+    LOCK_TIMEOUT_MS,
+    LOG_SUFFIX,
+    STREAM_BATCH_ROWS,
+    STREAM_CHUNK_SIZE,
+)
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+METADATA_FILE = DB_META_FILE
+
+
+_session = None
+
+_fsync_policy = FSYNC_POLICY
+_fsync_interval = FSYNC_INTERVAL_MS / 1000
+_last_fsync = 0.0
+_unsynced = set()
+_sync_lock = threading.Lock()
+_sync_timer = None
+_write_group = None
+_held_locks = {}
+
+def set_session(session):
+    """
+    Делает сеанс активным: загрузка и сохранение метаданных, таблиц
+    и индексов будут выполняться через него (см. session.Session).
+    
+    Args:
+        session (Session): Сеанс или None, чтобы работать с файлами напрямую
+    """
+    global _session
+    _session = session
+
+def get_session():
+    """
+    Возвращает активный сеанс или None.
+    """
+    return _session
+
+def file_stamp(paths):
+    """
+    Возвращает отпечаток файлов: время изменения, размер и inode каждого.
+    
+    Отсутствующий файл дает None, поэтому создание и удаление файлов
+    тоже меняют отпечаток.
+    
+    Args:
+        paths (list): Пути к файлам
+    
+    Returns:
+        tuple: Отпечаток
+    """
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(stamp)
+
+def set_fsync_policy(policy, interval_ms=None):
+    """
+    Задает политику сброса записанных файлов на диск (fsync).
+    
+    Args:
+        policy (str): always - после каждой фиксации, interval - не чаще
+            одного раза в interval_ms миллисекунд, never - полагаться на ОС
+        interval_ms (int): Интервал для политики interval
+    """
+    global _fsync_policy, _fsync_interval
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f'Некорректная политика fsync "{policy}"')
+    if interval_ms is not None:
+        if interval_ms < 0:
+            raise ValueError("Интервал fsync не может быть отрицательным")
+        _fsync_interval = interval_ms / 1000
+    _fsync_policy = policy
+
+def get_fsync_policy():
+    """
+    Возвращает политику fsync и интервал в миллисекундах.
+    """
+    return _fsync_policy, round(_fsync_interval * 1000)
+
+def _fsync_due():
+    if _fsync_policy == "always":
+        return True
+    if _fsync_policy == "never":
+        return False
+    return time.monotonic() - _last_fsync >= _fsync_interval
+
+def _fsync_path(path):
+    """Сбрасывает на диск файл или каталог (каталоги - только в POSIX)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _take_unsynced():
+    """Забирает файлы, ожидающие сброса, и отменяет таймер сброса."""
+    global _sync_timer
+    with _sync_lock:
+        paths = set(_unsynced)
+        _unsynced.clear()
+        if _sync_timer is not None:
+            _sync_timer.cancel()
+            _sync_timer = None
+    return paths
+
+def _defer_sync(paths):
+    """
+    Запоминает файлы для сброса по политике interval и заводит таймер,
+    который сбросит их не позже чем через интервал после прошлого сброса.
+    """
+    global _sync_timer
+    with _sync_lock:
+        _unsynced.update(paths)
+        if _sync_timer is None:
+            delay = max(0.0, _fsync_interval - (time.monotonic() - _last_fsync))
+            _sync_timer = threading.Timer(delay, sync_pending)
+            _sync_timer.daemon = True
+            _sync_timer.start()
+
+def sync_pending():
+    """
+    Сбрасывает на диск файлы, отложенные политикой interval.
+    
+    Вызывается таймером после интервала и при завершении процесса
+    (atexit), поэтому последние изменения перед простоем или выходом
+    из REPL, сервера или пакетного режима не остаются без fsync.
+    """
+    global _last_fsync
+    paths = _take_unsynced()
+    if not paths:
+        return
+    for path in paths:
+        _fsync_path(path)
+    for directory in {os.path.dirname(path) or "." for path in paths}:
+        _fsync_path(directory)
+    _last_fsync = time.monotonic()
+
+atexit.register(sync_pending)
+
+def _commit(pending, appended=()):
+    """
+    Фиксирует группу записей.
+    
+    Временные файлы сбрасываются на диск, затем атомарно заменяют
+    целевые файлы (в порядке записи), после чего один раз сбрасываются
+    каталоги. При политике interval, если сброс еще не нужен, файлы
+    запоминаются и будут сброшены следующей фиксацией или таймером
+    (см. sync_pending); при политике never они не сбрасываются.
+    """
+    global _last_fsync
+    sync = _fsync_due()
+    
+    unsynced = set()
+    if sync:
+        unsynced = _take_unsynced()
+        for tmp_path, _ in pending:
+            _fsync_path(tmp_path)
+        for path in unsynced | set(appended):
+            _fsync_path(path)
+    
+    for tmp_path, filepath in pending:
+        os.replace(tmp_path, filepath)
+    
+    targets = {filepath for _, filepath in pending} | set(appended)
+    if not sync:
+        if _fsync_policy == "interval":
+            _defer_sync(targets)
+        return
+    
+    for directory in {os.path.dirname(path) or "." for path in targets | unsynced}:
+        _fsync_path(directory)
+    _last_fsync = time.monotonic()
+
+@contextmanager
+def write_group():
+    """
+    Объединяет записи файлов в одну фиксацию.
+    
+    Внутри группы atomic_write только готовит временные файлы,
+    а замена целевых файлов и fsync выполняются при выходе из группы.
+    Так изменения данных, индексов и метаданных одной команды
+    фиксируются вместе. Вложенные группы входят во внешнюю.
+    
+    При исключении группа отменяется: временные файлы удаляются,
+    а дописанные в группе журналы обрезаются до прежнего размера.
+    """
+    global _write_group
+    if _write_group is not None:
+        yield
+        return
+    
+    group = _write_group = {"pending": [], "appended": [], "sizes": {}}
+    try:
+        yield
+    except BaseException:
+        for tmp_path, _ in group["pending"]:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        for filepath, size in group["sizes"].items():
+            if os.path.exists(filepath):
+                os.truncate(filepath, size)
+        raise
+    finally:
+        _write_group = None
+    
+    _commit(group["pending"], group["appended"])
+
+def atomic_write(filepath, writer, binary=False):
+    """
+    Записывает файл через временный файл и атомарную замену.
+    
+    При сбое во время записи на диске остается прежняя версия файла.
+    
+    Args:
+        filepath (str): Путь к целевому файлу
+        writer (callable): Функция, записывающая содержимое в открытый файл
+        binary (bool): Открыть файл в двоичном режиме
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    tmp_path = filepath + ".tmp"
+    if binary:
+        f = open(tmp_path, 'wb')
+    else:
+        f = open(tmp_path, 'w', encoding=DEFAULT_ENCODING)
+    try:
+        with f:
+            writer(f)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    
+    if _write_group is not None:
+        _write_group["pending"] = [
+            item for item in _write_group["pending"] if item[1] != filepath
+        ]
+        _write_group["pending"].append((tmp_path, filepath))
+    else:
+        _commit([(tmp_path, filepath)])
+
+def _appending(filepath):
+    """
+    Запоминает размер файла перед дозаписью, чтобы отмена группы
+    могла его восстановить.
+    """
+    if _write_group is not None and filepath not in _write_group["sizes"]:
+        try:
+            size = os.path.getsize(filepath)
+        except FileNotFoundError:
+            size = 0
+        _write_group["sizes"][filepath] = size
+
+def _appended(filepath):
+    """Учитывает дописанный файл в текущей фиксации."""
+    if _write_group is not None:
+        _write_group["appended"].append(filepath)
+    else:
+        _commit([], [filepath])
+
+def acquire_lock(path):
+    """
+    Захватывает исключительную блокировку файла (fcntl.flock).
+    
+    Повторный захват той же блокировки в процессе только увеличивает
+    счетчик, поэтому вложенные операции не блокируют сами себя.
+    
+    Блокировка запрашивается без ожидания (LOCK_NB) и повторяется
+    каждые LOCK_RETRY_MS, пока не истечет LOCK_TIMEOUT_MS. Транзакция
+    удерживает блокировки таблиц в порядке первой записи, поэтому
+    бесконечное ожидание привело бы к взаимной блокировке процессов,
+    пишущих в те же таблицы в разном порядке.
+    
+    Файл блокировки может быть удален владельцем (drop_table), пока
+    другой процесс ждет его дескриптор. Поэтому после захвата
+    проверяется, что дескриптор все еще указывает на файл по пути;
+    если нет, файл открывается заново.
+    
+    Args:
+        path (str): Путь к файлу блокировки
+    
+    Raises:
+        TimeoutError: Если блокировку держит другой процесс дольше
+            LOCK_TIMEOUT_MS
+    """
+    held = _held_locks.get(path)
+    if held is not None:
+        held["count"] += 1
+        return
+    
+    fd = None
+    if fcntl is not None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        deadline = time.monotonic() + LOCK_TIMEOUT_MS / 1000
+        while fd is None:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(
+                                f"Файл {path} заблокирован другим процессом"
+                            ) from None
+                        time.sleep(LOCK_RETRY_MS / 1000)
+                if not _same_file(fd, path):
+                    os.close(fd)
+                    fd = None
+            except BaseException:
+                os.close(fd)
+                raise
+    _held_locks[path] = {"fd": fd, "count": 1}
+
+def _same_file(fd, path):
+    """Проверяет, что дескриптор открыт на файл, который сейчас лежит по пути."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (stat.st_dev, stat.st_ino) == (opened.st_dev, opened.st_ino)
+
+def release_lock(path):
+    """
+    Освобождает блокировку, захваченную acquire_lock.
+    
+    Если файл блокировки помечен к удалению (удалена таблица), он
+    удаляется до снятия блокировки: процессы, ожидающие его, заметят
+    это и откроют файл заново.
+    """
+    held = _held_locks.get(path)
+    if held is None:
+        return
+    held["count"] -= 1
+    if held["count"] > 0:
+        return
+    
+    del _held_locks[path]
+    if held.get("remove"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if held["fd"] is not None:
+        fcntl.flock(held["fd"], fcntl.LOCK_UN)
+        os.close(held["fd"])
+
+def release_locks():
+    """
+    Освобождает все блокировки процесса (в конце транзакции).
+    """
+    for path in list(_held_locks):
+        _held_locks[path]["count"] = 1
+        release_lock(path)
+
+@contextmanager
+def file_lock(path):
+    """
+    Контекстный менеджер исключительной блокировки файла.
+    """
+    acquire_lock(path)
+    try:
+        yield
+    finally:
+        release_lock(path)
+
+@contextmanager
+def table_write_lock(table_name):
+    """
+    Сериализует изменение таблицы между процессами.
+    
+    Под блокировкой сеанс перечитывает метаданные и таблицу, если их
+    изменил другой процесс, а изменения записываются на диск до ее
+    освобождения. Внутри транзакции блокировка удерживается до commit
+    или rollback, в пакетном режиме - до Session.end_batch. Читатели
+    блокировку не берут: файлы заменяются атомарно, поэтому чтение
+    видит целый снимок и не ждет писателя.
+    
+    Args:
+        table_name (str): Имя таблицы
+    """
+    path = table_path(table_name, LOCK_SUFFIX)
+    try:
+        acquire_lock(path)
+    except TimeoutError:
+        raise TimeoutError(
+            f'Таблица "{table_name}" заблокирована другим процессом, '
+            "повторите команду позже"
+        ) from None
+    try:
+        if _session is not None:
+            _session.refresh()
+        yield
+        if _session is not None and not writes_deferred():
+            _session.flush()
+    finally:
+        if not writes_deferred():
+            release_lock(path)
 
 def load_metadata(filepath=METADATA_FILE):
     """
@@ -13,6 +454,16 @@ def load_metadata(filepath=METADATA_FILE):
     Returns:
         dict: Загруженные данные или пустой словарь
     """
+    if _session is not None and filepath == _session.metadata_path:
+        return _session.refresh()
+    
+    return read_metadata(filepath)
+
+@metrics.timed_phase("load")
+def read_metadata(filepath=METADATA_FILE):
+    """
+    Читает метаданные из JSON-файла в обход сеанса.
+    """
     try:
         with open(filepath, 'r', encoding=DEFAULT_ENCODING) as f:
             return json.load(f)
@@ -33,15 +484,56 @@ def save_metadata(data=None, filepath=METADATA_FILE):
     if data is None:
         data = {}
     
+    if _session is not None and filepath == _session.metadata_path:
+        _session.set_metadata(data)
+        return
+    
+    write_metadata(data, filepath)
+
+@metrics.timed_phase("save")
+def write_metadata(data, filepath=METADATA_FILE):
+    """
+    Записывает метаданные в JSON-файл в обход сеанса.
+    
+    Returns:
+        bool: True, если метаданные записаны
+    """
     try:
-        with open(filepath, 'w', encoding=DEFAULT_ENCODING) as f:
-            json.dump(data, f, indent=JSON_INDENT, ensure_ascii=False)
+        atomic_write(
+            filepath,
+            lambda f: json.dump(data, f, indent=JSON_INDENT, ensure_ascii=False),
+        )
+        return True
     except Exception as e:
         print(f"Ошибка при сохранении файла {filepath}: {e}")
+        return False
+
+def table_path(table_name, suffix=".json"):
+    """
+    Возвращает путь к файлу таблицы в каталоге данных.
+    
+    Args:
+        table_name (str): Имя таблицы
+        suffix (str): Окончание имени файла
+    
+    Returns:
+        str: Путь к файлу
+    """
+    return os.path.join(DATA_DIR, f"{table_name}{suffix}")
+
+def table_files(table_name):
+    """
+    Возвращает пути ко всем файлам данных таблицы.
+    """
+    return [table_path(table_name, suffix)
+            for suffix in (".json", LOG_SUFFIX, BINARY_SUFFIX)]
 
 def load_table_data(table_name):
     """
-    Загружает данные таблицы из JSON-файла.
+    Загружает данные таблицы из JSON-файла
+    (или из двоичного файла, если таблица хранится в нем).
+    
+    Если активен сеанс, возвращается резидентная копия таблицы.
     
     Args:
         table_name (str): Имя таблицы
@@ -49,33 +541,788 @@ def load_table_data(table_name):
     Returns:
         list: Данные таблицы или пустой список
     """
-    filepath = DATA_DIR / f"{table_name}.json"
+    if _session is not None:
+        ctable = _session.resident(("columnar", table_name))
+        
+        def reader():
+            # Строки для изменения собираются из колоночного представления;
+            # оно остается в памяти и дополняется при вставках
+            # (см. append_columnar_rows)
+            if ctable is not None:
+                return columnar.to_rows(ctable)
+            return read_table_data(table_name)
+        
+        return _session.load(("table", table_name), table_files(table_name), reader)
+    
+    return read_table_data(table_name)
+
+def load_columnar_table(table_name, columns):
+    """
+    Возвращает колоночное представление таблицы (см. columnar.build).
+    
+    Для таблиц engine=columnar это основное резидентное представление
+    в сеансе: оно живет, пока не изменятся файлы таблицы, а вставки
+    дописываются в него (см. append_columnar_rows). Строки, из которых
+    оно строится, выгружаются; после изменения таблицы в памяти остаются
+    обе формы, чтобы чередование записи и чтения не перестраивало
+    таблицу. Если в сеансе есть несохраненные изменения таблицы,
+    представление строится по ним и не запоминается.
+    
+    Args:
+        table_name (str): Имя таблицы
+        columns (list): Описания столбцов из метаданных
+    
+    Returns:
+        dict: Колоночная таблица
+    """
+    if _session is None:
+        return columnar.build(read_table_data(table_name), columns)
+    
+    rows = _session.resident(("table", table_name))
+    if _session.is_dirty(("table", table_name)):
+        return columnar.build(rows, columns)
+    
+    def reader():
+        if rows is None:
+            return columnar.build(read_table_data(table_name), columns)
+        _session.discard(("table", table_name))
+        return columnar.build(rows, columns)
+    
+    return _session.load(("columnar", table_name), table_files(table_name), reader)
+
+def append_columnar_rows(table_name, records):
+    """
+    Переносит изменения команды в резидентное колоночное представление.
+    
+    Вставленные записи дописываются в конец столбцов, и представление
+    остается актуальным после записи файлов (см. Session.follow).
+    После update и delete, а также внутри транзакции и пакета, где
+    изменения еще могут быть отменены, представление выгружается и
+    строится заново при следующем чтении.
+    
+    Вызывается до записи изменений на диск: пока файлы не изменены,
+    по их отпечаткам видно, что представление соответствует таблице
+    до команды.
+    
+    Args:
+        table_name (str): Имя таблицы
+        records (list): Записи журнала, описывающие изменения
+    """
+    if _session is None or _session.resident(("columnar", table_name)) is None:
+        return
+    
+    key = ("columnar", table_name)
+    if writes_deferred() or any(record["op"] != "insert" for record in records):
+        _session.discard(key)
+        return
+    
+    columnar.append_rows(_session.resident(key),
+                         [record["row"] for record in records])
+    _session.follow(key)
+
+def load_rows_by_ids(table_name, ids):
+    """
+    Возвращает строки таблицы с указанными ID.
+    
+    Двоичная таблица, не загруженная в сеанс и без несохраненных
+    изменений, не загружается целиком: файл отображается в память,
+    позиции строк находятся двоичным поиском по столбцу ID (строки
+    упорядочены по ID), и декодируются только найденные строки.
+    Остальные таблицы загружаются как обычно (см. load_table_data).
+    
+    Args:
+        table_name (str): Имя таблицы
+        ids (iterable): ID искомых строк
+    
+    Returns:
+        list: Найденные строки в порядке возрастания ID
+    """
+    ids = sorted(set(ids))
+    if (not is_binary_table(table_name) or has_pending_changes(table_name)
+            or resident_table_data(table_name) is not None):
+        table_data = load_table_data(table_name)
+        rows = []
+        for row_id in ids:
+            pos = bisect.bisect_left(table_data, row_id, key=lambda row: row["ID"])
+            if pos < len(table_data) and table_data[pos]["ID"] == row_id:
+                rows.append(table_data[pos])
+        return rows
+    
+    ctable = open_binary_table(table_name)
+    row_ids = memoryview(ctable["columns"]["ID"]["data"]).cast(columnar.INT_FORMAT)
+    positions = []
+    for row_id in ids:
+        pos = bisect.bisect_left(row_ids, row_id)
+        if pos < len(row_ids) and row_ids[pos] == row_id:
+            positions.append(pos)
+    return columnar.rows_at(ctable, positions)
+
+def resident_table_data(table_name):
+    """
+    Возвращает данные таблицы, если они уже загружены в активный сеанс.
+    
+    Returns:
+        list: Данные таблицы или None
+    """
+    if _session is None:
+        return None
+    return _session.resident(("table", table_name))
+
+def flush_table_data(table_name):
+    """
+    Записывает на диск несохраненные изменения таблицы из активного сеанса.
+    
+    Вызывается перед чтением файлов таблицы в обход сеанса.
+    """
+    # Внутри транзакции изменения остаются в памяти до фиксации
+    if _session is not None and not _session.in_transaction:
+        _session.flush(("table", table_name))
+
+def has_pending_changes(table_name):
+    """
+    Проверяет, есть ли у таблицы изменения, еще не записанные на диск.
+    """
+    return _session is not None and _session.is_dirty(("table", table_name))
+
+def in_transaction():
+    """
+    Проверяет, открыта ли транзакция в активном сеансе.
+    """
+    return _session is not None and _session.in_transaction
+
+def writes_deferred():
+    """
+    Проверяет, откладывает ли активный сеанс запись изменений
+    (внутри транзакции или в пакетном режиме).
+    """
+    return _session is not None and (_session.in_transaction or _session.batch)
+
+@metrics.timed_phase("load")
+def read_table_data(table_name):
+    """
+    Читает данные таблицы с диска в обход сеанса.
+    """
+    if is_binary_table(table_name):
+        return columnar.to_rows(open_binary_table(table_name))
+    
+    filepath = table_path(table_name)
     
     try:
         with open(filepath, 'r', encoding=DEFAULT_ENCODING) as f:
-            return json.load(f)
+            table_data = json.load(f)
     except FileNotFoundError:
-        return []  # Возвращаем пустой список, если файла нет
+        table_data = []  # Возвращаем пустой список, если файла нет
     except json.JSONDecodeError:
-        print(f"Ошибка: Файл {filepath} поврежден или имеет неверный формат")
-        return []
+        # Пустой список здесь привел бы к перезаписи таблицы при сохранении
+        raise ValueError(f"Файл {filepath} поврежден или имеет неверный формат")
+    
+    if os.path.exists(table_path(table_name, LOG_SUFFIX)):
+        table_data = replay_table_log(table_name, table_data)
+    
+    return table_data
+
+def _iter_json_array(f, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Лениво разбирает JSON-массив объектов, читая файл блоками.
+    
+    Args:
+        f (file): Открытый текстовый файл
+        chunk_size (int): Размер читаемого блока в символах
+    
+    Yields:
+        dict: Очередной элемент массива
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if not buffer.startswith('['):
+        raise json.JSONDecodeError("Ожидается массив", buffer, 0)
+    pos = 1
+    
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("Конец блока", buffer, pos)
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        
+        yield item
+
+def project_rows(rows, columns):
+    """
+    Оставляет в записях только перечисленные столбцы.
+    
+    Args:
+        rows (iterable): Записи таблицы
+        columns (list): Имена столбцов или None, если нужны все
+    
+    Returns:
+        iterator: Записи (новые словари, если задан список столбцов)
+    """
+    if columns is None:
+        return iter(rows)
+    return ({name: row[name] for name in columns if name in row} for row in rows)
+
+def iter_table_rows(table_name, columns=None):
+    """
+    Лениво перебирает записи таблицы, не загружая ее целиком.
+    
+    JSON-файл разбирается блоками, двоичный файл читается через mmap,
+    резидентное колоночное представление (см. load_columnar_table)
+    декодируется пачками строк. Таблица с непустым журналом загружается
+    полностью, так как записи журнала могут изменять любые строки снимка.
+    
+    Args:
+        table_name (str): Имя таблицы
+        columns (list): Столбцы, которые нужно вернуть (по умолчанию все);
+            из двоичного файла остальные столбцы не читаются
+    
+    Yields:
+        dict: Запись таблицы
+    """
+    resident = resident_table_data(table_name)
+    if resident is not None:
+        yield from project_rows(resident, columns)
+        return
+    
+    ctable = None
+    if _session is not None:
+        ctable = _session.resident(("columnar", table_name))
+    if ctable is None and is_binary_table(table_name):
+        ctable = open_binary_table(table_name, names=columns)
+    if ctable is not None:
+        length = ctable["length"]
+        for start in range(0, length, STREAM_BATCH_ROWS):
+            stop = min(length, start + STREAM_BATCH_ROWS)
+            yield from columnar.rows_at(ctable, range(start, stop), columns)
+        return
+    
+    if table_log_size(table_name):
+        yield from project_rows(load_table_data(table_name), columns)
+        return
+    
+    filepath = table_path(table_name)
+    
+    try:
+        with open(filepath, 'r', encoding=DEFAULT_ENCODING) as f:
+            yield from project_rows(_iter_json_array(f), columns)
+    except FileNotFoundError:
+        return
+    except json.JSONDecodeError:
+        raise ValueError(f"Файл {filepath} поврежден или имеет неверный формат")
 
 def save_table_data(table_name, data):
     """
-    Сохраняет данные таблицы в JSON-файл.
+    Сохраняет данные таблицы в JSON-файл
+    (или в двоичный файл, если таблица хранится в нем).
+    
+    Если активен сеанс, данные запоминаются в нем и записываются
+    на диск при вызове Session.flush.
     
     Args:
         table_name (str): Имя таблицы
         data (list): Данные для сохранения
+    
+    Returns:
+        bool: True, если данные записаны
     """
     if not isinstance(data, list):
         print(f"Ошибка: Данные для таблицы {table_name} должны быть списком")
+        return False
+    
+    if _session is not None:
+        return _session.store(
+            ("table", table_name),
+            table_files(table_name),
+            data,
+            lambda value: write_table_data(table_name, value),
+        )
+    
+    return write_table_data(table_name, data)
+
+@metrics.timed_phase("save")
+def write_table_data(table_name, data):
+    """
+    Записывает данные таблицы на диск в обход сеанса.
+    
+    Returns:
+        bool: True, если данные записаны
+    """
+    if is_binary_table(table_name):
+        header = read_binary_header(table_name)
+        return save_binary_table(table_name, data, header["columns"],
+                                 header.get("compression"))
+    
+    filepath = table_path(table_name)
+    
+    try:
+        atomic_write(
+            filepath,
+            lambda f: json.dump(data, f, indent=JSON_INDENT, ensure_ascii=False),
+        )
+        return True
+    except Exception as e:
+        print(f"Ошибка при сохранении файла {filepath}: {e}")
+        return False
+
+def append_table_log(table_name, records, table_data=None):
+    """
+    Дописывает записи об изменениях в журнал таблицы (JSON Lines).
+    
+    Внутри транзакции записи накапливаются в сеансе и попадают
+    в журнал одной дозаписью при фиксации.
+    
+    Args:
+        table_name (str): Имя таблицы
+        records (list): Записи вида {"op": "insert", "row": {...}},
+            {"op": "update", "ids": [...], "set": {...}}
+            или {"op": "delete", "ids": [...]}
+        table_data (list): Данные таблицы с уже примененными изменениями;
+            если переданы, резидентная копия в сеансе остается актуальной
+    """
+    if in_transaction():
+        if table_data is None:
+            table_data = apply_log_records(load_table_data(table_name), records)
+        _session.stage_records(
+            ("table", table_name),
+            table_files(table_name),
+            table_data,
+            records,
+            lambda staged: write_table_log(table_name, staged),
+        )
         return
     
-    filepath = DATA_DIR / f"{table_name}.json"
+    flush_table_data(table_name)
+    if not write_table_log(table_name, records):
+        # Метаданные команды уже изменены в памяти и не должны попасть
+        # на диск без записей журнала
+        if _session is not None:
+            _session.discard_changes()
+        raise OSError(f'Не удалось дописать журнал таблицы "{table_name}", изменения не сохранены') # noqa: E501
+    
+    if _session is not None and table_data is not None:
+        _session.sync(("table", table_name), table_data)
+
+@metrics.timed_phase("save")
+def write_table_log(table_name, records):
+    """
+    Дописывает записи в файл журнала таблицы в обход сеанса.
+    
+    Returns:
+        bool: True, если записи дописаны
+    """
+    filepath = table_path(table_name, LOG_SUFFIX)
     
     try:
-        with open(filepath, 'w', encoding=DEFAULT_ENCODING) as f:
-            json.dump(data, f, indent=JSON_INDENT, ensure_ascii=False)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _appending(filepath)
+        with open(filepath, 'a', encoding=DEFAULT_ENCODING) as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _appended(filepath)
+        return True
     except Exception as e:
-        print(f"Ошибка при сохранении файла {filepath}: {e}")
\ No newline at end of file
+        print(f"Ошибка при сохранении файла {filepath}: {e}")
+        return False
+
+def _apply_log_record(rows, record):
+    """Применяет запись журнала к словарю строк {ID: строка}."""
+    op = record.get("op")
+    if op == "insert":
+        rows[record["row"]["ID"]] = record["row"]
+    elif op == "update":
+        for row_id in record["ids"]:
+            if row_id in rows:
+                rows[row_id].update(record["set"])
+    elif op == "delete":
+        for row_id in record["ids"]:
+            rows.pop(row_id, None)
+
+def apply_log_records(table_data, records):
+    """
+    Применяет записи журнала к данным таблицы в памяти.
+    
+    Returns:
+        list: Данные таблицы, упорядоченные по ID
+    """
+    rows = {row["ID"]: row for row in table_data}
+    for record in records:
+        _apply_log_record(rows, record)
+    return sorted(rows.values(), key=lambda row: row["ID"])
+
+def read_table_log(table_name, offset=0):
+    """
+    Читает записи журнала таблицы, начиная со смещения offset.
+    
+    Args:
+        table_name (str): Имя таблицы
+        offset (int): Смещение в байтах, с которого начинается чтение
+    
+    Returns:
+        tuple: (записи журнала, смещение конца последней целой записи)
+    """
+    filepath = table_path(table_name, LOG_SUFFIX)
+    records = []
+    
+    try:
+        f = open(filepath, 'rb')
+    except FileNotFoundError:
+        return records, 0
+    
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Последняя строка еще дописывается другим процессом
+                break
+            start, offset = offset, offset + len(line)
+            try:
+                records.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                print(f"Ошибка: Запись журнала {filepath} на смещении {start} повреждена и пропущена") # noqa: E501
+    
+    return records, offset
+
+def replay_table_log(table_name, table_data):
+    """
+    Применяет журнал изменений к снимку таблицы.
+    
+    Повторное применение записей безопасно: вставка с существующим ID
+    перезаписывает строку, обновление и удаление адресуются по ID.
+    
+    Args:
+        table_name (str): Имя таблицы
+        table_data (list): Снимок данных таблицы
+    
+    Returns:
+        list: Актуальные данные таблицы
+    """
+    records, _ = read_table_log(table_name)
+    return apply_log_records(table_data, records)
+
+def table_log_size(table_name):
+    """
+    Возвращает размер журнала таблицы в байтах (0, если журнала нет).
+    """
+    try:
+        return os.path.getsize(table_path(table_name, LOG_SUFFIX))
+    except FileNotFoundError:
+        return 0
+
+def compact_table(table_name, table_data=None):
+    """
+    Сворачивает журнал таблицы в снимок и удаляет журнал.
+    
+    Args:
+        table_name (str): Имя таблицы
+        table_data (list): Актуальные данные таблицы, если уже загружены
+    """
+    if table_data is None:
+        table_data = load_table_data(table_name)
+    
+    if not save_table_data(table_name, table_data):
+        return
+    # Снимок должен попасть на диск до удаления журнала
+    flush_table_data(table_name)
+    
+    log_file = table_path(table_name, LOG_SUFFIX)
+    if os.path.exists(log_file):
+        os.remove(log_file)
+    
+    if _session is not None:
+        _session.sync(("table", table_name), table_data)
+
+def _convert_text_value(text, col_type):
+    """
+    Преобразует текстовое значение из файла импорта к типу столбца.
+    """
+    if col_type == "int":
+        return int(text)
+    if col_type == "bool":
+        lowered = text.strip().lower()
+        if lowered not in ("true", "false"):
+            raise ValueError(f'Некорректное логическое значение "{text}"')
+        return lowered == "true"
+    return text
+
+def read_csv_rows(filepath, columns):
+    """
+    Построчно читает записи из CSV-файла.
+    
+    Если первая строка содержит имена столбцов, она считается заголовком
+    и определяет порядок значений; столбец ID в файле игнорируется.
+    
+    Args:
+        filepath (str): Путь к CSV-файлу
+        columns (list): Описания столбцов таблицы без ID
+    
+    Yields:
+        dict: Запись вида {столбец: значение}
+    """
+    column_names = [col["name"] for col in columns]
+    column_types = {col["name"]: col["type"] for col in columns}
+    
+    with open(filepath, 'r', encoding=DEFAULT_ENCODING, newline='') as f:
+        reader = csv.reader(f)
+        header = column_names
+        
+        for line_number, fields in enumerate(reader, 1):
+            if not fields:
+                continue
+            
+            if line_number == 1 and set(fields) <= set(column_names) | {"ID"}:
+                header = fields
+                continue
+            
+            if len(fields) != len(header):
+                raise ValueError(f'Строка {line_number} файла {filepath}: ожидается {len(header)} значений, получено {len(fields)}') # noqa: E501
+            
+            row = {}
+            for name, text in zip(header, fields):
+                if name == "ID":
+                    continue
+                try:
+                    row[name] = _convert_text_value(text, column_types[name])
+                except ValueError as e:
+                    raise ValueError(f'Строка {line_number} файла {filepath}, столбец "{name}": {e}') # noqa: E501
+            yield row
+
+def read_jsonl_rows(filepath):
+    """
+    Построчно читает записи из файла JSON Lines.
+    
+    Каждая строка - список значений без ID или объект {столбец: значение}.
+    
+    Args:
+        filepath (str): Путь к JSONL-файлу
+    
+    Yields:
+        list или dict: Запись
+    """
+    with open(filepath, 'r', encoding=DEFAULT_ENCODING) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError(f'Строка {line_number} файла {filepath} не является корректным JSON') # noqa: E501
+
+def _align(offset):
+    """Выравнивает смещение по границе 8 байт."""
+    return (offset + 7) // 8 * 8
+
+def is_binary_table(table_name):
+    """
+    Проверяет, хранится ли таблица в двоичном формате.
+    """
+    return os.path.exists(table_path(table_name, BINARY_SUFFIX))
+
+def _compress(payload, compression):
+    # Модули сжатия загружаются только для сжатых таблиц
+    if compression == "zlib":
+        import zlib
+        return zlib.compress(payload)
+    import lzma
+    return lzma.compress(payload)
+
+def _decompress(payload, compression):
+    if compression == "zlib":
+        import zlib
+        return zlib.decompress(payload)
+    import lzma
+    return lzma.decompress(payload)
+
+@metrics.timed_phase("save")
+def save_binary_table(table_name, data, columns, compression=None):
+    """
+    Сохраняет таблицу в двоичный файл с фиксированной схемой.
+    
+    Файл состоит из сигнатуры, длины и JSON-заголовка (число строк,
+    схема и смещения сегментов), за которым следуют выровненные сегменты
+    столбцов: int - 64-битные числа, bool - по байту на строку,
+    str - смещения строк и буфер UTF-8. Столбец str с небольшим числом
+    различных значений хранится как 32-битные коды и словарь
+    (см. columnar.dictionary_encode).
+    
+    Args:
+        table_name (str): Имя таблицы
+        data (list): Данные для сохранения
+        columns (list): Описания столбцов из метаданных
+        compression (str): Сжатие сегментов: zlib, lzma или None
+    
+    Returns:
+        bool: True, если данные записаны
+    """
+    ctable = columnar.build(data, columns)
+    
+    segments = []
+    header_columns = []
+    offset = 0
+    
+    def add_segment(payload):
+        nonlocal offset
+        if compression:
+            payload = _compress(bytes(payload), compression)
+        start = offset
+        segments.append((start, payload))
+        offset = _align(start + len(payload))
+        return start, len(payload)
+    
+    for col in columns:
+        column = ctable["columns"][col["name"]]
+        if column["type"] == "object":
+            raise ValueError(f'Значения столбца "{col["name"]}" не помещаются в 64 бита') # noqa: E501
+        
+        entry = {"name": col["name"], "type": col["type"]}
+        if column["type"] == "str":
+            entry["offsets_offset"], entry["offsets_length"] = add_segment(
+                column["offsets"].tobytes()
+            )
+        elif column["type"] == "dict":
+            values, offsets = columnar.encode_strings(column["values"])
+            entry["encoding"] = "dict"
+            entry["dict_size"] = len(column["values"])
+            entry["dict_offsets_offset"], entry["dict_offsets_length"] = add_segment(
+                offsets.tobytes()
+            )
+            entry["dict_offset"], entry["dict_length"] = add_segment(values)
+        entry["offset"], entry["length"] = add_segment(column["data"])
+        header_columns.append(entry)
+    
+    header_data = {"rows": ctable["length"], "columns": header_columns}
+    if compression:
+        header_data["compression"] = compression
+    header = json.dumps(header_data, ensure_ascii=False).encode(DEFAULT_ENCODING)
+    data_start = _align(len(BINARY_MAGIC) + 4 + len(header))
+    
+    filepath = table_path(table_name, BINARY_SUFFIX)
+    
+    def write(f):
+        f.write(BINARY_MAGIC + struct.pack("<I", len(header)) + header)
+        for start, payload in segments:
+            f.seek(data_start + start)
+            f.write(payload)
+        f.truncate(data_start + offset)
+    
+    try:
+        # Замена файла целиком не затрагивает уже отображенные в память версии
+        atomic_write(filepath, write, binary=True)
+        return True
+    except Exception as e:
+        print(f"Ошибка при сохранении файла {filepath}: {e}")
+        return False
+
+def read_binary_header(table_name):
+    """
+    Читает заголовок двоичного файла таблицы, не загружая данные.
+    
+    Returns:
+        dict: Заголовок с ключами rows, columns и data_start
+    """
+    filepath = table_path(table_name, BINARY_SUFFIX)
+    
+    with open(filepath, 'rb') as f:
+        prefix = f.read(len(BINARY_MAGIC) + 4)
+        if prefix[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            raise ValueError(f"Файл {filepath} не является двоичной таблицей")
+        (header_len,) = struct.unpack("<I", prefix[len(BINARY_MAGIC):])
+        header = json.loads(f.read(header_len).decode(DEFAULT_ENCODING))
+    
+    header["data_start"] = _align(len(BINARY_MAGIC) + 4 + header_len)
+    return header
+
+def open_binary_table(table_name, names=None, copy=None):
+    """
+    Отображает двоичный файл таблицы в память.
+    
+    Сегменты столбцов возвращаются как memoryview поверх mmap, поэтому
+    с диска читаются только реально затронутые страницы. Сегменты
+    сжатой таблицы распаковываются, но только для открываемых столбцов.
+    
+    Args:
+        table_name (str): Имя таблицы
+        names (iterable): Столбцы, которые нужно открыть (по умолчанию все)
+        copy (iterable): Столбцы, которые нужно скопировать в bytes
+            (для поиска по всему столбцу)
+    
+    Returns:
+        dict: Колоночная таблица (см. columnar.build)
+    """
+    flush_table_data(table_name)
+    header = read_binary_header(table_name)
+    filepath = table_path(table_name, BINARY_SUFFIX)
+    copy = set(copy or ())
+    
+    with open(filepath, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    base = header["data_start"]
+    
+    compression = header.get("compression")
+    
+    def segment(start, length, copy_data=False):
+        data = view[base + start:base + start + length]
+        if compression:
+            return _decompress(data, compression)
+        return bytes(data) if copy_data else data
+    
+    ctable = {"length": header["rows"], "columns": {}}
+    for entry in header["columns"]:
+        if names is not None and entry["name"] not in names:
+            continue
+        
+        data = segment(entry["offset"], entry["length"], entry["name"] in copy)
+        column = {"type": entry["type"], "data": data}
+        
+        if entry.get("encoding") == "dict":
+            offsets = segment(entry["dict_offsets_offset"],
+                              entry["dict_offsets_length"])
+            values = segment(entry["dict_offset"], entry["dict_length"])
+            column["type"] = "dict"
+            column["values"] = columnar.decode_strings(
+                values, memoryview(offsets).cast(columnar.INT_FORMAT)
+            )
+        elif entry["type"] == "str":
+            # В файлах прежнего формата длина смещений не записана
+            length = entry.get("offsets_length",
+                               (header["rows"] + 1) * columnar.INT_SIZE)
+            offsets = segment(entry["offsets_offset"], length)
+            column["offsets"] = memoryview(offsets).cast(columnar.INT_FORMAT)
+        
+        ctable["columns"][entry["name"]] = column
+    
+    return ctable
+
+def remove_table_files(table_name):
+    """
+    Удаляет файлы данных таблицы во всех форматах хранения.
+    
+    Файл блокировки удаляется при снятии блокировки (см. release_lock):
+    пока она удерживается (в пакетном режиме - до Session.end_batch),
+    удаленный файл позволил бы другому процессу создать новый и
+    захватить таблицу одновременно с этим.
+    """
+    if _session is not None:
+        _session.discard(("table", table_name))
+    
+    for suffix in (".json", LOG_SUFFIX, BINARY_SUFFIX):
+        filepath = table_path(table_name, suffix)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    
+    lock_path = table_path(table_name, LOCK_SUFFIX)
+    if lock_path in _held_locks:
+        _held_locks[lock_path]["remove"] = True
\ No newline at end of file
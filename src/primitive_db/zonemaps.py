@@ -0,0 +1,219 @@
+import bisect
+import zlib
+
+from .constants import DISTINCT_SKETCH_SIZE, STATS_REBUILD_RATIO, ZONE_CHUNK_ROWS
+
+
+def empty(columns, chunk_rows=ZONE_CHUNK_ROWS):
+    """
+    Возвращает статистику пустой таблицы.
+
+    Статистика состоит из частей (зон) по chunk_rows записей подряд по ID.
+    Для каждой части хранятся диапазон ID, число записей и для каждого
+    столбца [минимум, максимум, число пустых значений]. Для оценки числа
+    различных значений каждого столбца хранится эскиз KMV: наименьшие
+    DISTINCT_SKETCH_SIZE хэшей значений.
+
+    Минимум и максимум части - границы: после удаления или изменения
+    записей они остаются верными, хотя и могут стать шире реальных,
+    а эскиз - хранить хэши исчезнувших значений. Поэтому считается
+    число удаленных и измененных записей (changed), и статистика
+    перестраивается, когда оно превысит долю STATS_REBUILD_RATIO
+    (см. needs_rebuild).
+
+    Args:
+        columns (list): Описания столбцов из метаданных
+        chunk_rows (int): Размер части
+
+    Returns:
+        dict: Статистика таблицы
+    """
+    return {
+        "chunk_rows": chunk_rows,
+        "chunks": [],
+        "sketches": {col["name"]: [] for col in columns},
+        "changed": 0,
+    }
+
+def build(table_data, columns, chunk_rows=ZONE_CHUNK_ROWS):
+    """
+    Вычисляет статистику по данным таблицы за один проход.
+    """
+    stats = empty(columns, chunk_rows)
+    add_rows(stats, table_data)
+    return stats
+
+def _hash(value):
+    # Хэш должен совпадать в разных процессах, поэтому hash() не подходит
+    return zlib.crc32(repr(value).encode("utf-8"))
+
+def _add_to_sketch(sketch, hashes):
+    for value_hash in hashes:
+        if len(sketch) >= DISTINCT_SKETCH_SIZE and value_hash >= sketch[-1]:
+            continue
+        pos = bisect.bisect_left(sketch, value_hash)
+        if pos < len(sketch) and sketch[pos] == value_hash:
+            continue
+        sketch.insert(pos, value_hash)
+        if len(sketch) > DISTINCT_SKETCH_SIZE:
+            sketch.pop()
+
+def _widen(bounds, low, high):
+    if low is None:
+        return
+    if bounds[0] is None or low < bounds[0]:
+        bounds[0] = low
+    if bounds[1] is None or high > bounds[1]:
+        bounds[1] = high
+
+def _new_chunk(stats, first_id):
+    chunk = {
+        "first_id": first_id,
+        "last_id": first_id,
+        "rows": 0,
+        "columns": {name: [None, None, 0] for name in stats["sketches"]},
+    }
+    stats["chunks"].append(chunk)
+    return chunk
+
+def add_rows(stats, rows):
+    """
+    Учитывает в статистике новые записи (по возрастанию ID).
+
+    Записи дописываются в последнюю часть, пока она не заполнится.
+    """
+    rows = list(rows)
+    chunk_rows = stats["chunk_rows"]
+    start = 0
+    while start < len(rows):
+        chunks = stats["chunks"]
+        if chunks and chunks[-1]["rows"] < chunk_rows:
+            chunk = chunks[-1]
+        else:
+            chunk = _new_chunk(stats, rows[start]["ID"])
+        part = rows[start:start + chunk_rows - chunk["rows"]]
+        start += len(part)
+
+        chunk["rows"] += len(part)
+        chunk["last_id"] = part[-1]["ID"]
+        for name, bounds in chunk["columns"].items():
+            values = [row.get(name) for row in part]
+            present = {value for value in values if value is not None}
+            bounds[2] += len(values) - sum(1 for value in values if value is not None)
+            if present:
+                _widen(bounds, min(present), max(present))
+            _add_to_sketch(stats["sketches"][name], map(_hash, present))
+
+def _count_changed(stats, count):
+    # У статистики, построенной до появления счетчика, его нет
+    stats["changed"] = stats.get("changed", 0) + count
+
+def needs_rebuild(stats, row_count, ratio=STATS_REBUILD_RATIO):
+    """
+    Проверяет, накопилось ли столько удаленных и измененных записей,
+    что границы и эскизы пора перестроить по данным.
+
+    Args:
+        stats (dict): Статистика таблицы
+        row_count (int): Текущее число записей
+        ratio (float): Допустимая доля измененных записей
+
+    Returns:
+        bool: True, если статистику нужно построить заново
+    """
+    changed = stats.get("changed", 0)
+    return changed > 0 and changed > ratio * row_count
+
+def _find_chunk(stats, row_id):
+    chunks = stats["chunks"]
+    pos = bisect.bisect_right(chunks, row_id, key=lambda chunk: chunk["first_id"]) - 1
+    if pos >= 0 and row_id <= chunks[pos]["last_id"]:
+        return pos
+    return None
+
+def remove_rows(stats, rows):
+    """
+    Исключает из статистики удаленные записи.
+
+    Число записей и пустых значений уменьшается точно, границы частей
+    не сужаются; опустевшие части удаляются.
+    """
+    rows = list(rows)
+    _count_changed(stats, len(rows))
+    for row in rows:
+        pos = _find_chunk(stats, row["ID"])
+        if pos is None:
+            continue
+        chunk = stats["chunks"][pos]
+        chunk["rows"] -= 1
+        for name, bounds in chunk["columns"].items():
+            if row.get(name) is None:
+                bounds[2] = max(0, bounds[2] - 1)
+    stats["chunks"] = [chunk for chunk in stats["chunks"] if chunk["rows"] > 0]
+
+def update_row(stats, row, changes):
+    """
+    Учитывает изменение записи: вызывается до присваивания новых значений.
+
+    Args:
+        stats (dict): Статистика таблицы
+        row (dict): Запись со старыми значениями
+        changes (dict): Новые значения {столбец: значение}
+    """
+    pos = _find_chunk(stats, row["ID"])
+    if pos is None:
+        return
+    _count_changed(stats, 1)
+    chunk = stats["chunks"][pos]
+    for name, value in changes.items():
+        bounds = chunk["columns"].get(name)
+        if bounds is None:
+            continue
+        bounds[2] += (value is None) - (row.get(name) is None)
+        if value is not None:
+            _widen(bounds, value, value)
+            _add_to_sketch(stats["sketches"][name], [_hash(value)])
+
+def summary(stats, column):
+    """
+    Возвращает сводку по столбцу таблицы.
+
+    Returns:
+        dict: min, max, nulls (число пустых значений) и distinct
+            (оценка числа различных значений)
+    """
+    bounds = [None, None]
+    nulls = 0
+    for chunk in stats["chunks"]:
+        low, high, chunk_nulls = chunk["columns"].get(column, (None, None, 0))
+        _widen(bounds, low, high)
+        nulls += chunk_nulls
+    return {"min": bounds[0], "max": bounds[1], "nulls": nulls,
+            "distinct": distinct(stats, column)}
+
+def distinct(stats, column):
+    """
+    Оценивает число различных значений столбца по эскизу KMV.
+
+    Если различных хэшей меньше размера эскиза, он содержит их все
+    и оценка точна; иначе число различных значений оценивается по
+    k-му наименьшему хэшу: (k - 1) / (хэш / 2^32).
+    """
+    sketch = stats["sketches"].get(column, [])
+    if len(sketch) < DISTINCT_SKETCH_SIZE:
+        return len(sketch)
+    return round((len(sketch) - 1) * 2 ** 32 / (sketch[-1] + 1))
+
+def rows_in_chunks(table_data, chunks):
+    """
+    Выдает записи таблицы, ID которых попадают в диапазоны частей.
+
+    Записи упорядочены по ID, поэтому начало каждой части находится
+    двоичным поиском, а остальные части не просматриваются.
+    """
+    for chunk in chunks:
+        pos = bisect.bisect_left(table_data, chunk["first_id"],
+                                 key=lambda row: row["ID"])
+        while pos < len(table_data) and table_data[pos]["ID"] <= chunk["last_id"]:
+            yield table_data[pos]
+            pos += 1
@@ -0,0 +1,69 @@
+import contextlib
+import io
+
+import pytest
+
+from src.primitive_db import core, decorators, engine, parser, utils
+from src.primitive_db.session import Session
+
+
+class Database:
+    """
+    Выполняет команды в сеансе так же, как интерактивный режим.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.reopen()
+
+    def reopen(self):
+        """
+        Открывает новый сеанс: он читает состояние только с диска,
+        как другой процесс или следующий запуск программы.
+        """
+        core.query_cacher.clear()
+        self.session = Session()
+        utils.set_session(self.session)
+        return self.session
+
+    def use(self, session):
+        """
+        Делает сеанс текущим (переключение между "процессами").
+        """
+        core.query_cacher.clear()
+        self.session = session
+        utils.set_session(session)
+
+    def run(self, command):
+        """
+        Выполняет команду и возвращает ее вывод.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            engine.run_command(self.session, parser.parse_statement(command))
+        return output.getvalue()
+
+    def rows(self, query):
+        """
+        Выполняет select и возвращает записи списком.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            return engine.run_command(
+                self.session, parser.parse_statement(query), collect_rows=True
+            )
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    База данных в пустом временном каталоге.
+    """
+    monkeypatch.chdir(tmp_path)
+    decorators.set_auto_confirm(True)
+    database = Database()
+    yield database
+    utils.set_session(None)
+    utils.release_locks()
+    decorators.set_auto_confirm(False)
+    core.query_cacher.clear()
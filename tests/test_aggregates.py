@@ -0,0 +1,78 @@
+import pytest
+
+from src.primitive_db import core
+
+CITIES = ["Omsk", "Kazan", "Moscow", "Kazan", "Tver", "Omsk", "Moscow", "Kazan"]
+
+
+@pytest.fixture
+def twins(db):
+    """
+    Одинаковые таблицы: indexed с индексом по city, plain без индексов.
+    """
+    def create(kind):
+        for name in ("indexed", "plain"):
+            db.run(f"create_table {name} city:str age:int")
+            for number, city in enumerate(CITIES):
+                db.run(f'insert into {name} values ("{city}", {20 + number})')
+        db.run(f"create_index indexed city {kind}")
+        return db
+    return create
+
+
+def both(db, query):
+    return (db.rows(query.format(table="indexed")),
+            db.rows(query.format(table="plain")))
+
+
+@pytest.mark.parametrize("kind", ["hash", "sorted"])
+def test_group_count_from_index_matches_scan(twins, kind, monkeypatch):
+    db = twins(kind)
+    calls = []
+    original = core._aggregate_from_indexes
+    monkeypatch.setattr(core, "_aggregate_from_indexes",
+                        lambda *args: calls.append(original(*args)) or calls[-1])
+
+    indexed, plain = both(db, "select city, count(*) from {table} group by city")
+
+    assert calls[0] is not None and calls[1] is None
+    assert indexed == plain
+    assert [row["city"] for row in indexed] == ["Omsk", "Kazan", "Moscow", "Tver"]
+
+
+@pytest.mark.parametrize("kind", ["hash", "sorted"])
+def test_group_count_after_update_and_delete(twins, kind):
+    db = twins(kind)
+    for table in ("indexed", "plain"):
+        db.run(f'delete from {table} where city = "Omsk"')
+        db.run(f'update {table} set city = "Omsk" where age = 27')
+        db.run(f'insert into {table} values ("Kazan", 50)')
+
+    indexed, plain = both(db, "select city, count(*) from {table} group by city")
+
+    assert indexed == plain
+    assert indexed == [
+        {"city": "Kazan", "count(*)": 3},
+        {"city": "Moscow", "count(*)": 2},
+        {"city": "Tver", "count(*)": 1},
+        {"city": "Omsk", "count(*)": 1},
+    ]
+
+
+def test_aggregates_with_order_and_where(twins):
+    db = twins("sorted")
+
+    indexed, plain = both(
+        db, "select city, count(*), min(age), max(age), avg(age) from {table} "
+            "where age > 21 group by city order by count(*) desc, city"
+    )
+
+    assert indexed == plain
+    assert indexed[0] == {"city": "Kazan", "count(*)": 2, "min(age)": 23,
+                          "max(age)": 27, "avg(age)": 25.0}
+    assert db.rows("select min(city), max(city) from indexed") == [
+        {"min(city)": "Kazan", "max(city)": "Tver"}
+    ]
+    assert db.rows('select count(*) from indexed where city = "Kazan"') == [
+        {"count(*)": 3}
+    ]
@@ -0,0 +1,68 @@
+import pytest
+
+from src.primitive_db import columnar, utils
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "n", "type": "int"},
+           {"name": "flag", "type": "bool"}, {"name": "text", "type": "str"}]
+INTS = [0, -1, 1, 2 ** 63 - 1, -(2 ** 63), 123456789, -987654321]
+TEXTS = ["", "plain", "Ёлка, \"кавычки\"", "line\nbreak", "emoji 🙂", "x" * 1000]
+
+
+def make_rows(count):
+    return [
+        {"ID": i, "n": INTS[i % len(INTS)], "flag": i % 3 == 0,
+         "text": TEXTS[i % len(TEXTS)] + str(i)}
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.mark.parametrize("count", [0, 1, 100])
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+def test_round_trip_each_type(db, count, compression):
+    rows = make_rows(count)
+
+    assert utils.save_binary_table("t", rows, COLUMNS, compression)
+
+    header = utils.read_binary_header("t")
+    assert header["rows"] == count
+    assert header.get("compression") == compression
+    assert [entry["type"] for entry in header["columns"]] == [
+        col["type"] for col in COLUMNS
+    ]
+    assert utils.read_table_data("t") == rows
+    ctable = utils.open_binary_table("t", names=["n", "text"])
+    assert list(ctable["columns"]) == ["n", "text"]
+    assert columnar.rows_at(ctable, range(count)) == [
+        {"n": row["n"], "text": row["text"]} for row in rows
+    ]
+
+
+def test_int_outside_64_bits_is_rejected(db):
+    with pytest.raises(ValueError, match="64 бита"):
+        utils.save_binary_table("t", [{"ID": 1, "n": 2 ** 63, "flag": True,
+                                       "text": ""}], COLUMNS)
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+def test_binary_table_commands_survive_reopen(db, compression):
+    db.run(f"create_table t n:int flag:bool text:str storage=binary "
+           f"compression={compression}")
+    for row in make_rows(12):
+        text = row["text"].replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+        db.run(f'insert into t values ({row["n"]}, {str(row["flag"]).lower()}, '
+               f'"{text}")')
+    db.run("update t set flag = true where ID = 2")
+    db.run("delete from t where ID between 5 and 6")
+    expected = db.rows("select from t")
+
+    db.reopen()
+
+    assert db.rows("select from t") == expected
+    assert [row["ID"] for row in expected] == [1, 2, 3, 4, 7, 8, 9, 10, 11, 12]
+    assert db.rows('select from t where text = "emoji 🙂4"') == [expected[3]]
+    assert db.rows("select from t where flag = true and n < 0") == [
+        row for row in expected if row["flag"] and row["n"] < 0
+    ]
+    assert utils.read_binary_header("t").get("compression") == (
+        None if compression == "none" else compression
+    )
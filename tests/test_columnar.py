@@ -0,0 +1,114 @@
+import pytest
+
+from src.primitive_db import columnar
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "city", "type": "str"},
+           {"name": "name", "type": "str"}, {"name": "age", "type": "int"},
+           {"name": "active", "type": "bool"}]
+
+
+@pytest.fixture
+def twins(db):
+    """
+    Одинаковые таблицы: wide с engine=columnar, rows с обычным движком.
+    """
+    def create(storage):
+        for name, engine in (("wide", "columnar"), ("rows", "rows")):
+            db.run(f"create_table {name} city:str name:str age:int active:bool "
+                   f"storage={storage} engine={engine}")
+            for number in range(20):
+                db.run(f'insert into {name} values ("c{number % 3}", "n{number}", '
+                       f"{number}, {str(number % 2 == 0).lower()})")
+        return db
+    return create
+
+
+def both(db, query):
+    return (db.rows(query.format(table="wide")),
+            db.rows(query.format(table="rows")))
+
+
+def counting(monkeypatch, name):
+    calls = []
+    original = getattr(columnar, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(name)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(columnar, name, wrapper)
+    return calls
+
+
+def test_append_rows_matches_build():
+    rows = [
+        {"ID": i, "city": f"c{i % 2}", "name": f"n{i}", "age": i, "active": i % 2 == 0}
+        for i in range(1, 11)
+    ]
+    ctable = columnar.build(rows[:6], COLUMNS)
+    assert ctable["columns"]["city"]["type"] == "dict"
+    assert ctable["columns"]["name"]["type"] == "str"
+
+    columnar.append_rows(ctable, rows[6:])
+    columnar.append_rows(ctable, [{"ID": 11, "city": "new", "name": "", "age": 2 ** 70,
+                                   "active": False}])
+
+    assert ctable["length"] == 11
+    assert ctable["columns"]["age"]["type"] == "object"
+    assert columnar.to_rows(ctable)[:10] == rows
+    assert columnar.column_positions(ctable, "city", "new") == [10]
+    assert columnar.column_positions(ctable, "name", "") == [10]
+    assert columnar.column_positions(ctable, "city", "c1") == [0, 2, 4, 6, 8]
+
+
+# Условия по двоичной таблице проверяются по ее файлу, а не по представлению
+@pytest.mark.parametrize("storage", ["json", "log"])
+def test_insert_select_loop_keeps_columnar_form(twins, storage, monkeypatch):
+    db = twins(storage)
+    both(db, 'select from {table} where city = "c1"')
+    # Первая вставка один раз собирает строки из колоночного представления
+    for table in ("wide", "rows"):
+        db.run(f'insert into {table} values ("c0", "first", 0, true)')
+    ctable = db.session.resident(("columnar", "wide"))
+    conversions = counting(monkeypatch, "to_rows")
+
+    for number in range(20, 30):
+        for table in ("wide", "rows"):
+            db.run(f'insert into {table} values ("c{number % 4}", "n{number}", '
+                   f"{number}, true)")
+        wide, rows = both(db, 'select from {table} where city = "c3"')
+        assert wide == rows
+        assert len(wide) == sum(n % 4 == 3 for n in range(20, number + 1))
+
+    assert db.session.resident(("columnar", "wide")) is ctable
+    assert ctable["length"] == 31 and conversions == []
+    wide, rows = both(db, "select from {table} where age >= 0")
+    assert wide == rows and len(wide) == 31
+
+
+@pytest.mark.parametrize("storage", ["json", "log", "binary"])
+def test_update_delete_and_reopen(twins, storage):
+    db = twins(storage)
+    both(db, "select from {table} where active = true")
+
+    for table in ("wide", "rows"):
+        db.run(f'update {table} set city = "moved" where age < 5')
+        db.run(f"delete from {table} where age = 7")
+        db.run(f'insert into {table} values ("late", "x", 99, false)')
+    wide, rows = both(db, 'select from {table} where city = "moved" or age = 99')
+    assert wide == rows and len(wide) == 6
+
+    db.reopen()
+    wide, rows = both(db, "select from {table} where age != 7")
+    assert wide == rows and len(wide) == 20
+
+
+def test_rolled_back_insert_is_not_kept(twins):
+    db = twins("json")
+    db.rows('select from wide where city = "c0"')
+
+    db.run("begin")
+    db.run('insert into wide values ("c0", "tmp", 1, true)')
+    assert len(db.rows('select from wide where city = "c0"')) == 8
+    db.run("rollback")
+
+    assert len(db.rows('select from wide where city = "c0"')) == 7
@@ -0,0 +1,122 @@
+import json
+import os
+import struct
+
+import pytest
+
+from src.primitive_db import columnar, predicates, utils
+from src.primitive_db.constants import BINARY_MAGIC, BINARY_SUFFIX
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "city", "type": "str"},
+           {"name": "name", "type": "str"}]
+CITIES = ["Москва", "Kazan", "", "Omsk"]
+
+
+def make_rows(count):
+    return [{"ID": i, "city": CITIES[i % len(CITIES)], "name": f"user{i}"}
+            for i in range(1, count + 1)]
+
+
+def write_old_format(table_name, rows):
+    """
+    Записывает файл в формате до словарного кодирования: строки хранятся
+    смещениями и буфером, а длина сегмента смещений не записана.
+    """
+    segments, header_columns, offset = [], [], 0
+    for col in COLUMNS:
+        values = [row[col["name"]] for row in rows]
+        entry = {"name": col["name"], "type": col["type"]}
+        if col["type"] == "str":
+            data, offsets = columnar.encode_strings(values)
+            entry["offsets_offset"] = offset
+            segments.append((offset, offsets.tobytes()))
+            offset = (offset + len(offsets.tobytes()) + 7) // 8 * 8
+        else:
+            data = struct.pack(f"{len(values)}q", *values)
+        entry["offset"], entry["length"] = offset, len(data)
+        segments.append((offset, data))
+        offset = (offset + len(data) + 7) // 8 * 8
+        header_columns.append(entry)
+
+    header = json.dumps({"rows": len(rows), "columns": header_columns}).encode()
+    data_start = (len(BINARY_MAGIC) + 4 + len(header) + 7) // 8 * 8
+    os.makedirs(utils.DATA_DIR, exist_ok=True)
+    with open(utils.table_path(table_name, BINARY_SUFFIX), "wb") as f:
+        f.write(BINARY_MAGIC + struct.pack("<I", len(header)) + header)
+        for start, payload in segments:
+            f.seek(data_start + start)
+            f.write(payload)
+        f.truncate(data_start + offset)
+
+
+def header_entries(table_name):
+    return {entry["name"]: entry
+            for entry in utils.read_binary_header(table_name)["columns"]}
+
+
+def test_dictionary_encode_respects_ratio():
+    column = columnar.dictionary_encode(["a", "b", "a", "a"], max_ratio=0.5)
+    assert column["values"] == ["a", "b"]
+    assert columnar.column_values(column) == ["a", "b", "a", "a"]
+    assert columnar.dictionary_encode(["a", "b", "c", "a"], max_ratio=0.5) is None
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+def test_dictionary_column_round_trip(db, compression):
+    rows = make_rows(40)
+
+    utils.save_binary_table("t", rows, COLUMNS, compression)
+
+    entries = header_entries("t")
+    assert entries["city"]["encoding"] == "dict"
+    assert entries["city"]["dict_size"] == len(CITIES)
+    assert "encoding" not in entries["name"]
+
+    loaded = utils.read_table_data("t")
+    assert loaded == rows
+    # Строки ссылаются на общие объекты словаря
+    assert loaded[0]["city"] is loaded[4]["city"]
+
+    ctable = utils.open_binary_table("t", copy=["city"])
+    for node in [("cmp", "city", "=", "Москва"), ("cmp", "city", "=", ""),
+                 ("cmp", "city", "=", "Nowhere"), ("in", "city", ("Kazan", "Omsk")),
+                 ("cmp", "city", ">", "Kazan"), ("cmp", "city", "!=", "Omsk"),
+                 ("between", "city", "A", "P")]:
+        expected = [i for i, row in enumerate(rows)
+                    if predicates.compile_predicate(node)(row)]
+        assert predicates.positions(ctable, node) == expected, node
+
+
+def test_old_format_file_opens(db):
+    rows = make_rows(10)
+    write_old_format("t", rows)
+
+    assert utils.read_table_data("t") == rows
+    ctable = utils.open_binary_table("t", copy=["city"])
+    assert ctable["columns"]["city"]["type"] == "str"
+    assert predicates.positions(ctable, ("cmp", "city", "=", "Kazan")) == [0, 4, 8]
+
+
+def test_old_format_table_keeps_working(db):
+    db.run("create_table t city:str name:str storage=binary")
+    rows = make_rows(10)
+    write_old_format("t", rows)
+    metadata = db.session.metadata
+    metadata["t"].update(row_count=10, next_id=11)
+    metadata["t"].pop("stats", None)
+    utils.save_metadata(data=metadata)
+    db.session.flush()
+    db.reopen()
+
+    assert db.rows("select from t") == rows
+    assert db.rows('select from t where city = "Omsk"') == [rows[2], rows[6]]
+
+    db.run('insert into t values ("Kazan", "new")')
+    db.run('delete from t where name = "user1"')
+    db.reopen()
+
+    entries = header_entries("t")
+    assert entries["city"]["encoding"] == "dict"
+    assert db.rows("select from t") == rows[1:] + [
+        {"ID": 11, "city": "Kazan", "name": "new"}
+    ]
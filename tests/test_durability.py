@@ -0,0 +1,164 @@
+import os
+import time
+
+import pytest
+
+from src.primitive_db import indexes, utils
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    """
+    Перехватывает fsync и возвращает список сброшенных путей.
+    """
+    calls = []
+    monkeypatch.setattr(utils, "_fsync_path", calls.append)
+    monkeypatch.setattr(utils, "_last_fsync", 0.0)
+    policy, interval_ms = utils.get_fsync_policy()
+    yield calls
+    utils._take_unsynced()
+    utils.set_fsync_policy(policy, interval_ms)
+
+
+def write_text(filepath, text):
+    utils.atomic_write(filepath, lambda f: f.write(text))
+
+
+def read_text(filepath):
+    with open(filepath, encoding="utf-8") as f:
+        return f.read()
+
+
+def disk_state():
+    """Содержимое всех файлов базы в текущем каталоге."""
+    state = {}
+    for directory, _, names in os.walk("."):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                state[path] = f.read()
+    return state
+
+
+def test_group_replaces_files_on_exit(tmp_path):
+    first, second = str(tmp_path / "a"), str(tmp_path / "b")
+    write_text(first, "old")
+
+    with utils.write_group():
+        write_text(first, "new")
+        write_text(second, "new")
+        assert read_text(first) == "old"
+        assert not os.path.exists(second)
+
+    assert (read_text(first), read_text(second)) == ("new", "new")
+    assert sorted(os.listdir(tmp_path)) == ["a", "b"]
+
+
+def test_failed_group_keeps_previous_files(tmp_path):
+    first, second = str(tmp_path / "a"), str(tmp_path / "b")
+    write_text(first, "old")
+
+    with pytest.raises(RuntimeError):
+        with utils.write_group():
+            write_text(first, "new")
+            write_text(second, "new")
+            raise RuntimeError("сбой")
+
+    assert read_text(first) == "old"
+    assert sorted(os.listdir(tmp_path)) == ["a"]
+
+
+def test_failed_group_truncates_appended_log(db):
+    db.run("create_table t a:int storage=log")
+    db.run("insert into t values (1)")
+    size = utils.table_log_size("t")
+
+    with pytest.raises(RuntimeError):
+        with utils.write_group():
+            utils.write_table_log("t", [{"op": "delete", "ids": [1]}])
+            raise RuntimeError("сбой")
+
+    assert utils.table_log_size("t") == size
+    assert db.rows("select * from t") == [{"ID": 1, "a": 1}]
+
+
+def test_failed_file_aborts_whole_command(db, monkeypatch):
+    db.run("create_table t a:int")
+    db.run("create_index t a")
+    db.run("insert into t values (1)")
+    before = disk_state()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(indexes, "write_index", lambda *args: False)
+        output = db.run("insert into t values (2)")
+
+    assert "изменения не сохранены" in output
+    # Ни данные, ни метаданные (row_count, next_id, stats) не записаны
+    assert disk_state() == before
+    db.run("insert into t values (3)")
+    assert db.rows("select * from t") == [{"ID": 1, "a": 1}, {"ID": 2, "a": 3}]
+    db.reopen()
+    assert db.rows("select * from t") == [{"ID": 1, "a": 1}, {"ID": 2, "a": 3}]
+
+
+def test_failed_log_append_keeps_metadata(db, monkeypatch):
+    db.run("create_table t a:int storage=log")
+    db.run("insert into t values (1)")
+    before = disk_state()
+
+    monkeypatch.setattr(utils, "write_table_log", lambda *args: False)
+    output = db.run("insert into t values (2)")
+
+    assert "изменения не сохранены" in output
+    assert disk_state() == before
+    assert db.session.metadata["t"]["next_id"] == 2
+
+
+def test_fsync_always_syncs_every_commit(tmp_path, synced):
+    utils.set_fsync_policy("always")
+    target = str(tmp_path / "a")
+
+    write_text(target, "1")
+    write_text(target, "2")
+
+    assert synced.count(target + ".tmp") == 2
+    assert synced.count(str(tmp_path)) == 2
+
+
+def test_fsync_never_leaves_files_to_os(tmp_path, synced):
+    utils.set_fsync_policy("never")
+
+    write_text(str(tmp_path / "a"), "1")
+    utils.sync_pending()
+
+    assert synced == []
+
+
+def test_fsync_interval_defers_until_pending_sync(tmp_path, synced):
+    utils.set_fsync_policy("interval", 60000)
+    first, second = str(tmp_path / "a"), str(tmp_path / "b")
+
+    write_text(first, "1")
+    assert first + ".tmp" in synced
+    synced.clear()
+
+    write_text(second, "1")
+    assert synced == []
+
+    # То же выполняет обработчик завершения процесса
+    utils.sync_pending()
+    assert synced == [second, str(tmp_path)]
+
+
+def test_fsync_interval_timer_syncs_deferred_files(tmp_path, synced):
+    utils.set_fsync_policy("interval", 50)
+    target = str(tmp_path / "a")
+    write_text(target, "1")
+    synced.clear()
+
+    write_text(target, "2")
+    deadline = time.monotonic() + 5
+    while target not in synced and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert target in synced
@@ -0,0 +1,95 @@
+import pytest
+
+STORAGES = ["json", "log", "binary"]
+
+
+@pytest.fixture
+def table(db):
+    """
+    Таблица t (name:str age:int active:bool) с индексом по age.
+    """
+    def create(storage):
+        db.run(f"create_table t name:str age:int active:bool storage={storage}")
+        db.run("create_index t age hash")
+        return db
+    return create
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_csv_header_order_and_types(table, storage, tmp_path):
+    db = table(storage)
+    path = write(tmp_path, "in.csv",
+                 "active,ID,age,name\nTRUE,70,30,\"Doe, J\"\nfalse,71,31,Ann\n")
+
+    output = db.run(f"import t {path}")
+
+    assert "добавлено записей: 2" in output
+    assert db.rows("select from t") == [
+        {"ID": 1, "name": "Doe, J", "age": 30, "active": True},
+        {"ID": 2, "name": "Ann", "age": 31, "active": False},
+    ]
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_csv_type_error_keeps_finished_batches(table, storage, tmp_path):
+    db = table(storage)
+    path = write(tmp_path, "in.csv",
+                 "a,1,true\nb,2,true\nc,3,false\nd,4,true\ne,x,true\nf,6,true\n")
+
+    output = db.run(f"import t {path} 2")
+
+    assert 'Строка 5' in output and 'столбец "age"' in output
+    # Пакеты до ошибки сохранены, пакет с ошибкой отброшен целиком
+    assert [row["name"] for row in db.rows("select from t")] == ["a", "b", "c", "d"]
+    db.reopen()
+    assert [row["name"] for row in db.rows("select from t")] == ["a", "b", "c", "d"]
+    assert db.rows("select from t where age = 3") == [
+        {"ID": 3, "name": "c", "age": 3, "active": False}
+    ]
+
+    db.run('insert into t values ("g", 7, false)')
+    assert db.rows("select from t where age = 7")[0]["ID"] == 5
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_jsonl_type_error_in_batch(table, storage, tmp_path):
+    db = table(storage)
+    path = write(tmp_path, "in.jsonl", "\n".join([
+        '["a", 1, true]',
+        '{"name": "b", "age": 2, "active": false}',
+        '',
+        '["c", 3, true]',
+        '{"name": "d", "age": "4", "active": true}',
+        '["e", 5, true]',
+    ]) + "\n")
+
+    output = db.run(f"import t {path} 3")
+
+    assert 'Запись 4: столбец "age" ожидает тип int' in output
+    assert [row["name"] for row in db.rows("select from t")] == ["a", "b", "c"]
+    assert db.rows("select from t where age = 4") == []
+
+    fixed = write(tmp_path, "ok.jsonl", '["f", 4, false]\n')
+    db.run(f"import t {fixed}")
+    assert db.rows("select from t where age = 4") == [
+        {"ID": 4, "name": "f", "age": 4, "active": False}
+    ]
+
+
+def test_import_rejects_bad_input(table, tmp_path):
+    db = table("json")
+
+    broken = write(tmp_path, "broken.jsonl", '["a", 1, true]\n{"name": \n')
+    assert "Строка 2" in db.run(f"import t {broken}")
+
+    short = write(tmp_path, "short.csv", "a,1\n")
+    assert "ожидается 3 значений, получено 2" in db.run(f"import t {short}")
+
+    assert "Неподдерживаемый формат" in db.run(f"import t {tmp_path / 'in.txt'}")
+    assert db.rows("select from t") == []
@@ -0,0 +1,95 @@
+import pytest
+
+from src.primitive_db import indexes, utils
+
+
+def normalized(index):
+    """Содержимое индекса в виде, не зависящем от порядка вставки."""
+    if index["kind"] == "hash":
+        return {key: sorted(ids) for key, ids in index["entries"].items()}
+    return list(zip(index["values"], index["ids"]))
+
+
+@pytest.fixture
+def tables(db):
+    """
+    Три одинаковые таблицы: с хэш-индексом, с сортированным и без индексов.
+    """
+    def create(storage):
+        for name in ("hashed", "ordered", "plain"):
+            db.run(f"create_table {name} age:int city:str active:bool "
+                   f"storage={storage}")
+            for number in range(30):
+                db.run(f'insert into {name} values ({number % 7}, "c{number % 4}", '
+                       f"{str(number % 2 == 0).lower()})")
+        for column in ("age", "city", "active"):
+            db.run(f"create_index hashed {column} hash")
+            db.run(f"create_index ordered {column} sorted")
+        return db
+    return create
+
+
+def run_all(db, command):
+    for table in ("hashed", "ordered", "plain"):
+        db.run(command.format(table=table))
+
+
+def assert_same(db, where):
+    results = [db.rows(f"select from {table} where {where}")
+               for table in ("hashed", "ordered", "plain")]
+    assert results[0] == results[2], where
+    assert results[1] == results[2], where
+    return results[2]
+
+
+def assert_indexes_match_rebuild(db):
+    metadata = db.session.metadata
+    for table in ("hashed", "ordered"):
+        table_data = utils.load_table_data(table)
+        for column, kind in metadata[table]["indexes"].items():
+            index = indexes.get_table_indexes(metadata, table)[column]
+            col_type = indexes.column_type(metadata[table], column)
+            rebuilt = indexes.build_index(table_data, column, kind, col_type)
+            assert normalized(index) == normalized(rebuilt), (table, column)
+
+
+@pytest.mark.parametrize("storage", ["json", "log", "binary"])
+def test_lookups_after_update_and_delete(tables, storage):
+    db = tables(storage)
+
+    run_all(db, "update {table} set age = 100 where age = 3")
+    run_all(db, 'update {table} set city = "moved" where age between 1 and 2')
+    run_all(db, "delete from {table} where city = 'c0' or age = 6")
+    run_all(db, "update {table} set active = false where active = true and age < 2")
+    run_all(db, 'insert into {table} values (3, "c0", true)')
+
+    assert assert_same(db, "age = 100")
+    assert not assert_same(db, "age = 6")
+    assert assert_same(db, "age = 3")
+    assert assert_same(db, "city = 'moved'")
+    assert not assert_same(db, "city = 'c0' and age != 3")
+    assert assert_same(db, "age >= 2 and age < 100")
+    assert assert_same(db, "active = false")
+    assert assert_same(db, "city in ('c1', 'moved') or age > 4")
+    assert_indexes_match_rebuild(db)
+
+    db.reopen()
+    assert assert_same(db, "age = 100")
+    assert_indexes_match_rebuild(db)
+
+
+def test_lookup_normalizes_values():
+    # Значения, равные по ==, находят те же строки, что и полный просмотр
+    rows = [{"ID": 1, "flag": True}, {"ID": 2, "flag": False}, {"ID": 3, "n": 1}]
+    for kind in ("hash", "sorted"):
+        index = indexes.build_index(rows[:2], "flag", kind, "bool")
+        assert indexes.lookup(index, True) == [1]
+        assert indexes.lookup(index, 0) == [2]
+
+    index = indexes.build_index(rows, "n", "hash", "int")
+    assert indexes.lookup(index, 1) == indexes.lookup(index, 1.0) == [3]
+    assert indexes.lookup(index, True) == [3]
+    assert indexes.lookup(index, "1") == []
+
+    indexes.remove_row(index, rows[2])
+    assert index["entries"] == {indexes._encode_key(None, "int"): [1, 2]}
@@ -0,0 +1,62 @@
+import pytest
+
+from src.primitive_db import utils
+
+
+def join_rows(db, query):
+    return sorted(db.rows(query), key=lambda row: sorted(row.items()))
+
+
+@pytest.fixture
+def tables(db):
+    db.run("create_table a name:str n:int")
+    db.run("create_table b x:int flag:bool")
+    for name, n in [("1", 1), ("x", 2)]:
+        db.run(f'insert into a values ("{name}", {n})')
+    for i in range(1, 9):
+        db.run(f"insert into b values ({i % 4}, {str(i % 2 == 0).lower()})")
+    return db
+
+
+def test_mismatched_key_types_match_nothing_on_every_plan(tables):
+    db = tables
+    scan = join_rows(db, "select * from a join b on a.name = b.x")
+
+    # Меньшая таблица a строит хэш-таблицу, b ищется по ID и по индексу
+    assert join_rows(db, "select * from a join b on a.name = b.ID") == []
+    db.run("create_index b x sorted")
+    assert join_rows(db, "select * from a join b on a.name = b.x") == scan == []
+    db.run("create_index b flag")
+    assert join_rows(db, "select * from a join b on a.name = b.flag") == []
+
+
+def test_index_probe_matches_scan(tables):
+    db = tables
+    queries = [
+        "select * from a join b on a.n = b.x",
+        "select * from a join b on a.n = b.ID",
+        "select * from a join b on a.n = b.flag",
+    ]
+    expected = [join_rows(db, query) for query in queries]
+    assert [len(rows) for rows in expected] == [4, 2, 4]
+
+    db.run("create_index b x sorted")
+    db.run("create_index b flag")
+    assert [join_rows(db, query) for query in queries] == expected
+
+
+def test_binary_probe_reads_only_matching_rows(db, monkeypatch):
+    db.run("create_table a n:int")
+    db.run("create_table b x:int storage=binary")
+    db.run("insert into a values (3)")
+    for i in range(1, 21):
+        db.run(f"insert into b values ({i * 10})")
+    db.reopen()
+
+    def fail(table_name):
+        raise AssertionError(f"таблица {table_name} загружена целиком")
+
+    monkeypatch.setattr(utils, "load_table_data", fail)
+    rows = db.rows("select * from a join b on a.n = b.ID")
+
+    assert rows == [{"a.ID": 1, "a.n": 3, "b.ID": 3, "b.x": 30}]
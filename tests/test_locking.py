@@ -0,0 +1,171 @@
+import fcntl
+import os
+import threading
+
+import pytest
+
+from src.primitive_db import utils
+from src.primitive_db.constants import LOCK_SUFFIX
+
+
+@pytest.fixture
+def other_process(monkeypatch):
+    """
+    Захватывает блокировки через отдельные дескрипторы: flock не дает
+    их захватить и самому процессу, как если бы их держал другой.
+    Возвращает функцию, освобождающую блокировку.
+    """
+    monkeypatch.setattr(utils, "LOCK_TIMEOUT_MS", 50)
+    held = set()
+
+    def hold(table_name):
+        fd = os.open(utils.table_path(table_name, LOCK_SUFFIX), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        held.add(fd)
+
+        def release():
+            held.discard(fd)
+            os.close(fd)
+        return release
+
+    yield hold
+    for fd in held:
+        os.close(fd)
+
+
+def is_locked(table_name):
+    fd = os.open(utils.table_path(table_name, LOCK_SUFFIX), os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def test_lock_is_reentrant(tmp_path):
+    path = str(tmp_path / "t.lock")
+
+    utils.acquire_lock(path)
+    utils.acquire_lock(path)
+    utils.release_lock(path)
+    assert utils._held_locks[path]["count"] == 1
+    utils.release_lock(path)
+
+    assert path not in utils._held_locks
+
+
+def test_held_lock_times_out(db, other_process):
+    db.run("create_table t a:int")
+    other_process("t")
+
+    output = db.run("insert into t values (1)")
+
+    assert 'Таблица "t" заблокирована другим процессом' in output
+    assert db.rows("select * from t") == []
+    assert not utils._held_locks
+
+
+def test_locks_are_held_until_commit(db):
+    db.run("create_table a x:int")
+    db.run("create_table b x:int")
+
+    db.run("begin")
+    db.run("insert into a values (1)")
+    db.run("insert into b values (1)")
+    assert is_locked("a") and is_locked("b")
+
+    db.run("commit")
+    assert not is_locked("a") and not is_locked("b")
+
+
+def test_opposite_lock_order_does_not_deadlock(db, other_process):
+    db.run("create_table a x:int")
+    db.run("create_table b x:int")
+
+    # Этот процесс пишет a -> b, другой уже держит b и ждет a
+    db.run("begin")
+    db.run("insert into a values (1)")
+    release = other_process("b")
+    output = db.run("insert into b values (1)")
+
+    assert 'Таблица "b" заблокирована' in output
+    assert db.session.in_transaction
+    db.run("rollback")
+    assert not is_locked("a")
+
+    release()
+    db.run("insert into b values (2)")
+    assert db.rows("select * from b") == [{"ID": 1, "x": 2}]
+
+
+def test_writers_to_different_tables_merge_metadata(db):
+    first = db.session
+    db.run("create_table a x:int")
+    second = db.reopen()
+    db.run("create_table b x:int")
+
+    # Первый сеанс не видел таблицу b, но не должен ее потерять
+    db.use(first)
+    db.run("insert into a values (1)")
+    db.use(second)
+    db.run("insert into b values (1)")
+
+    disk = utils.read_metadata(utils.METADATA_FILE)
+    assert disk["a"]["row_count"] == 1
+    assert disk["b"]["row_count"] == 1
+
+
+@pytest.mark.parametrize("storage", ["json", "log"])
+def test_writers_to_same_table_see_each_other(db, storage):
+    db.run(f"create_table t x:int storage={storage}")
+    first = db.session
+    second = db.reopen()
+
+    db.use(first)
+    db.run("insert into t values (1)")
+    db.use(second)
+    db.run("insert into t values (2)")
+    db.use(first)
+    db.run("update t set x = 0 where ID = 2")
+
+    expected = [{"ID": 1, "x": 1}, {"ID": 2, "x": 0}]
+    assert db.rows("select * from t") == expected
+    db.reopen()
+    assert db.rows("select * from t") == expected
+    assert db.session.metadata["t"]["next_id"] == 3
+
+
+def test_drop_table_removes_lock_file(db):
+    db.run("create_table t a:int")
+    db.run("insert into t values (1)")
+    lock_path = utils.table_path("t", LOCK_SUFFIX)
+    assert os.path.exists(lock_path)
+
+    db.run("drop_table t")
+
+    assert not os.path.exists(lock_path)
+    assert not utils._held_locks
+
+
+def test_waiter_reopens_removed_lock_file(tmp_path):
+    path = str(tmp_path / "t.lock")
+    owner = os.open(path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(owner, fcntl.LOCK_EX)
+
+    def drop():
+        os.remove(path)
+        os.close(owner)
+
+    timer = threading.Timer(0.05, drop)
+    timer.start()
+    utils.acquire_lock(path)
+    timer.join()
+
+    assert utils._same_file(utils._held_locks[path]["fd"], path)
+    fd = os.open(path, os.O_RDWR)
+    with pytest.raises(BlockingIOError):
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    os.close(fd)
+    utils.release_lock(path)
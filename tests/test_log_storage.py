@@ -0,0 +1,180 @@
+import json
+import os
+
+from src.primitive_db import core, indexes, parser, predicates, utils
+from src.primitive_db.constants import LOG_SUFFIX
+
+
+def log_path(table_name):
+    return utils.table_path(table_name, LOG_SUFFIX)
+
+
+def fill(db, count=10):
+    db.run("create_table t a:int b:str storage=log")
+    for i in range(1, count + 1):
+        db.run(f'insert into t values ({i % 3}, "s{i}")')
+
+
+def assert_indexes_current(db, table_name):
+    """Сверяет поддерживаемые индексы с построенными заново по данным."""
+    table_data = utils.load_table_data(table_name)
+    table_meta = db.session.metadata[table_name]
+    current = indexes.get_table_indexes(db.session.metadata, table_name, table_data)
+    assert current
+    for column, index in current.items():
+        fresh = indexes.build_index(table_data, column, index["kind"],
+                                    indexes.column_type(table_meta, column))
+        if index["kind"] == "hash":
+            assert {key: sorted(ids) for key, ids in index["entries"].items()
+                    if ids} == fresh["entries"]
+        else:
+            assert (index["values"], index["ids"]) == (fresh["values"], fresh["ids"])
+
+
+def test_changes_are_appended_to_log(db):
+    fill(db, 3)
+    snapshot = utils.table_path("t")
+    size = os.path.getsize(snapshot)
+
+    db.run("update t set a = 7 where ID = 2")
+    db.run("delete from t where ID = 3")
+
+    records, end = utils.read_table_log("t")
+    assert [record["op"] for record in records] == [
+        "insert", "insert", "insert", "update", "delete"
+    ]
+    assert end == os.path.getsize(log_path("t"))
+    # Снимок не перезаписывается, пока журнал не свернут
+    assert os.path.getsize(snapshot) == size
+
+
+def test_log_is_replayed_by_new_session(db):
+    fill(db)
+    db.run("update t set b = \"x\" where a = 1")
+    db.run("delete from t where a = 2")
+    expected = db.rows("select * from t")
+
+    db.reopen()
+
+    assert db.rows("select * from t") == expected
+    assert [row["ID"] for row in expected] == [1, 3, 4, 6, 7, 9, 10]
+    assert all(row["b"] == "x" for row in expected if row["a"] == 1)
+
+
+def test_incomplete_last_record_is_skipped(db):
+    fill(db, 3)
+    with open(log_path("t"), "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "ids": [1]')
+
+    db.reopen()
+
+    assert [row["ID"] for row in db.rows("select * from t")] == [1, 2, 3]
+
+
+def test_corrupted_record_is_reported_and_skipped(db, capsys):
+    fill(db, 2)
+    with open(log_path("t"), "a", encoding="utf-8") as f:
+        f.write("not json\n")
+    db.run('insert into t values (5, "s5")')
+
+    records, _ = utils.read_table_log("t")
+
+    assert "повреждена и пропущена" in capsys.readouterr().out
+    assert [record["row"]["ID"] for record in records] == [1, 2, 3]
+
+
+def test_compact_folds_log_into_snapshot(db):
+    fill(db)
+    db.run("delete from t where a = 0")
+    expected = db.rows("select * from t")
+
+    db.run("compact t")
+
+    assert utils.table_log_size("t") == 0
+    with open(utils.table_path("t"), encoding="utf-8") as f:
+        assert json.load(f) == expected
+    db.reopen()
+    assert db.rows("select * from t") == expected
+
+
+def test_log_is_compacted_automatically(db, monkeypatch):
+    monkeypatch.setattr(core, "LOG_COMPACT_THRESHOLD", 200)
+    fill(db, 20)
+
+    assert utils.table_log_size("t") < 200
+    db.reopen()
+    assert len(db.rows("select * from t")) == 20
+
+
+def test_indexes_follow_log_changes(db):
+    fill(db, 30)
+    db.run("create_index t a")
+    db.run("create_index t b sorted")
+
+    db.run('insert into t values (1, "new")')
+    db.run("update t set a = 5 where ID < 4")
+    db.run("delete from t where b = \"s10\"")
+
+    queries = [
+        "select * from t where a = 1",
+        "select * from t where a = 5",
+        "select * from t where b = \"new\"",
+        "select * from t where b >= \"s2\" and b < \"s3\"",
+    ]
+    expected = [db.rows(query) for query in queries]
+    assert [row["ID"] for row in expected[1]] == [1, 2, 3]
+    assert all(row["ID"] != 10 for row in expected[0])
+
+    # Результаты поиска по индексам сверяются с полным просмотром
+    table_data = utils.load_table_data("t")
+    table_indexes = indexes.get_table_indexes(db.session.metadata, "t", table_data)
+    for query, rows in zip(queries, expected):
+        where = parser.parse_where_clause(query.split(" where ")[1])
+        node = predicates.normalize(where)
+        assert predicates.filter_rows(table_data, node, table_indexes) == rows
+        assert predicates.filter_rows(table_data, node) == rows
+    assert_indexes_current(db, "t")
+
+    db.reopen()
+    assert [db.rows(query) for query in queries] == expected
+    assert_indexes_current(db, "t")
+
+
+def test_index_catches_up_without_rebuild(db, monkeypatch):
+    fill(db, 5)
+    db.run("create_index t a")
+    calls = []
+    original = indexes.build_index
+
+    def counting_build(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(indexes, "build_index", counting_build)
+
+    db.run('insert into t values (1, "s6")')
+    db.run("update t set a = 2 where ID = 1")
+    db.run("delete from t where ID = 2")
+
+    assert calls == []
+    index = indexes.load_index("t", "a")
+    assert index["log_offset"] == utils.table_log_size("t")
+    assert [row["ID"] for row in db.rows("select * from t where a = 1")] == [4, 6]
+
+
+def test_index_catches_up_with_other_session(db):
+    fill(db, 5)
+    db.run("create_index t a")
+    first = db.session
+    assert [row["ID"] for row in db.rows("select * from t where a = 2")] == [2, 5]
+
+    # Другой процесс дописывает журнал, не трогая индекс этого сеанса
+    db.reopen()
+    db.run('insert into t values (2, "s6")')
+    db.run("delete from t where ID = 2")
+
+    db.session = first
+    utils.set_session(first)
+    core.query_cacher.clear()
+    assert [row["ID"] for row in db.rows("select * from t where a = 2")] == [5, 6]
+    assert_indexes_current(db, "t")
@@ -0,0 +1,129 @@
+import pytest
+
+from src.primitive_db import parser
+from src.primitive_db.parser import Param, parse_statement, parse_where_clause, tokenize
+
+
+def test_tokenize_kinds():
+    assert tokenize("select a, b from t where a>=? and b != 'x y'") == [
+        ("word", "select"), ("word", "a"), ("punct", ","), ("word", "b"),
+        ("word", "from"), ("word", "t"), ("word", "where"), ("word", "a"),
+        ("op", ">="), ("param", "?"), ("word", "and"), ("word", "b"),
+        ("op", "!="), ("string", "x y"),
+    ]
+
+
+@pytest.mark.parametrize("text, value", [
+    (r'"a\"b"', 'a"b'),
+    (r"'it\'s'", "it's"),
+    (r'"ends\\"', "ends\\"),
+    (r'"a\\\"b"', 'a\\"b'),
+    (r'"keep\n"', "keep\\n"),
+])
+def test_strings_are_unescaped(text, value):
+    assert tokenize(text) == [("string", value)]
+
+
+def test_unterminated_string_is_an_error():
+    with pytest.raises(ValueError):
+        tokenize('"abc')
+
+
+@pytest.mark.parametrize("text, value", [
+    ("42", 42),
+    ("-7", -7),
+    ("2.5", 2.5),
+    ("true", True),
+    ("FALSE", False),
+    ("nan", "nan"),
+    ("inf", "inf"),
+    ("Infinity", "Infinity"),
+    ("1_000", "1_000"),
+    ("1e3", "1e3"),
+    ("²", "²"),
+])
+def test_bare_literals(text, value):
+    values = parse_statement(f"insert into t values ({text})").args["values"]
+    assert values == [value]
+    assert type(values[0]) is type(value)
+
+
+def test_where_tree():
+    node = parse_where_clause(
+        "a = 1 or (b between 2 and 3 and c in ('x', 4)) and d <> nan"
+    )
+    assert node == ("or", (
+        ("cmp", "a", "=", 1),
+        ("and", (
+            ("and", (("between", "b", 2, 3), ("in", "c", ("x", 4)))),
+            ("cmp", "d", "!=", "nan"),
+        )),
+    ))
+
+
+def test_select_clauses():
+    args = parse_statement(
+        "select a, count(*) from t join u on t.a = u.b where a > 1 "
+        "group by a order by a desc, b limit 5 offset 2"
+    ).args
+    assert args["aggregates"] == ["a", ("count", "*")]
+    assert args["join"] == {"table": "u", "on": ("t.a", "u.b")}
+    assert args["group_by"] == ["a"]
+    assert args["order_by"] == [("a", True), ("b", False)]
+    assert (args["limit"], args["offset"]) == (5, 2)
+
+
+@pytest.mark.parametrize("text", [
+    "select * from t limit 1 limit 2",
+    "select * from t offset 1 offset 2",
+    "select * from t limit 1 offset 1 limit 2",
+])
+def test_repeated_limit_or_offset_is_an_error(text):
+    with pytest.raises(ValueError, match="указан повторно"):
+        parse_statement(text)
+
+
+@pytest.mark.parametrize("text", [
+    "select * from t limit -1",
+    "select * from t limit ²",
+    "select * from t where",
+    "update t set a = 1",
+    "insert into t values (1",
+    "unknown",
+])
+def test_syntax_errors(text):
+    with pytest.raises(ValueError):
+        parse_statement(text)
+
+
+def test_parameters_are_bound_in_order():
+    statement = parse_statement(
+        "select * from t where a = ? and b in (?, ?) limit ?"
+    )
+    assert statement.param_count == 4
+    where = statement.args["where"]
+    assert isinstance(where[1][0][3], Param)
+
+    args = statement.bind([1, "x", None, 10])
+    assert args["where"] == ("and", (
+        ("cmp", "a", "=", 1), ("in", "b", ("x", None)),
+    ))
+    assert args["limit"] == 10
+    # Связывание не меняет разобранную команду
+    assert isinstance(statement.args["where"][1][0][3], Param)
+
+    with pytest.raises(ValueError):
+        statement.bind([1])
+
+
+def test_statement_cache_reuses_parsed_statements(monkeypatch):
+    monkeypatch.setattr(parser, "_statement_cache", type(parser._statement_cache)())
+    monkeypatch.setattr(parser, "STATEMENT_CACHE_SIZE", 2)
+
+    first = parse_statement("select * from t where a = ?")
+    assert parse_statement("  select * from t where a = ?  ") is first
+
+    parse_statement("select * from u")
+    parse_statement("select * from v")
+    assert list(parser._statement_cache) == ["select * from u", "select * from v"]
+    assert parse_statement("select * from t where a = ?") is not first
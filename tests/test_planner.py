@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from src.primitive_db import parser, planner, predicates, zonemaps
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "age", "type": "int"},
+           {"name": "city", "type": "str"}]
+CITIES = ["Kazan", "Moscow", "Omsk", "Tver"]
+
+
+def make_rows(count, rng):
+    # Значения растут с ID, чтобы границы частей различались
+    return [
+        {"ID": i, "age": None if rng.random() < 0.1 else i // 5 + rng.randrange(3),
+         "city": rng.choice(CITIES[:1 + i * len(CITIES) // (count + 1)])}
+        for i in range(1, count + 1)
+    ]
+
+
+def random_leaf(rng):
+    kind = rng.choice(["cmp", "cmp", "in", "between"])
+    if kind == "between":
+        low = rng.randrange(0, 45)
+        return ("between", "age", low, low + rng.randrange(0, 10))
+    if kind == "in":
+        return ("in", rng.choice(["age", "city"]),
+                tuple(rng.sample([None, 3, 17, 40] + CITIES, 2)))
+    if rng.random() < 0.5:
+        return ("cmp", "city", rng.choice(["=", "!=", "<", ">="]), rng.choice(CITIES))
+    value = rng.choice([None, rng.randrange(-5, 50)])
+    return ("cmp", "age", rng.choice(list(predicates.COMPARATORS)), value)
+
+
+def random_tree(rng, depth=0):
+    if depth < 2 and rng.random() < 0.4:
+        return (rng.choice(["and", "or"]),
+                tuple(random_tree(rng, depth + 1) for _ in range(rng.randint(2, 3))))
+    return random_leaf(rng)
+
+
+def assert_skipped_chunks_have_no_matches(rows, stats, rng, trees=300):
+    skipped_any = False
+    for _ in range(trees):
+        node = random_tree(rng)
+        predicate = predicates.compile_predicate(node)
+        for chunk in stats["chunks"]:
+            if planner.chunk_may_match(node, chunk):
+                continue
+            skipped_any = True
+            inside = [row for row in rows
+                      if chunk["first_id"] <= row["ID"] <= chunk["last_id"]]
+            assert not [row for row in inside if predicate(row)], (node, chunk)
+    assert skipped_any
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_chunk_skipping_never_drops_matches(seed):
+    rng = random.Random(seed)
+    rows = make_rows(200, rng)
+    stats = zonemaps.build(rows, COLUMNS, chunk_rows=16)
+
+    assert_skipped_chunks_have_no_matches(rows, stats, rng)
+
+
+def test_chunk_skipping_after_changes():
+    rng = random.Random(5)
+    rows = make_rows(200, rng)
+    stats = zonemaps.build(rows, COLUMNS, chunk_rows=16)
+
+    removed = rng.sample(rows, 40)
+    zonemaps.remove_rows(stats, removed)
+    rows = [row for row in rows if row not in removed]
+    for row in rng.sample(rows, 40):
+        changes = {"age": rng.choice([None, rng.randrange(-10, 60)]),
+                   "city": rng.choice(CITIES + ["Ufa"])}
+        zonemaps.update_row(stats, row, changes)
+        row.update(changes)
+    added = make_rows(230, rng)[200:]
+    zonemaps.add_rows(stats, added)
+    rows += added
+
+    assert sum(chunk["rows"] for chunk in stats["chunks"]) == 190
+    assert_skipped_chunks_have_no_matches(rows, stats, rng)
+
+
+def test_where_with_chunks_matches_scan(db, monkeypatch):
+    monkeypatch.setattr(zonemaps.empty, "__defaults__", (8,))
+    monkeypatch.setattr(zonemaps.build, "__defaults__", (8,))
+    db.run("create_table t age:int city:str")
+    rng = random.Random(7)
+    for row in make_rows(120, rng):
+        db.run(f'insert into t values ({row["age"] or 0}, "{row["city"]}")')
+    db.run("update t set age = 1000 where ID = 50")
+    db.run("delete from t where age between 10 and 12")
+
+    everything = db.rows("select from t")
+    table_meta = db.session.metadata["t"]
+    used_chunks = False
+    for where in ["age >= 20", "age = 1000", "age < 3 or city = 'Tver'",
+                  "city in ('Kazan', 'Omsk') and age > 5", "age between 8 and 14"]:
+        node = parser.parse_where_clause(where)
+        access = planner.plan(table_meta, node, len(everything))["access"]
+        used_chunks = used_chunks or access == "chunks"
+        predicate = predicates.compile_predicate(node)
+
+        assert db.rows(f"select from t where {where}") == [
+            row for row in everything if predicate(row)
+        ], where
+    assert used_chunks
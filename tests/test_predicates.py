@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from src.primitive_db import columnar, indexes, parser, predicates
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "age", "type": "int"},
+           {"name": "city", "type": "str"}, {"name": "active", "type": "bool"}]
+CITIES = ["Moscow", "Kazan", "Omsk", "Tver"]
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"ID": i, "age": rng.randrange(0, 50), "city": rng.choice(CITIES),
+         "active": rng.random() < 0.5}
+        for i in range(1, count + 1)
+    ]
+
+
+def random_tree(rng, depth=0):
+    if depth < 3 and rng.random() < 0.5:
+        children = tuple(random_tree(rng, depth + 1) for _ in range(rng.randint(2, 3)))
+        return (rng.choice(["and", "or"]), children)
+    kind = rng.choice(["cmp", "cmp", "in", "between"])
+    if kind == "between":
+        low = rng.randrange(0, 50)
+        return ("between", "age", low, low + rng.randrange(0, 20))
+    if kind == "in":
+        return ("in", "city", tuple(rng.sample(CITIES, 2)))
+    column = rng.choice(["age", "city", "active"])
+    if column == "age":
+        return ("cmp", "age", rng.choice(list(predicates.COMPARATORS)),
+                rng.randrange(0, 50))
+    if column == "city":
+        return ("cmp", "city", rng.choice(["=", "!="]), rng.choice(CITIES))
+    return ("cmp", "active", "=", rng.random() < 0.5)
+
+
+def evaluate(node, row):
+    """Прямое вычисление условия без компиляции."""
+    kind = node[0]
+    if kind == "and":
+        return all(evaluate(child, row) for child in node[1])
+    if kind == "or":
+        return any(evaluate(child, row) for child in node[1])
+    if kind == "in":
+        return row[node[1]] in node[2]
+    if kind == "between":
+        return node[2] <= row[node[1]] <= node[3]
+    return predicates.COMPARATORS[node[2]](row[node[1]], node[3])
+
+
+def test_parsed_tree_precedence():
+    node = parser.parse_where_clause(
+        'age between 10 and 20 or city = "Omsk" and active = true'
+    )
+    assert node == ("or", (
+        ("between", "age", 10, 20),
+        ("and", (("cmp", "city", "=", "Omsk"), ("cmp", "active", "=", True))),
+    ))
+
+    rows = make_rows(200)
+    matched = [row for row in rows if predicates.compile_predicate(node)(row)]
+    assert matched == [row for row in rows if evaluate(node, row)]
+
+
+def test_incomparable_values_do_not_match():
+    predicate = predicates.compile_predicate(
+        ("or", (("cmp", "age", ">", 5), ("between", "age", 1, 3)))
+    )
+    assert not predicate({"age": "text"})
+    assert not predicate({})
+    assert predicate({"age": 2})
+
+
+@pytest.mark.parametrize("kinds", [
+    {"age": "sorted", "city": "hash"},
+    {"age": "hash", "city": "sorted", "active": "hash"},
+    {"age": "sorted"},
+])
+def test_random_trees_match_full_scan(kinds):
+    rows = make_rows(300)
+    types = {col["name"]: col["type"] for col in COLUMNS}
+    table_indexes = {
+        column: indexes.build_index(rows, column, kind, types[column])
+        for column, kind in kinds.items()
+    }
+    ctable = columnar.build(rows, COLUMNS)
+    rng = random.Random(1)
+
+    for _ in range(200):
+        node = random_tree(rng)
+        expected = [row for row in rows if evaluate(node, row)]
+
+        candidates = predicates.index_candidates(node, table_indexes)
+        if candidates is not None:
+            assert {row["ID"] for row in expected} <= candidates
+        assert predicates.filter_rows(rows, node, table_indexes) == expected
+        assert predicates.filter_rows(rows, node) == expected
+        assert predicates.positions(ctable, node) == [row["ID"] - 1 for row in expected]
+
+
+def test_where_with_indexes_matches_scan(db):
+    for table in ("indexed", "plain"):
+        db.run(f"create_table {table} age:int city:str active:bool")
+        for row in make_rows(60):
+            db.run(f'insert into {table} values ({row["age"]}, "{row["city"]}", '
+                   f'{str(row["active"]).lower()})')
+    db.run("create_index indexed age sorted")
+    db.run("create_index indexed city hash")
+
+    for where in [
+        "age between 10 and 30 and city in ('Omsk', 'Tver')",
+        "(age < 5 or age >= 45) and active = false",
+        "city = 'Kazan' or age between 20 and 22",
+        "age > 47 or city = 'Omsk'",
+        "active = true or age = 3",
+    ]:
+        indexed = db.rows(f"select from indexed where {where}")
+        plain = db.rows(f"select from plain where {where}")
+        assert indexed == plain and indexed
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+from src.primitive_db.client import Client
+from src.primitive_db.server import Server
+
+
+@pytest.fixture
+def socket_path(db, tmp_path):
+    """
+    Запускает сервер на Unix-сокете в отдельном потоке.
+    """
+    server = Server(db.session)
+    path = str(tmp_path / "db.sock")
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start(unix_path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield path
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def dropping_server(tmp_path):
+    """
+    Сервер, который отвечает на первый запрос соединения, а на втором
+    закрывает соединение без ответа. Возвращает путь и список
+    полученных запросов.
+    """
+    path = str(tmp_path / "drop.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    received = []
+
+    def serve(conn):
+        with conn, conn.makefile("rb") as reader:
+            for number, line in enumerate(reader):
+                received.append(json.loads(line))
+                if number == 1:
+                    return
+                conn.sendall(b'{"ok": true}\n')
+
+    def accept():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield path, received
+    listener.close()
+
+
+def test_commands_and_parameters(socket_path):
+    with Client(unix_path=socket_path) as client:
+        assert client.execute("create_table users name:str age:int")["ok"]
+        response = client.execute("insert into users values (?, ?)", ["Ann", 30])
+        assert response["ok"] and "ID=1" in response["output"]
+        rows = client.execute("select * from users where age > ?", [18])["result"]
+        assert rows == [{"ID": 1, "name": "Ann", "age": 30}]
+
+        error = client.execute("select * from missing")
+        assert not error["ok"] and "missing" in error["error"]
+        assert not client.execute("begin")["ok"]
+
+
+def test_atomic_batch_rolls_back_on_error(socket_path):
+    with Client(unix_path=socket_path) as client:
+        client.execute("create_table t a:int")
+        response = client.execute_many([
+            "insert into t values (1)",
+            ("insert into t values (?)", [2]),
+            "insert into missing values (3)",
+        ])
+        assert not response["ok"]
+        assert len(response["results"]) == 3
+        assert client.execute("select * from t")["result"] == []
+
+        assert client.execute_many(["insert into t values (1)"])["ok"]
+        assert client.execute("select * from t")["result"] == [{"ID": 1, "a": 1}]
+
+
+def test_pool_is_shared_between_threads(socket_path):
+    with Client(unix_path=socket_path, pool_size=2) as client:
+        client.execute("create_table t a:int")
+        threads = [
+            threading.Thread(
+                target=lambda: [client.execute("insert into t values (1)")
+                                for _ in range(10)]
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert client.execute("select count(*) from t")["result"] == [
+            {"count(*)": 40}
+        ]
+
+
+def test_read_is_retried_after_dropped_connection(dropping_server):
+    path, received = dropping_server
+    with Client(unix_path=path, pool_size=1) as client:
+        client.execute("select * from t")
+        assert client.execute("select * from t") == {"ok": True}
+    assert [request["command"] for request in received] == ["select * from t"] * 3
+
+
+def test_write_is_not_retried_after_dropped_connection(dropping_server):
+    path, received = dropping_server
+    with Client(unix_path=path, pool_size=1) as client:
+        client.execute("select * from t")
+        with pytest.raises(ConnectionError):
+            client.execute("insert into t values (1)")
+
+        client.execute("select * from t")
+        with pytest.raises(ConnectionError):
+            client.execute_many(["select * from t", "delete from t where ID = 1"])
+
+    commands = [request.get("command") for request in received]
+    assert commands.count("insert into t values (1)") == 1
+    assert sum("commands" in request for request in received) == 1
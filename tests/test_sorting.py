@@ -0,0 +1,79 @@
+import os
+import random
+
+import pytest
+
+from src.primitive_db import sorting
+from src.primitive_db.constants import DATA_DIR
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"ID": i, "age": rng.choice([None, 1, 2, 3, 4]),
+         "name": rng.choice([None, "a", "b", "c"])}
+        for i in range(1, count + 1)
+    ]
+
+
+def expected_order(rows, order_by):
+    """Устойчивая сортировка по ключам с последнего: None меньше любых значений."""
+    result = list(rows)
+    for column, descending in reversed(order_by):
+        result.sort(key=lambda row: (row[column] is not None, row[column]),
+                    reverse=descending)
+    return result
+
+
+ORDERS = [
+    [("age", False)],
+    [("age", True)],
+    [("name", True), ("age", False)],
+    [("age", False), ("name", True), ("ID", True)],
+]
+
+
+@pytest.mark.parametrize("order_by", ORDERS)
+@pytest.mark.parametrize("memory_rows", [3, 10, 1000])
+def test_sort_rows_matches_stable_sort(db, order_by, memory_rows):
+    rows = make_rows(101)
+
+    result = list(sorting.sort_rows(iter(rows), order_by, memory_rows))
+
+    assert result == expected_order(rows, order_by)
+    assert sorting.top_k(rows, order_by, 7) == result[:7]
+    # Временные серии удаляются после слияния
+    assert not os.path.isdir(DATA_DIR) or os.listdir(DATA_DIR) == []
+
+
+def test_none_ordering():
+    rows = [{"v": 2}, {"v": None}, {"v": 1}, {}]
+
+    ascending = [row.get("v") for row in sorting.sort_rows(rows, [("v", False)])]
+    descending = [row.get("v") for row in sorting.sort_rows(rows, [("v", True)])]
+
+    assert ascending == [None, None, 1, 2]
+    assert descending == [2, 1, None, None]
+
+
+def test_order_by_spills_to_disk(db, monkeypatch):
+    monkeypatch.setattr(sorting.sort_rows, "__defaults__", (4,))
+    runs = []
+    write_run = sorting._write_run
+    monkeypatch.setattr(sorting, "_write_run",
+                        lambda *args: runs.append(args[1]) or write_run(*args))
+    db.run("create_table t age:int name:str")
+    rows = make_rows(40, seed=3)
+    for row in rows:
+        row["age"], row["name"] = row["age"] or 0, row["name"] or ""
+        db.run(f'insert into t values ({row["age"]}, "{row["name"]}")')
+
+    result = db.rows("select from t order by age desc, name")
+
+    assert len(runs) == 10
+    assert [row["ID"] for row in result] == [
+        row["ID"] for row in expected_order(rows, [("age", True), ("name", False)])
+    ]
+    assert db.rows("select from t order by age desc, name limit 5 offset 3") == (
+        result[3:8]
+    )
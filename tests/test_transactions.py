@@ -0,0 +1,117 @@
+import os
+
+from src.primitive_db import utils
+
+
+def ids(db, query):
+    return [row["ID"] for row in db.rows(query)]
+
+
+def table_files_state():
+    """Содержимое файлов таблиц и метаданных на диске."""
+    state = {}
+    for directory, _, names in os.walk("."):
+        for name in names:
+            if not name.endswith(".lock"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    state[os.path.join(directory, name)] = f.read()
+    return state
+
+
+def setup_tables(db):
+    db.run("create_table r a:int")
+    db.run("create_table l a:int storage=log")
+    db.run("create_index l a")
+    for table_name in ("r", "l"):
+        db.run(f"insert into {table_name} values (1)")
+        db.run(f"insert into {table_name} values (2)")
+
+
+def test_changes_stay_in_memory_until_commit(db):
+    setup_tables(db)
+    before = table_files_state()
+
+    db.run("begin")
+    for table_name in ("r", "l"):
+        db.run(f"insert into {table_name} values (3)")
+        db.run(f"update {table_name} set a = 5 where ID = 1")
+        db.run(f"delete from {table_name} where ID = 2")
+        # Сеанс видит свои незафиксированные изменения
+        assert ids(db, f"select * from {table_name}") == [1, 3]
+
+    assert table_files_state() == before
+
+    db.run("commit")
+    db.reopen()
+    for table_name in ("r", "l"):
+        assert db.rows(f"select * from {table_name}") == [
+            {"ID": 1, "a": 5}, {"ID": 3, "a": 3}
+        ]
+    assert ids(db, "select * from l where a = 5") == [1]
+
+
+def test_commit_appends_log_records_once(db):
+    setup_tables(db)
+    size = utils.table_log_size("l")
+
+    db.run("begin")
+    db.run("insert into l values (3)")
+    db.run("insert into l values (4)")
+    assert utils.table_log_size("l") == size
+    db.run("commit")
+
+    records, _ = utils.read_table_log("l", size)
+    assert [record["row"]["ID"] for record in records] == [3, 4]
+
+
+def test_rollback_discards_changes(db):
+    setup_tables(db)
+    before = table_files_state()
+
+    db.run("begin")
+    for table_name in ("r", "l"):
+        db.run(f"insert into {table_name} values (3)")
+        db.run(f"delete from {table_name} where ID = 1")
+    db.run("rollback")
+
+    assert table_files_state() == before
+    for table_name in ("r", "l"):
+        assert ids(db, f"select * from {table_name}") == [1, 2]
+        assert ids(db, f"select * from {table_name} where a = 1") == [1]
+    # Номера записей, выданные в отмененной транзакции, освобождаются
+    db.run("insert into r values (4)")
+    assert ids(db, "select * from r") == [1, 2, 3]
+
+
+def test_failed_commit_rolls_back_everything(db, monkeypatch):
+    setup_tables(db)
+    before = table_files_state()
+
+    db.run("begin")
+    db.run("insert into l values (3)")
+    db.run("insert into r values (3)")
+    assert ids(db, "select * from r") == [1, 2, 3]
+    with monkeypatch.context() as patch:
+        patch.setattr(utils, "write_table_data", lambda *args: False)
+        output = db.run("commit")
+
+    assert "изменения не сохранены" in output
+    assert not db.session.in_transaction
+    assert table_files_state() == before
+    for table_name in ("r", "l"):
+        assert ids(db, f"select * from {table_name}") == [1, 2]
+
+
+def test_transaction_commands_are_validated(db):
+    db.run("create_table t a:int")
+
+    assert "Нет открытой транзакции" in db.run("commit")
+    assert "Нет открытой транзакции" in db.run("rollback")
+
+    db.run("begin")
+    assert "Транзакция уже открыта" in db.run("begin")
+    assert "недоступна внутри транзакции" in db.run("create_table u a:int")
+    assert "недоступна внутри транзакции" in db.run("create_index t a")
+    db.run("rollback")
+
+    assert "u" not in db.session.metadata